@@ -9,6 +9,8 @@ from urllib.parse import urlparse
 from datetime import datetime
 from dotenv import load_dotenv
 
+from modulos.nucleo.abreviaturas import compilar_expansor_palabras
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
@@ -32,28 +34,30 @@ FARMACIAS_CONOCIDAS = {
     "lider.cl": "Lider", "super.lider.cl": "Lider", "jumbo.cl": "Jumbo", "preunic.cl": "Preunic"
 }
 
+# Abreviaturas de Mediven -> palabras que entiende Google (una sola regex compilada)
+TRADUCCIONES_BUSQUEDA = {
+    'COM': 'comprimidos', 'CAP': 'capsulas', 'JBE': 'jarabe',
+    'INY': 'inyectable', 'FCO': 'frasco', 'AMP': 'ampollas',
+    'CRE': 'crema', 'AER': 'aerosol', 'UDS': 'unidades',
+    'UND': 'unidades', 'SAB': 'sabor', 'PVO': 'polvo',
+    'SBR': 'sobres', 'LOC': 'locion', 'GTS': 'gotas',
+    'UNG': 'unguento', 'SUP': 'supositorios', 'SOL': 'solucion',
+    'SUSP': 'suspension', 'ACO': 'acondicionador', 'SH': 'shampoo',
+    'MATIF': 'matificante', 'SPY': 'spray', 'COMP': 'comprimidos',
+    'SHA': 'shampoo', 'CEP': 'cepillo', 'DEN': 'dental',
+    'DENT': 'dental', 'TOA': 'toalla', 'UF': 'ultra fina',
+    'C/A': 'con alas', 'S/A': 'sin alas', 'JAB': 'jabon',
+    'OFT': 'oftalmica', 'PED': 'pediatrico', 'OSC': 'oscuro'
+}
+EXPANDIR_BUSQUEDA = compilar_expansor_palabras(TRADUCCIONES_BUSQUEDA)
+
 def buscar_precio_competencia(nombre_producto, laboratorio=""):
     url = "https://google.serper.dev/search"
     
     nombre_limpio = nombre_producto.replace('+', ' ').replace('/', ' ')
     nombre_limpio = nombre_limpio.split("(")[0].strip()
     
-    traducciones = {
-        r'\bCOM\b': 'comprimidos', r'\bCAP\b': 'capsulas', r'\bJBE\b': 'jarabe',
-        r'\bINY\b': 'inyectable', r'\bFCO\b': 'frasco', r'\bAMP\b': 'ampollas',
-        r'\bCRE\b': 'crema', r'\bAER\b': 'aerosol', r'\bUDS\b': 'unidades',
-        r'\bUND\b': 'unidades', r'\bSAB\b': 'sabor', r'\bPVO\b': 'polvo',
-        r'\bSBR\b': 'sobres', r'\bLOC\b': 'locion', r'\bGTS\b': 'gotas',
-        r'\bUNG\b': 'unguento', r'\bSUP\b': 'supositorios', r'\bSOL\b': 'solucion',
-        r'\bSUSP\b': 'suspension', r'\bACO\b': 'acondicionador', r'\bSH\b': 'shampoo',         
-        r'\bMATIF\b': 'matificante', r'\bSPY\b': 'spray', r'\bCOMP\b': 'comprimidos',
-        r'\bSHA\b': 'shampoo', r'\bCEP\b': 'cepillo', r'\bDEN\b': 'dental',
-        r'\bDENT\b': 'dental', r'\bTOA\b': 'toalla', r'\bUF\b': 'ultra fina',
-        r'\bC/A\b': 'con alas', r'\bS/A\b': 'sin alas', r'\bJAB\b': 'jabon',
-        r'\bOFT\b': 'oftalmica', r'\bPED\b': 'pediatrico', r'\bOSC\b': 'oscuro'           
-    }
-    for patron, palabra_real in traducciones.items():
-        nombre_limpio = re.sub(patron, palabra_real, nombre_limpio, flags=re.IGNORECASE)
+    nombre_limpio = EXPANDIR_BUSQUEDA(nombre_limpio)
         
     basura_conectora = r'\b(X|x|PARA|EL|LA|LOS|LAS|DE|CON)\b'
     nombre_limpio = re.sub(basura_conectora, '', nombre_limpio, flags=re.IGNORECASE)
@@ -1,11 +1,100 @@
+import os
 import math
+import json
+import hashlib
+import numpy as np
 
 # ==========================================
 # 💸 COMISIONES OCULTAS (El costo de vender)
 # ==========================================
 COMISION_MP = 0.045      # ~4.5% MercadoPago (Comisión + IVA)
 COMISION_SHOPIFY = 0.02  # 2.0% Shopify (Comisión por usar pasarela externa en plan Basic)
-COMISION_TOTAL = COMISION_MP + COMISION_SHOPIFY # Total: 6.5% 
+COMISION_TOTAL = COMISION_MP + COMISION_SHOPIFY # Total: 6.5%
+
+IVA = 1.19
+
+# ==========================================
+# 🧱 LA MURALLA DE TITANIO (Márgenes ajustados para absorber envío)
+# ==========================================
+# 🚚 SUBSIDIO: Subimos los factores para recuperar la pérdida de $2.380 del Courier
+# (tope del costo con IVA, factor_piso) — se evalúan en orden
+TRAMOS_PISO = [
+    (3000, 1.65),          # Antes 1.55 (+10% para recuperar más plata en productos baratos)
+    (15000, 1.52),         # Antes 1.45 (+7% absorbe el golpe sin espantar al cliente)
+    (float("inf"), 1.40),  # Antes 1.35 (+5% en productos caros suma muchos pesos reales)
+]
+
+# Subimos el factor de monopolio de 1.60 a 1.65 para que coincida con la nueva estrategia
+FACTOR_MONOPOLIO = 1.65
+
+# Nos ponemos 2% más baratos que la mediana del mercado
+DESCUENTO_FRANCOTIRADOR = 0.98
+
+# ==========================================
+# 🏷️ VERSIONADO DE REGLAS
+# ==========================================
+# Cada SKU cae en UNA ruta (mercado / monopolio) y, si es mercado, en UN tramo del piso.
+# Su huella de regla solo incluye lo que de verdad usa: tocar el tramo ≤3000 no cambia
+# la huella de los demás (ni la de los monopolio, que no usan el piso).
+RUTA_MERCADO = "mercado"
+RUTA_MONOPOLIO = "monopolio"
+
+# 🏬 Ajustes de una tienda secundaria (sync.py tiendas): las claves de reglas_vigentes()
+# que cambian para esa tienda, como JSON. Cada tienda corre en su propio proceso.
+AJUSTES_TIENDA = json.loads(os.getenv("SYNC_REGLAS_PRECIO") or "{}")
+
+def reglas_vigentes():
+    """Las reglas de precio actuales como dict (las constantes de arriba + ajustes de la tienda)."""
+    reglas = {
+        "iva": IVA,
+        "comision_mp": COMISION_MP,
+        "comision_shopify": COMISION_SHOPIFY,
+        "tramos_piso": [list(t) for t in TRAMOS_PISO],
+        "factor_monopolio": FACTOR_MONOPOLIO,
+        "descuento_francotirador": DESCUENTO_FRANCOTIRADOR,
+    }
+    reglas.update(AJUSTES_TIENDA)
+    return reglas
+
+def version_regla(reglas, tramo, ruta):
+    """Huella corta de la parte de las reglas que usa un SKU de ese tramo y ruta."""
+    partes = [reglas["iva"], reglas["comision_mp"] + reglas["comision_shopify"], ruta]
+    if ruta == RUTA_MONOPOLIO:
+        partes.append(reglas["factor_monopolio"])
+    else:
+        tramos = reglas["tramos_piso"]
+        desde = tramos[tramo - 1][0] if tramo > 0 else 0
+        partes += [reglas["descuento_francotirador"], desde, tramos[tramo][0], tramos[tramo][1]]
+    return hashlib.sha1(json.dumps(partes).encode("utf-8")).hexdigest()[:10]
+
+def _preparar(costos_netos_mediven, medianas, tiene_datos, reglas):
+    costos = np.asarray(costos_netos_mediven, dtype=float)
+    medianas = np.asarray(medianas, dtype=float)
+    if tiene_datos is None:
+        tiene_datos = ~np.isnan(medianas)
+    tiene_datos = np.asarray(tiene_datos, dtype=bool)
+    costo_con_iva = costos * reglas["iva"]
+
+    # Índice del tramo de la MURALLA DE TITANIO (se evalúan en orden)
+    tramos = reglas["tramos_piso"]
+    tramo = np.select(
+        [costo_con_iva <= tope for tope, _ in tramos],
+        list(range(len(tramos))),
+        default=len(tramos) - 1,
+    )
+    mercado_valido = tiene_datos & ~np.isnan(medianas) & (medianas != 0)
+    return costo_con_iva, medianas, tiene_datos, tramo, mercado_valido
+
+def versiones_de_regla(costos_netos_mediven, medianas, tiene_datos=None, reglas=None):
+    """Huella de regla por SKU (ver version_regla), en lote."""
+    reglas = reglas or reglas_vigentes()
+    _, _, _, tramo, mercado_valido = _preparar(costos_netos_mediven, medianas, tiene_datos, reglas)
+    n_tramos = len(reglas["tramos_piso"])
+    tabla = np.array(
+        [version_regla(reglas, t, ruta) for ruta in (RUTA_MONOPOLIO, RUTA_MERCADO) for t in range(n_tramos)],
+        dtype=object,
+    )
+    return tabla[mercado_valido.astype(int) * n_tramos + tramo]
 
 def redondear_precio_bonito(precio):
     """
@@ -16,47 +105,111 @@ def redondear_precio_bonito(precio):
         return 0
     return int(math.ceil(precio / 100.0) * 100)
 
-def calcular_precio_final(costo_neto_mediven, datos_mercado_sku):
+def redondear_precios_bonitos(precios):
     """
-    El Cerebro Financiero.
-    Retorna: (precio_venta, estrategia_utilizada)
+    Versión vectorizada de redondear_precio_bonito (arrays de NumPy/pandas).
     """
-    # 1. Calcular el Costo Real con IVA
-    costo_con_iva = costo_neto_mediven * 1.19
-    
-    # 2. LA MURALLA DE TITANIO (Márgenes ajustados para absorber envío)
-    # 🚚 SUBSIDIO: Subimos los factores para recuperar la pérdida de $2.380 del Courier
-    if costo_con_iva <= 3000:
-        factor_piso = 1.65  # Antes 1.55 (+10% para recuperar más plata en productos baratos)
-    elif costo_con_iva <= 15000:
-        factor_piso = 1.52  # Antes 1.45 (+7% absorbe el golpe sin espantar al cliente)
-    else:
-        factor_piso = 1.40  # Antes 1.35 (+5% en productos caros suma muchos pesos reales)
-        
-    # El precio piso ahora te protege descontando el 6.5% de TODAS las pasarelas juntas
-    precio_piso = (costo_con_iva * factor_piso) / (1 - COMISION_TOTAL)
+    precios = np.asarray(precios, dtype=float)
+    return np.where(precios <= 0, 0, np.ceil(precios / 100.0) * 100).astype(np.int64)
 
-    # 3. EVALUACIÓN DEL MERCADO
+def leer_mediana_mercado(datos_mercado_sku):
+    """
+    Extrae la mediana competitiva de una entrada de precios_mercado.json.
+    Retorna: (tiene_datos, mediana) — mediana es NaN si no sirve.
+    """
     if not datos_mercado_sku or not datos_mercado_sku.get("datos_mercado"):
-        # Subimos el factor de monopolio de 1.60 a 1.65 para que coincida con la nueva estrategia
-        precio_final = (costo_con_iva * 1.65) / (1 - COMISION_TOTAL)
-        return redondear_precio_bonito(precio_final), "Monopolio (Sin datos)"
-        
+        return False, np.nan
+
     # 🛡️ ESCUDO DEFENSIVO: Evitamos el KeyError si el JSON viene corrupto o vacío
     datos_mercado = datos_mercado_sku.get("datos_mercado", {})
     mercado_justo = datos_mercado.get("mediana_competitiva")
+    return True, (float(mercado_justo) if mercado_justo else np.nan)
 
-    # Si el espía falló y no existe el dato de la mediana, activamos el plan de contingencia
-    if not mercado_justo:
-        precio_final = (costo_con_iva * 1.65) / (1 - COMISION_TOTAL)
-        return redondear_precio_bonito(precio_final), "Monopolio (Datos corruptos)"
-
-    # 4. LA DECISIÓN
-    if mercado_justo <= precio_piso:
-        return redondear_precio_bonito(precio_piso), "Muralla de Rescate"
-        
-    # Nos ponemos 2% más baratos, pero siempre validando no romper el piso
-    precio_estrategico = mercado_justo * 0.98
-    precio_final = max(precio_piso, precio_estrategico)
-    
-    return redondear_precio_bonito(precio_final), "Francotirador"
+def medianas_de_mercado(skus, precios_mercado):
+    """
+    Arma los arrays (tiene_datos, medianas) de una lista de SKUs para calcular_precios_lote.
+    """
+    lecturas = [leer_mediana_mercado(precios_mercado.get(sku)) for sku in skus]
+    tiene_datos = np.fromiter((t for t, _ in lecturas), dtype=bool, count=len(lecturas))
+    medianas = np.fromiter((m for _, m in lecturas), dtype=float, count=len(lecturas))
+    return tiene_datos, medianas
+
+def calcular_precios_lote(costos_netos_mediven, medianas, tiene_datos=None, reglas=None):
+    """
+    El Cerebro Financiero, en lote: reprecia todo el catálogo en una sola pasada.
+    costos_netos_mediven: costos netos Mediven.
+    medianas: mediana_competitiva por SKU (NaN si no hay dato usable).
+    tiene_datos: True si el SKU tenía bloque datos_mercado (por defecto, donde hay mediana).
+    reglas: dict como reglas_vigentes() (por defecto, las constantes del módulo).
+    Retorna: (precios_venta, estrategias_utilizadas)
+    """
+    reglas = reglas or reglas_vigentes()
+    comision_total = reglas["comision_mp"] + reglas["comision_shopify"]
+
+    # 1. Calcular el Costo Real con IVA (y el tramo de cada SKU)
+    costo_con_iva, medianas, tiene_datos, tramo, mercado_valido = _preparar(
+        costos_netos_mediven, medianas, tiene_datos, reglas
+    )
+
+    # 2. LA MURALLA DE TITANIO
+    factor_piso = np.array([factor for _, factor in reglas["tramos_piso"]], dtype=float)[tramo]
+
+    # El precio piso ahora te protege descontando el 6.5% de TODAS las pasarelas juntas
+    precio_piso = (costo_con_iva * factor_piso) / (1 - comision_total)
+    precio_monopolio = (costo_con_iva * reglas["factor_monopolio"]) / (1 - comision_total)
+
+    # 3. EVALUACIÓN DEL MERCADO (sin mediana => plan de contingencia monopolio)
+    rescate = mercado_valido & (medianas <= precio_piso)
+
+    # 4. LA DECISIÓN: 2% más baratos, pero siempre validando no romper el piso
+    precio_estrategico = np.maximum(precio_piso, medianas * reglas["descuento_francotirador"])
+    precio_final = np.where(
+        mercado_valido,
+        np.where(rescate, precio_piso, precio_estrategico),
+        precio_monopolio,
+    )
+
+    estrategias = np.select(
+        [~tiene_datos, ~mercado_valido, rescate],
+        ["Monopolio (Sin datos)", "Monopolio (Datos corruptos)", "Muralla de Rescate"],
+        default="Francotirador",
+    ).astype(object)
+
+    return redondear_precios_bonitos(precio_final), estrategias
+
+# ==========================================
+# 🎯 IMPACTO DE UNA ESCRITURA (PRIORIDAD)
+# ==========================================
+def puntajes_de_impacto(precios_actuales, precios_nuevos, costos_netos_mediven, reglas=None):
+    """
+    Cuánto vale aplicar cada cambio de precio, para escribir primero lo importante.
+    impacto = |precio_nuevo - precio_actual| × riesgo de margen, donde el riesgo va de
+    1 (margen actual sano) a 3 (vendiendo muy bajo el costo real).
+    Retorna: (impactos, bajo_costo) — bajo_costo: hoy se vende bajo el costo real
+    (costo con IVA + comisiones) y la escritura lo corrige.
+    """
+    reglas = reglas or reglas_vigentes()
+    comision_total = reglas["comision_mp"] + reglas["comision_shopify"]
+
+    actuales = np.asarray(precios_actuales, dtype=float)
+    delta = np.abs(np.asarray(precios_nuevos, dtype=float) - actuales)
+    costo_con_iva = np.asarray(costos_netos_mediven, dtype=float) * reglas["iva"]
+
+    # Lo que de verdad llega a caja con el precio de hoy
+    neto_actual = actuales * (1 - comision_total)
+    con_costo = costo_con_iva > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margen = np.where(neto_actual > 0, 1 - costo_con_iva / neto_actual, -np.inf)
+    riesgo = np.where(con_costo, np.clip(2 - margen, 1, 3), 1.0)
+
+    bajo_costo = con_costo & (neto_actual < costo_con_iva) & (delta >= 1)
+    return np.round(delta * riesgo).astype(np.int64), bajo_costo
+
+def calcular_precio_final(costo_neto_mediven, datos_mercado_sku):
+    """
+    El Cerebro Financiero (un SKU). Envoltorio de calcular_precios_lote.
+    Retorna: (precio_venta, estrategia_utilizada)
+    """
+    tiene_datos, mediana = leer_mediana_mercado(datos_mercado_sku)
+    precios, estrategias = calcular_precios_lote([costo_neto_mediven], [mediana], [tiene_datos])
+    return int(precios[0]), str(estrategias[0])
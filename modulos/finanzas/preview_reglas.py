@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import numpy as np
+
+from modulos.finanzas.precios import (
+    reglas_vigentes, versiones_de_regla, calcular_precios_lote, RUTA_MERCADO, RUTA_MONOPOLIO
+)
+from modulos.nucleo.sync_huellas import cargar_decisiones
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+console = Console()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ARCHIVO_DECISIONES = os.path.join(BASE_DIR, "data", "decisiones_precios.json")
+ARCHIVO_MEMORIA = os.path.join(BASE_DIR, "data", "memoria_precios.json")
+
+# ==========================================
+# 🔮 PREVIEW DE CAMBIO DE REGLAS
+# ==========================================
+# Compara la decisión guardada de cada SKU (regla + costo + mediana + precio) contra
+# las reglas actuales de precios.py (o con ajustes --set / --tramo) y cuenta cuántos
+# precios se escribirían en Shopify. No toca Shopify ni la red.
+
+def aplicar_ajustes(reglas, argv):
+    """
+    --set clave=valor    → ej: --set comision_mp=0.05 --set factor_monopolio=1.70
+    --tramo N=factor     → ej: --tramo 0=1.70 (solo el factor del tramo N, desde 0)
+    """
+    reglas = json.loads(json.dumps(reglas))
+    for i, arg in enumerate(argv):
+        if arg not in ("--set", "--tramo") or i + 1 >= len(argv):
+            continue
+        clave, _, valor = argv[i + 1].partition("=")
+        if arg == "--set":
+            if clave not in reglas or clave == "tramos_piso":
+                raise ValueError(f"Regla desconocida para --set: {clave!r}")
+            reglas[clave] = float(valor)
+        else:
+            reglas["tramos_piso"][int(clave)][1] = float(valor)
+    return reglas
+
+def previsualizar(reglas, decisiones, memoria_precios):
+    """
+    Retorna (filas, totales): por tramo/ruta cuántos SKUs cambian de regla, cuántos
+    precios se escribirían y cuántos de esos están protegidos por precio manual.
+    """
+    skus = list(decisiones)
+    if not skus:
+        return [], {"skus": 0, "afectados": 0, "escrituras": 0, "protegidos": 0}
+
+    regla_guardada = np.array([decisiones[s][0] for s in skus], dtype=object)
+    costos = np.array([decisiones[s][1] for s in skus], dtype=float)
+    medianas = np.array([np.nan if decisiones[s][2] is None else decisiones[s][2] for s in skus], dtype=float)
+    precio_guardado = np.array([decisiones[s][3] for s in skus], dtype=float)
+    tiene_datos = ~np.isnan(medianas)
+
+    con_costo = costos > 0
+    regla_nueva = np.where(con_costo, versiones_de_regla(costos, medianas, tiene_datos, reglas), "").astype(object)
+    afectados = regla_nueva != regla_guardada
+
+    precio_nuevo = precio_guardado.copy()
+    recalcular = afectados & con_costo
+    if recalcular.any():
+        precios, _ = calcular_precios_lote(costos[recalcular], medianas[recalcular], tiene_datos[recalcular], reglas)
+        precio_nuevo[recalcular] = precios
+    escrituras = afectados & (np.abs(precio_nuevo - precio_guardado) >= 1)
+
+    # Si la memoria guarda otro precio que el del robot, ese SKU quedó con precio manual
+    memoria = np.array([memoria_precios.get(s, np.nan) for s in skus], dtype=float)
+    protegidos = escrituras & ~np.isnan(memoria) & (np.abs(memoria - precio_guardado) > 1)
+
+    # Desglose por ruta y tramo (con las reglas nuevas)
+    costo_con_iva = costos * reglas["iva"]
+    topes = [tope for tope, _ in reglas["tramos_piso"]]
+    tramo = np.searchsorted(np.array(topes, dtype=float), costo_con_iva, side="left").clip(0, len(topes) - 1)
+    mercado = tiene_datos & (medianas != 0)
+
+    filas = []
+    for ruta, mascara_ruta in ((RUTA_MERCADO, mercado), (RUTA_MONOPOLIO, ~mercado)):
+        for t, tope in enumerate(topes):
+            m = con_costo & mascara_ruta & (tramo == t)
+            if not m.any():
+                continue
+            delta = precio_nuevo[m & escrituras] - precio_guardado[m & escrituras]
+            filas.append({
+                "ruta": ruta,
+                "tramo": f"≤{tope:,.0f}" if np.isfinite(tope) else f">{topes[t - 1]:,.0f}",
+                "skus": int(m.sum()),
+                "afectados": int((m & afectados).sum()),
+                "escrituras": int((m & escrituras).sum()),
+                "protegidos": int((m & protegidos).sum()),
+                "delta_promedio": float(delta.mean()) if len(delta) else 0.0,
+            })
+
+    totales = {
+        "skus": len(skus),
+        "afectados": int(afectados.sum()),
+        "escrituras": int(escrituras.sum()),
+        "protegidos": int(protegidos.sum()),
+    }
+    return filas, totales
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    console.print(Panel.fit("🔮 [bold cyan]PREVIEW DE CAMBIO EN REGLAS DE PRECIO[/bold cyan]"))
+
+    decisiones = cargar_decisiones(ARCHIVO_DECISIONES)
+    if not decisiones:
+        console.print("[red]❌ No hay data/decisiones_precios.json. Corre una sincronización primero.[/red]")
+        return None
+
+    memoria_precios = {}
+    if os.path.exists(ARCHIVO_MEMORIA):
+        with open(ARCHIVO_MEMORIA, "r", encoding="utf-8") as f:
+            memoria_precios = json.load(f)
+
+    reglas = aplicar_ajustes(reglas_vigentes(), argv)
+    filas, totales = previsualizar(reglas, decisiones, memoria_precios)
+
+    tabla = Table(title="Impacto por ruta y tramo")
+    for col in ["Ruta", "Tramo", "SKUs", "Regla cambió", "Escrituras", "Protegidos (manual)", "Δ promedio"]:
+        tabla.add_column(col, justify="right" if col not in ("Ruta", "Tramo") else "left")
+    for f in filas:
+        tabla.add_row(
+            f["ruta"], f["tramo"], str(f["skus"]), str(f["afectados"]), str(f["escrituras"]),
+            str(f["protegidos"]), f"${f['delta_promedio']:+,.0f}",
+        )
+    console.print(tabla)
+
+    console.print(Panel.fit(
+        f"[bold]SKUs con decisión guardada:[/bold] {totales['skus']}\n"
+        f"[bold yellow]Regla distinta (se recalculan):[/bold yellow] {totales['afectados']}\n"
+        f"[bold red]Escrituras de precio en Shopify:[/bold red] {totales['escrituras'] - totales['protegidos']}"
+        f"  [dim](+{totales['protegidos']} con precio manual que no se tocan)[/dim]",
+        title="📊 RESUMEN", style="magenta",
+    ))
+    return totales
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import subprocess
 from dotenv import load_dotenv
 # Importamos la función de búsqueda que ya construiste en tu espía principal
 from modulos.finanzas.espia_precios import buscar_precio_competencia 
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
 
 from rich.console import Console
 from rich.panel import Panel
@@ -17,7 +18,8 @@ load_dotenv(os.path.join(BASE_DIR, ".env"))
 ARCHIVO_MEDIVEN = os.path.join(BASE_DIR, "mediven_full.json")
 ARCHIVO_MERCADO = os.path.join(BASE_DIR, "data", "precios_mercado.json")
 
-def ejecutar_repesca_diaria():
+def ejecutar_repesca_diaria(hasta=None, cancelar=None):
+    """cancelar: Event de sync.py (corre junto a la descarga de Shopify); si se activa, se guarda y se corta."""
     console.print(Panel.fit("🔍 [bold cyan]INICIANDO MINI-ESPÍA (REPESCA DE PRECIOS)[/bold cyan]"))
     
     if not os.path.exists(ARCHIVO_MEDIVEN):
@@ -53,7 +55,15 @@ def ejecutar_repesca_diaria():
     nuevos_precios = 0
     from datetime import datetime
     
-    for p in productos_a_espiar:
+    for idx, p in enumerate(productos_a_espiar):
+        # ⏱️ Se acabó el tiempo de esta etapa: lo espiado hasta aquí se guarda abajo
+        if vencido(hasta):
+            registrar_diferido("espia", len(productos_a_espiar) - idx)
+            break
+        if cancelar is not None and cancelar.is_set():
+            console.print("[yellow]🛑 Mini-Espía cortado: falló otra descarga. Se guarda lo espiado.[/yellow]")
+            break
+
         sku = str(p.get("Codigo", ""))
         nombre = p.get("Descripcion", "")
         # 🎯 INYECTAMOS EL LABORATORIO PARA MÁXIMA PRECISIÓN
@@ -6,9 +6,7 @@ import json
 import time
 from dotenv import load_dotenv
 
-from google import genai
-from google.genai import types
-from google.genai.errors import APIError
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
 
 # ==========================================
 # CONFIGURACIÓN E INICIALIZACIÓN
@@ -16,16 +14,22 @@ from google.genai.errors import APIError
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_API_KEY:
-    print("❌ Falta GEMINI_API_KEY en el archivo .env")
-    exit(1)
+# google.genai tarda casi un segundo en importarse: el cliente se arma recién
+# cuando se genera el primer texto (importar este módulo no exige la API key)
+_cliente = {"gemini": None}
 
-# 🔥 SOLUCIÓN: Añadimos un timeout explícito de 60 segundos (60000 ms)
-# Si Google no responde en 60 segundos, la conexión se corta para no colgar el servidor.
-client = genai.Client(
-    api_key=GEMINI_API_KEY,
-    http_options=types.HttpOptions(timeout=60000)
-)
+def obtener_cliente():
+    if _cliente["gemini"] is None:
+        from google import genai
+        from google.genai import types
+
+        # 🔥 SOLUCIÓN: Añadimos un timeout explícito de 60 segundos (60000 ms)
+        # Si Google no responde en 60 segundos, la conexión se corta para no colgar el servidor.
+        _cliente["gemini"] = genai.Client(
+            api_key=GEMINI_API_KEY,
+            http_options=types.HttpOptions(timeout=60000)
+        )
+    return _cliente["gemini"]
 
 ARCHIVO_ENTRADA = "mediven_full.json"
 ARCHIVO_DICCIONARIO = "data/diccionario_ia.json"
@@ -35,6 +39,10 @@ LIMITE_PRUEBA = None
 # FUNCIÓN DE LLAMADA A LA IA CON ESQUEMA ESTRICTO
 # ==========================================
 def generar_explicacion_ia(datos_producto, reintentos_max=3):
+    from google.genai import types
+    from google.genai.errors import APIError
+
+    client = obtener_cliente()
     # Aquí va tu Súper Prompt exacto
     prompt = f"""
     Eres un experto Químico Farmacéutico y redactor de e-commerce para "Farmacias LF" en Chile.
@@ -120,11 +128,16 @@ def generar_explicacion_ia(datos_producto, reintentos_max=3):
 # ==========================================
 # FUNCIÓN PRINCIPAL
 # ==========================================
-def main():
+def main(hasta=None, solo_skus=None):
+    """solo_skus: modo --skus de sync.py, regenera solo esos (aunque ya estén en el diccionario)."""
     print("==================================================")
     print("🧠 INICIANDO MOTOR DE CONTENIDO IA (VERSIÓN PRODUCTOS) 🧠")
     print("==================================================\n")
 
+    if not GEMINI_API_KEY:
+        print("❌ Falta GEMINI_API_KEY en el archivo .env")
+        return
+
     os.makedirs("data", exist_ok=True)
 
     if not os.path.exists(ARCHIVO_ENTRADA):
@@ -147,7 +160,10 @@ def main():
     faltantes = []
     for p in productos:
         codigo = str(p.get("Codigo", "")).strip()
-        if codigo and codigo not in diccionario:
+        if solo_skus is not None:
+            if codigo in solo_skus:
+                faltantes.append(p)
+        elif codigo and codigo not in diccionario:
             faltantes.append(p)
 
     print(f"🚀 Productos NUEVOS por procesar: {len(faltantes)}\n")
@@ -163,6 +179,11 @@ def main():
     nuevos_generados = 0
 
     for idx, producto in enumerate(faltantes, 1):
+        # ⏱️ Cada producto ya quedó guardado en el diccionario; el resto sigue mañana
+        if vencido(hasta):
+            registrar_diferido("ia", len(faltantes) - idx + 1)
+            break
+
         codigo = str(producto.get("Codigo", "")).strip()
         nombre_original = producto.get("Descripcion", "")
         nombre_corto = nombre_original[:40] + "..." if len(nombre_original) > 40 else nombre_original
@@ -1,9 +1,10 @@
-import shopify
 import json
 import os
 import time
 from dotenv import load_dotenv
 
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
+
 load_dotenv()
 
 # Configuración
@@ -13,12 +14,15 @@ PASSWORD = os.getenv("SHOPIFY_ADMIN_TOKEN")
 API_VERSION = '2024-01'
 ARCHIVO_DICCIONARIO = 'data/diccionario_ia.json'
 
+# La librería REST de Shopify se importa al conectar (pesa y solo la usa esta etapa)
 def conectar_shopify():
+    import shopify
     session = shopify.Session(SHOP_URL, API_VERSION, PASSWORD)
     shopify.ShopifyResource.activate_session(session)
     print(f"🔗 Conectado exitosamente a {SHOP_URL}")
 
 def actualizar_producto(sku, datos_ia):
+    import shopify
     try:
         query = f"""{{ productVariants(first: 1, query: "sku:{sku}") {{ edges {{ node {{ product {{ id handle }} }} }} }} }}"""
         result = shopify.GraphQL().execute(query)
@@ -54,7 +58,8 @@ def actualizar_producto(sku, datos_ia):
         print(f"\n❌ Error con SKU {sku}: {e}")
         return "ERROR"
 
-def main(skus_forzados=None):
+def main(skus_forzados=None, hasta=None, solo_skus=None):
+    """solo_skus: modo --skus de sync.py, sube solo esos (subidos o no)."""
     if skus_forzados is None:
         skus_forzados = []
         
@@ -74,7 +79,10 @@ def main(skus_forzados=None):
     # 🔥 FILTRO MÁGICO MEJORADO: Toma los no subidos + los que el orquestador forzó
     pendientes = {}
     for sku, datos in diccionario.items():
-        if not datos.get("subido_shopify", False) or sku in skus_forzados:
+        if solo_skus is not None:
+            if sku in solo_skus:
+                pendientes[sku] = datos
+        elif not datos.get("subido_shopify", False) or sku in skus_forzados:
             pendientes[sku] = datos
     
     total = len(pendientes)
@@ -88,6 +96,11 @@ def main(skus_forzados=None):
     errores = 0
 
     for i, (sku, datos) in enumerate(pendientes.items(), 1):
+        # ⏱️ Lo subido ya quedó marcado en el diccionario; el resto sigue en la próxima corrida
+        if vencido(hasta):
+            registrar_diferido("seo", total - i + 1)
+            break
+
         print(f"[{i}/{total}] Actualizando SKU {sku}...", end=" ", flush=True)
         
         resultado = actualizar_producto(sku, datos)
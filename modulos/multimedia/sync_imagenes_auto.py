@@ -8,8 +8,8 @@ import requests
 import time
 import io
 import base64
-from PIL import Image
 from modulos.nucleo.sync_diagnostico import shopify_graphql
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
 
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 DEFAULT_IMAGE_URL = os.getenv("SHOPIFY_DEFAULT_IMAGE_URL")
@@ -43,6 +43,8 @@ def buscar_imagen_serper(query):
 # PROCESAMIENTO DE IMAGEN (PILLOW 800x800)
 # ==========================================
 def descargar_y_estandarizar_imagen(url):
+    # Pillow solo hace falta si hay fotos que procesar
+    from PIL import Image
     try:
         headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
         r = requests.get(url, headers=headers, timeout=10)
@@ -109,7 +111,7 @@ def reemplazar_imagen_shopify(product_gid, url_nueva):
 # ==========================================
 # ORQUESTADOR DE REPESCA (CON CUARENTENA IA)
 # ==========================================
-def ejecutar_repesca_imagenes(df_shop, skus_forzados=None): 
+def ejecutar_repesca_imagenes(df_shop, skus_forzados=None, hasta=None): 
     if skus_forzados is None:
         skus_forzados = []
         
@@ -182,7 +184,11 @@ def ejecutar_repesca_imagenes(df_shop, skus_forzados=None):
         
     print(f"   🖼️ Procesando {len(lote)} imágenes en esta pasada...")
     
-    for p in lote:
+    for idx, p in enumerate(lote):
+        if vencido(hasta):
+            registrar_diferido("imagenes", len(lote) - idx)
+            break
+
         sku, titulo = p["sku"], p["product_title"]
         product_gid = f"gid://shopify/Product/{p['product_id']}"
         
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+# ============================
+# MOTOR ÚNICO DE ABREVIATURAS
+# ============================
+# Cada tabla se compila UNA vez en una sola expresión (alternación) y se
+# expande en una sola pasada con lookup en diccionario, en vez de hacer un
+# str.replace / re.sub por cada abreviatura.
+
+def _alternacion(claves):
+    # Las claves más largas primero para que "COMP" gane sobre "COM", etc.
+    return "|".join(re.escape(c) for c in sorted(claves, key=len, reverse=True))
+
+
+def compilar_expansor_tokens(tabla):
+    """
+    Tablas estilo {" ABREV ": " Reemplazo "} (claves rodeadas de espacios).
+    Da el mismo resultado que aplicar str.replace clave por clave:
+    una abreviatura repetida pegada a sí misma ("UN UN") se expande de por medio,
+    porque str.replace consume el espacio que comparten.
+    """
+    reemplazos = {}
+    for clave, valor in tabla.items():
+        if not (clave.startswith(" ") and clave.endswith(" ") and valor.startswith(" ") and valor.endswith(" ")):
+            raise ValueError(f"Entrada inválida en tabla de abreviaturas: {clave!r} -> {valor!r}")
+        reemplazos[clave[1:-1]] = valor[1:-1]
+
+    patron = re.compile(rf"(?<= )(?:{_alternacion(reemplazos)})(?= )")
+
+    def expandir(texto):
+        ultimo = [None, -2]  # [abreviatura expandida, posición donde terminó]
+
+        def reemplazar(m):
+            token = m.group()
+            if token == ultimo[0] and m.start() == ultimo[1] + 1:
+                return token
+            ultimo[0], ultimo[1] = token, m.end()
+            return reemplazos[token]
+
+        return patron.sub(reemplazar, texto)
+
+    return expandir
+
+
+def compilar_expansor_palabras(tabla):
+    """
+    Tablas estilo {"ABREV": "reemplazo"} con límite de palabra (\\b) y sin
+    distinguir mayúsculas, equivalente a un re.sub(r'\\bABREV\\b', ...) por clave.
+    """
+    reemplazos = {clave.upper(): valor for clave, valor in tabla.items()}
+    patron = re.compile(rf"\b(?:{_alternacion(reemplazos)})\b", flags=re.IGNORECASE)
+
+    def expandir(texto):
+        return patron.sub(lambda m: reemplazos[m.group().upper()], texto)
+
+    return expandir
@@ -3,16 +3,58 @@
 
 # 🔌 Importamos la conexión centralizada desde el diagnóstico
 from modulos.nucleo.sync_diagnostico import shopify_graphql
+from modulos.nucleo.sync_bulk import ejecutar_bulk_mutation
+from modulos.nucleo.sync_estrategia import RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK, TAMANO_ALIAS, COSTO_MUTACION
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
+
+MUTACION_BASICOS_BULK = """
+mutation basicos($input: ProductInput!) {
+  productUpdate(input: $input) { product { id } userErrors { field message } }
+}
+"""
+
+MUTACION_PRECIOS = """
+mutation updateProductVariants($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+  productVariantsBulkUpdate(
+    productId: $productId,
+    variants: $variants,
+    allowPartialUpdates: true
+  ) {
+    productVariants {
+      id
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+"""
 
 # ============================
 # ACTUALIZACIÓN MASIVA DE BÁSICOS (TÍTULO Y REACTIVACIÓN)
 # ============================
-def bulk_update_product_basics(productos_a_actualizar):
+def bulk_update_product_basics(productos_a_actualizar, ruta=RUTA_ALIAS, hasta=None):
     if not productos_a_actualizar:
         return
     print(f"📝 Actualizando nombres/estado de {len(productos_a_actualizar)} productos...")
-    BATCH = 50
+
+    if ruta == RUTA_BULK and not vencido(hasta):
+        lineas = [
+            {"input": {"id": f"gid://shopify/Product/{p['product_id']}", "title": p["Descripcion"], "status": "ACTIVE"}}
+            for p in productos_a_actualizar
+        ]
+        if ejecutar_bulk_mutation(MUTACION_BASICOS_BULK, lineas, "productUpdate", contexto="bulk_update_basics") is not None:
+            print("✅ Títulos y estados actualizados.")
+            return
+        print("↩️ Bulk no disponible → se sigue con alias.")
+
+    BATCH = 1 if ruta == RUTA_POR_PRODUCTO else TAMANO_ALIAS
     for i in range(0, len(productos_a_actualizar), BATCH):
+        if vencido(hasta):
+            resto = productos_a_actualizar[i:]
+            registrar_diferido("basicos", len(resto), [p["SKU"] for p in resto])
+            break
         batch = productos_a_actualizar[i:i+BATCH]
         alias_bodies = []
         for idx, p in enumerate(batch):
@@ -25,7 +67,7 @@ def bulk_update_product_basics(productos_a_actualizar):
             )
         
         mutation = "mutation { " + "\n".join(alias_bodies) + " }"
-        shopify_graphql(mutation, contexto="bulk_update_basics")
+        shopify_graphql(mutation, contexto="bulk_update_basics", costo=COSTO_MUTACION * len(alias_bodies))
         print(f"   → {min(i+BATCH, len(productos_a_actualizar))} procesados...", end="\r")
     print("\n✅ Títulos y estados actualizados.")
 
@@ -33,7 +75,47 @@ def bulk_update_product_basics(productos_a_actualizar):
 # ============================
 # GRAPHQL BULK (MANTENIDO ORIGINAL)
 # ============================
-def graphql_bulk_update_variants(variantes):
+def _diferir_precios(grupos):
+    filas = [v for _, group in grupos for v in group]
+    registrar_diferido("precios", len(filas), [v["SKU"] for v in filas])
+
+def _precios_por_alias(productos, hasta=None):
+    """productVariantsBulkUpdate de TAMANO_ALIAS productos por request (inputs en línea)."""
+    ok, err = 0, 0
+    items = list(productos.items())
+    total_batches = (len(items) + TAMANO_ALIAS - 1) // TAMANO_ALIAS
+
+    for b, i in enumerate(range(0, len(items), TAMANO_ALIAS), 1):
+        if vencido(hasta):
+            _diferir_precios(items[i:])
+            break
+        lote = items[i:i + TAMANO_ALIAS]
+        alias_bodies = []
+        for idx, (pid, group) in enumerate(lote):
+            variantes_gql = ", ".join(
+                f'{{ id: "gid://shopify/ProductVariant/{v["variant_id"]}", price: "{v["Nuevo_Precio"]}" }}'
+                for v in group
+            )
+            alias_bodies.append(
+                f'p{idx}: productVariantsBulkUpdate(productId: "gid://shopify/Product/{pid}", '
+                f'variants: [{variantes_gql}], allowPartialUpdates: true) {{ userErrors {{ field message }} }}'
+            )
+
+        r = shopify_graphql(
+            "mutation { " + "\n".join(alias_bodies) + " }",
+            contexto="bulk_variant_update_alias", costo=COSTO_MUTACION * len(alias_bodies)
+        )
+        bloque = (r or {}).get("data") or {}
+        for idx, (_, group) in enumerate(lote):
+            resultado = bloque.get(f"p{idx}")
+            if not resultado or resultado.get("userErrors"):
+                err += len(group)
+            else:
+                ok += len(group)
+        print(f"\r📦 Lote {b}/{total_batches} — {round(b / total_batches * 100, 1)}%", end="", flush=True)
+    return ok, err
+
+def graphql_bulk_update_variants(variantes, ruta=RUTA_POR_PRODUCTO, hasta=None):
     print("=== INICIO (ACTUALIZAR PRECIOS) ===")
 
     variantes = [v for v in variantes if "Nuevo_Precio" in v]
@@ -50,12 +132,48 @@ def graphql_bulk_update_variants(variantes):
         productos[pid].append(v)
 
     total_batches = len(productos)
+
+    # ⏱️ Sin tiempo ni para empezar: todo queda para la próxima corrida
+    if vencido(hasta):
+        _diferir_precios(productos.items())
+        return {"ok": 0, "errores": 0}
+
+    if ruta == RUTA_BULK:
+        lineas = [
+            {
+                "productId": f"gid://shopify/Product/{pid}",
+                "variants": [
+                    {"id": f"gid://shopify/ProductVariant/{v['variant_id']}", "price": str(v["Nuevo_Precio"])}
+                    for v in group
+                ],
+            }
+            for pid, group in productos.items()
+        ]
+        # Una fila por producto: el resultado cuenta productos, no variantes
+        r = ejecutar_bulk_mutation(MUTACION_PRECIOS, lineas, "productVariantsBulkUpdate", contexto="bulk_variant_update")
+        if r is not None:
+            return r
+        print("↩️ Bulk no disponible → se sigue con alias.")
+        ruta = RUTA_ALIAS
+
+    if ruta == RUTA_ALIAS:
+        print(f"🔁 Ejecutando {total_batches} actualizaciones en lotes de {TAMANO_ALIAS} productos...")
+        ok_global, err_global = _precios_por_alias(productos, hasta)
+        print("\n\n=== RESULTADO FINAL ===")
+        print(f"✔ Variantes actualizadas correctamente: {ok_global}")
+        print(f"❌ Variantes con error: {err_global}")
+        return {"ok": ok_global, "errores": err_global}
+
     print(f"🔁 Ejecutando {total_batches} actualizaciones por producto...")
 
     ok_global = 0
     err_global = 0
 
-    for idx, (pid, group) in enumerate(productos.items(), 1):
+    items = list(productos.items())
+    for idx, (pid, group) in enumerate(items, 1):
+        if vencido(hasta):
+            _diferir_precios(items[idx - 1:])
+            break
         product_gid = f"gid://shopify/Product/{pid}"
 
         variants_payload = [
@@ -66,30 +184,12 @@ def graphql_bulk_update_variants(variantes):
             for v in group
         ]
 
-        mutation = """
-        mutation updateProductVariants($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
-          productVariantsBulkUpdate(
-            productId: $productId,
-            variants: $variants,
-            allowPartialUpdates: true
-          ) {
-            productVariants {
-              id
-            }
-            userErrors {
-              field
-              message
-            }
-          }
-        }
-        """
-
         variables = {
             "productId": product_gid,
             "variants": variants_payload
         }
 
-        r = shopify_graphql(mutation, variables, contexto="bulk_variant_update")
+        r = shopify_graphql(MUTACION_PRECIOS, variables, contexto="bulk_variant_update")
 
         if not r or "data" not in r:
             err_global += len(group)
@@ -113,7 +213,7 @@ def graphql_bulk_update_variants(variantes):
 # ============================
 # QUITAR IMPUESTOS MASIVAMENTE
 # ============================
-def quitar_impuestos_graphql(variantes_malas):
+def quitar_impuestos_graphql(variantes_malas, hasta=None):
     if not variantes_malas: return 0, 0
     productos = {}
     for v in variantes_malas:
@@ -122,7 +222,10 @@ def quitar_impuestos_graphql(variantes_malas):
         productos[pid].append(v)
 
     ok_g, err_g = 0, 0
-    for pid, group in productos.items():
+    for idx, (pid, group) in enumerate(productos.items()):
+        if vencido(hasta):
+            registrar_diferido("impuestos", len(productos) - idx)
+            break
         product_gid = f"gid://shopify/Product/{pid}"
         variants_payload = [{"id": f"gid://shopify/ProductVariant/{v['variant_id']}", "taxable": False} for v in group]
         
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+# ============================
+# AMORTIGUADOR DE ARCHIVADO (ANTI-PARPADEO)
+# ============================
+# Hay SKUs que desaparecen un día del feed de Mediven y vuelven al siguiente.
+# Sin esto, cada vuelta es archivar + reactivar (2 mutaciones y la ficha parpadea).
+# Un SKU que falta solo se archiva tras AUSENCIAS_PARA_ARCHIVAR corridas seguidas sin aparecer.
+# Los excluidos/prohibidos se archivan al tiro (no es un parpadeo, es una decisión).
+ARCHIVO_AUSENCIAS = os.path.join("data", "historial_ausencias.json")
+AUSENCIAS_PARA_ARCHIVAR = int(os.getenv("AUSENCIAS_PARA_ARCHIVAR", "3"))
+
+MOTIVO_AUSENTE = "No existe en Mediven"
+
+def cargar_historial_ausencias(ruta=ARCHIVO_AUSENCIAS):
+    """Retorna {sku: corridas seguidas sin aparecer en Mediven}."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print("⚠️ historial_ausencias.json corrupto. Se parte de cero.")
+        return {}
+
+def guardar_historial_ausencias(historial, ruta=ARCHIVO_AUSENCIAS):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(historial, f, indent=0, sort_keys=True)
+
+def amortiguar_archivado(archivar, historial, skus_mediven, umbral=None):
+    """
+    Filtra la lista archivar del plan. Actualiza historial en el lugar.
+    Retorna (archivar_final, diferidos, resumen):
+      diferidos: filas que faltan en Mediven pero aún no cumplen el umbral (no se archivan)
+      resumen: {"diferidos", "volvieron", "mutaciones_evitadas"}
+    """
+    umbral = AUSENCIAS_PARA_ARCHIVAR if umbral is None else umbral
+
+    # Una cuenta por SKU y corrida (un producto puede venir con varias variantes).
+    # Los ya archivados no tienen nada que amortiguar.
+    ausentes_vivos = {
+        p["SKU"] for p in archivar
+        if p.get("Motivo") == MOTIVO_AUSENTE and p.get("status_actual") != "archived"
+    }
+
+    # SKUs que estaban en la cuenta y volvieron a Mediven antes de archivarse:
+    # cada uno es un archivar + reactivar que no ocurrió
+    previo = dict(historial)
+    volvieron = [sku for sku in previo if sku in skus_mediven]
+
+    # El historial queda solo con los que siguen faltando (los demás volvieron o ya no están en Shopify)
+    historial.clear()
+    for sku in ausentes_vivos:
+        historial[sku] = previo.get(sku, 0) + 1
+
+    archivar_final, diferidos = [], []
+    for p in archivar:
+        if p["SKU"] in ausentes_vivos and historial[p["SKU"]] < umbral:
+            diferidos.append({**p, "Ausencias": historial[p["SKU"]]})
+        else:
+            archivar_final.append(p)
+
+    # Los que ya cumplieron el umbral salen del historial (se archivan ahora)
+    for sku in ausentes_vivos:
+        if historial[sku] >= umbral:
+            del historial[sku]
+
+    resumen = {
+        "diferidos": len({p["SKU"] for p in diferidos}),
+        "volvieron": len(volvieron),
+        # Cada regreso ahorró el archivado y la reactivación
+        "mutaciones_evitadas": 2 * len(volvieron),
+    }
+    return archivar_final, diferidos, resumen
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+
+# ============================
+# BLOQUEOS POR RECURSO (locks/)
+# ============================
+# Un archivo por recurso: locks/<recurso>.lock con quién lo tiene (pid, máquina, comando)
+# y su último latido. Dos procesos pueden correr a la vez mientras no toquen lo mismo:
+# una reparación de imágenes junto al sync de precios, por ejemplo.
+#   catalogo        escrituras del núcleo en Shopify (precios, crear, archivar) + su estado
+#   estado          data/*.json del núcleo (memoria, huellas, ausencias), lectura + escritura
+#   imagenes        data/registro_imagenes.json y las fotos de Shopify
+#   diccionario_ia  data/diccionario_ia.json (lo escriben la IA y el SEO)
+#   mercado         data/precios_mercado.json (Mini-Espía)
+# Un bloqueo es viejo (y se toma igual) si su proceso ya no existe en esta máquina o si
+# dejó de latir hace más de BLOQUEO_VENCE (proceso colgado, máquina apagada...).
+RECURSO_CATALOGO = "catalogo"
+RECURSO_ESTADO = "estado"
+RECURSO_IMAGENES = "imagenes"
+RECURSO_DICCIONARIO_IA = "diccionario_ia"
+RECURSO_MERCADO = "mercado"
+
+DIR_BLOQUEOS = "locks"
+BLOQUEO_LATIDO = float(os.getenv("SYNC_BLOQUEO_LATIDO", "30"))
+BLOQUEO_VENCE = float(os.getenv("SYNC_BLOQUEO_VENCE", "300"))
+
+# Archivo recién creado que todavía no tiene contenido: no es viejo hasta pasado esto
+_GRACIA_VACIO = 10
+
+_tomados = {}  # (base, recurso) -> Event que detiene su latido
+_lock = threading.Lock()
+
+class RecursoOcupado(TimeoutError):
+    """El recurso lo tiene otro proceso vivo. .dueno: contenido de su archivo de bloqueo."""
+
+    def __init__(self, recurso, dueno):
+        self.recurso = recurso
+        self.dueno = dueno or {}
+        detalle = (
+            f"pid {self.dueno.get('pid')} en {self.dueno.get('maquina')}, "
+            f"desde {time.strftime('%H:%M:%S', time.localtime(self.dueno.get('inicio', 0)))}: "
+            f"{self.dueno.get('comando', '?')}"
+        ) if self.dueno else "sin datos"
+        super().__init__(f"'{recurso}' ocupado ({detalle})")
+
+def ruta_bloqueo(recurso, base=DIR_BLOQUEOS):
+    return os.path.join(base, f"{recurso}.lock")
+
+def leer_bloqueo(ruta):
+    """Contenido del archivo de bloqueo ({} si está vacío o a medio escribir, None si no existe)."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+def _proceso_vivo(pid):
+    if os.name == "nt":
+        # En Windows os.kill(pid, 0) mata el proceso: ahí solo cuenta el latido
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def es_viejo(dueno, ruta):
+    """True si el bloqueo quedó de un proceso muerto o que dejó de latir."""
+    ahora = time.time()
+    if not dueno:
+        try:
+            return ahora - os.path.getmtime(ruta) > _GRACIA_VACIO
+        except OSError:
+            return False
+    if dueno.get("maquina") == socket.gethostname() and not _proceso_vivo(dueno.get("pid", 0)):
+        return True
+    return ahora - dueno.get("latido", 0) > BLOQUEO_VENCE
+
+def _romper_viejo(ruta, dueno):
+    """Quita un bloqueo viejo. Si otro proceso alcanzó a romperlo y tomarlo, se respeta el suyo."""
+    aparte = f"{ruta}.viejo{os.getpid()}"
+    try:
+        os.replace(ruta, aparte)
+    except FileNotFoundError:
+        return
+    if leer_bloqueo(aparte) != dueno:
+        # Era el de otro proceso, recién tomado: se devuelve (link falla si ya hay uno nuevo)
+        try:
+            os.link(aparte, ruta)
+        except OSError:
+            pass
+    os.remove(aparte)
+
+def _latir(ruta, datos, parar):
+    while not parar.wait(BLOQUEO_LATIDO):
+        # Con _lock: un latido a destiempo no puede volver a crear un bloqueo ya soltado
+        with _lock:
+            if parar.is_set():
+                return
+            datos["latido"] = time.time()
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            try:
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(datos, f)
+                os.replace(temporal, ruta)
+            except OSError:
+                pass
+
+def tomar_bloqueo(recurso, espera=0, base=DIR_BLOQUEOS):
+    """
+    Toma el recurso (espera: segundos que se reintenta si está ocupado).
+    Lanza RecursoOcupado si no se pudo. Soltar con soltar_bloqueo.
+    """
+    os.makedirs(base, exist_ok=True)
+    ruta = ruta_bloqueo(recurso, base)
+    limite = time.time() + espera
+    while True:
+        try:
+            fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            dueno = leer_bloqueo(ruta)
+            if dueno is not None and es_viejo(dueno, ruta):
+                print(f"🔓 Bloqueo viejo de '{recurso}' (pid {dueno.get('pid', '?')}): se libera.")
+                _romper_viejo(ruta, dueno)
+                continue
+            if time.time() >= limite:
+                raise RecursoOcupado(recurso, dueno)
+            time.sleep(0.5)
+
+    ahora = time.time()
+    datos = {
+        "recurso": recurso,
+        "pid": os.getpid(),
+        "maquina": socket.gethostname(),
+        "comando": " ".join(os.path.basename(a) if i == 0 else a for i, a in enumerate(sys.argv))[:200],
+        "inicio": ahora,
+        "latido": ahora,
+    }
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+
+    parar = threading.Event()
+    threading.Thread(target=_latir, args=(ruta, datos, parar), name=f"bloqueo-{recurso}", daemon=True).start()
+    with _lock:
+        _tomados[(base, recurso)] = parar
+
+def soltar_bloqueo(recurso, base=DIR_BLOQUEOS):
+    """Suelta el recurso si lo tiene este proceso (si no, no hace nada)."""
+    with _lock:
+        parar = _tomados.pop((base, recurso), None)
+        if parar is None:
+            return
+        parar.set()
+    ruta = ruta_bloqueo(recurso, base)
+    dueno = leer_bloqueo(ruta)
+    if dueno and dueno.get("pid") == os.getpid() and dueno.get("maquina") == socket.gethostname():
+        os.remove(ruta)
+
+@contextmanager
+def bloqueo(recurso, espera=0, base=DIR_BLOQUEOS):
+    """with bloqueo(RECURSO_IMAGENES): ... (RecursoOcupado si otro proceso vivo lo tiene)."""
+    tomar_bloqueo(recurso, espera, base)
+    try:
+        yield
+    finally:
+        soltar_bloqueo(recurso, base)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import requests
+
+from modulos.nucleo.sync_diagnostico import shopify_graphql
+
+# ============================
+# BULK OPERATION (MUTACIONES MASIVAS)
+# ============================
+# Un solo JSONL con las variables de cada mutación → Shopify lo procesa en su lado,
+# sin pasar por el balde de costo. Conviene cuando son miles de escrituras.
+BULK_SEGUNDOS_POLL = float(os.getenv("BULK_SEGUNDOS_POLL", "5"))
+BULK_TIMEOUT = float(os.getenv("BULK_TIMEOUT", "3600"))
+
+ESTADOS_FINALES = {"COMPLETED", "FAILED", "CANCELED", "EXPIRED"}
+
+def _subir_variables(lineas, contexto):
+    """stagedUploadsCreate + POST del JSONL. Retorna el stagedUploadPath (o None)."""
+    mutation = """
+    mutation staged($input: [StagedUploadInput!]!) {
+      stagedUploadsCreate(input: $input) {
+        stagedTargets { url resourceUrl parameters { name value } }
+        userErrors { field message }
+      }
+    }
+    """
+    variables = {"input": [{
+        "resource": "BULK_MUTATION_VARIABLES",
+        "filename": f"{contexto}.jsonl",
+        "mimeType": "text/jsonl",
+        "httpMethod": "POST",
+    }]}
+    data = shopify_graphql(mutation, variables, contexto=f"{contexto}_staged")
+    if not data or "data" not in data or data["data"]["stagedUploadsCreate"]["userErrors"]:
+        return None
+
+    destino = data["data"]["stagedUploadsCreate"]["stagedTargets"][0]
+    parametros = {p["name"]: p["value"] for p in destino["parameters"]}
+    cuerpo = "\n".join(json.dumps(linea, ensure_ascii=False) for linea in lineas) + "\n"
+
+    try:
+        resp = requests.post(
+            destino["url"],
+            data=parametros,
+            files={"file": (f"{contexto}.jsonl", cuerpo.encode("utf-8"), "text/jsonl")},
+            timeout=120,
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"\n⚠️ No se pudo subir el JSONL de {contexto} ({e})")
+        return None
+    if resp.status_code not in (200, 201, 204):
+        print(f"\n⚠️ HTTP {resp.status_code} subiendo el JSONL de {contexto}: {resp.text[:300]}")
+        return None
+    return parametros.get("key")
+
+def _esperar_operacion(operacion_id, contexto):
+    query = """
+    query estado($id: ID!) {
+      node(id: $id) {
+        ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+      }
+    }
+    """
+    limite = time.time() + BULK_TIMEOUT
+    while time.time() < limite:
+        data = shopify_graphql(query, {"id": operacion_id}, contexto=f"{contexto}_poll")
+        nodo = ((data or {}).get("data") or {}).get("node")
+        if nodo and nodo.get("status") in ESTADOS_FINALES:
+            return nodo
+        if nodo:
+            print(f"\r⏳ Bulk {contexto}: {nodo.get('status')} ({nodo.get('objectCount') or 0} filas)", end="", flush=True)
+        time.sleep(BULK_SEGUNDOS_POLL)
+    print(f"\n❌ Bulk {contexto}: sin respuesta tras {BULK_TIMEOUT:.0f}s")
+    return None
+
+def _contar_resultados(url, campo):
+    """Lee el JSONL de resultados y cuenta filas OK / con error."""
+    ok, errores = 0, 0
+    try:
+        resp = requests.get(url, timeout=120)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"\n⚠️ No se pudo leer el resultado del bulk ({e})")
+        return None
+    for linea in resp.text.splitlines():
+        if not linea.strip():
+            continue
+        fila = json.loads(linea)
+        resultado = (fila.get("data") or {}).get(campo) or {}
+        if fila.get("errors") or resultado.get("userErrors"):
+            errores += 1
+        else:
+            ok += 1
+    return ok, errores
+
+def ejecutar_bulk_mutation(mutation, lineas, campo, contexto="bulk_mutation"):
+    """
+    Corre una mutación sobre todas las filas de variables (lineas) con bulkOperationRunMutation.
+    campo: nombre de la mutación en la respuesta (ej: "productUpdate").
+    Retorna {"ok", "errores"} o None si no se pudo lanzar (quien llama cae a la ruta normal).
+    """
+    if not lineas:
+        return {"ok": 0, "errores": 0}
+
+    print(f"📤 Bulk {contexto}: subiendo {len(lineas)} filas...")
+    ruta_staged = _subir_variables(lineas, contexto)
+    if not ruta_staged:
+        return None
+
+    run = """
+    mutation correr($mutation: String!, $path: String!) {
+      bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $path) {
+        bulkOperation { id status }
+        userErrors { field message }
+      }
+    }
+    """
+    data = shopify_graphql(run, {"mutation": mutation, "path": ruta_staged}, contexto=f"{contexto}_run")
+    if not data or "data" not in data:
+        return None
+    resultado = data["data"]["bulkOperationRunMutation"]
+    if resultado["userErrors"] or not resultado["bulkOperation"]:
+        for err in resultado["userErrors"]:
+            print(f"   → {err.get('message')}")
+        return None
+
+    nodo = _esperar_operacion(resultado["bulkOperation"]["id"], contexto)
+    print()
+    if not nodo:
+        # Ya quedó lanzada: no se reintenta por la otra ruta para no duplicar escrituras
+        return {"ok": 0, "errores": len(lineas)}
+
+    url = nodo.get("url") or nodo.get("partialDataUrl")
+    conteo = _contar_resultados(url, campo) if url else None
+    if conteo is None:
+        print(f"⚠️ Bulk {contexto}: terminó en {nodo.get('status')} ({nodo.get('errorCode') or 'sin detalle'})")
+        ok = 0 if nodo.get("status") != "COMPLETED" else len(lineas)
+        return {"ok": ok, "errores": len(lineas) - ok}
+
+    ok, errores = conteo
+    # Filas que Shopify no alcanzó a procesar (operación cortada)
+    errores += max(0, len(lineas) - ok - errores)
+    print(f"✅ Bulk {contexto}: {nodo.get('status')} OK={ok}, errores={errores}")
+    return {"ok": ok, "errores": errores}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+from modulos.nucleo.sync_diagnostico import get_shopify_variantes_por_id, get_shopify_products_por_sku
+
+# ============================
+# CARRIL RÁPIDO (sync.py rapido)
+# ============================
+# Los SKUs de alta rotación se re-preciean cada pocos minutos sin bajar el catálogo:
+#   data/skus_calientes.json   {sku: {"product_id", "variant_id"}} (IDs guardados)
+#   Shopify:  nodes(ids: [...]) con esos IDs, por lotes (sin paginar ni bodyHtml)
+#   Mediven:  el inventario de siempre (no tiene consulta por SKU), filtrado a la lista
+#   Plan:     el de la corrida dirigida, solo etapa precios → solo se mandan los deltas
+# Si un ID ya no sirve (variante borrada o con otro SKU) se busca por SKU y se corrige.
+ARCHIVO_CALIENTES = os.path.join("data", "skus_calientes.json")
+
+def cargar_calientes(ruta=ARCHIVO_CALIENTES):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print("⚠️ skus_calientes.json corrupto. Carril rápido sin SKUs hasta volver a agregarlos.")
+        return {}
+
+def guardar_calientes(calientes, ruta=ARCHIVO_CALIENTES):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(calientes, f, indent=1, sort_keys=True)
+
+def registrar_ids(calientes, productos, skus):
+    """Guarda en calientes los IDs de las variantes de `skus` que vienen en productos. Retorna los encontrados."""
+    encontrados = set()
+    for producto in productos:
+        for variante in producto["variants"]:
+            sku = str(variante.get("sku") or "").strip()
+            if sku in skus:
+                calientes[sku] = {"product_id": producto["id"], "variant_id": variante["id"]}
+                encontrados.add(sku)
+    return encontrados
+
+def solo_variantes(productos, skus):
+    """Los productos con solo las variantes de esos SKUs (y sin los que quedan vacíos)."""
+    recortados = []
+    for producto in productos:
+        variantes = [v for v in producto["variants"] if str(v.get("sku") or "").strip() in skus]
+        if variantes:
+            recortados.append(dict(producto, variants=variantes))
+    return recortados
+
+def leer_calientes_shopify(calientes, cancelar=None, progreso=None):
+    """
+    Estado actual en Shopify de los SKUs calientes. Lo que no volvió por ID se busca
+    por SKU y se le corrige el ID en `calientes` (el que llama decide si guardar).
+    Retorna (productos, perdidos): perdidos son SKUs que ya no están en Shopify.
+    """
+    skus = set(calientes)
+    productos = get_shopify_variantes_por_id([c["variant_id"] for c in calientes.values()], cancelar, progreso)
+    # Una variante que cambió de SKU vuelve por ID, pero ya no es la que se guardó
+    productos = solo_variantes(productos, skus)
+    vistos = {str(v.get("sku") or "").strip() for p in productos for v in p["variants"]}
+
+    perdidos = skus - vistos
+    if perdidos:
+        print(f"🔎 {len(perdidos)} SKUs calientes no volvieron por ID: se buscan por SKU.")
+        extra = solo_variantes(get_shopify_products_por_sku(perdidos, cancelar), perdidos)
+        perdidos -= registrar_ids(calientes, extra, perdidos)
+        por_id = {p["id"]: p for p in productos}
+        for producto in extra:
+            if producto["id"] in por_id:
+                por_id[producto["id"]]["variants"].extend(producto["variants"])
+            else:
+                productos.append(producto)
+    return productos, perdidos
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# ============================
+# COLA DE TRABAJO (sync.py coordinar / sync.py worker)
+# ============================
+# El coordinador parte un plan guardado en N shards (crc32 del producto, igual que --shard)
+# y los deja como tareas en una cola SQLite junto al plan. Cada worker es un proceso aparte
+# (en esta máquina, o en otra que vea la misma carpeta) que toma shards de a uno, los
+# aplica y deja el resultado en la cola: los workers no escriben data/. Al terminar, el
+# coordinador fusiona memoria / huellas / decisiones / ausencias de los shards hechos.
+# Las escrituras de todos los workers pasan por un balde global guardado en la misma cola,
+# así N procesos juntos no pasan el límite de puntos de la tienda.
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_TOMADA = "tomada"
+ESTADO_HECHA = "hecha"
+ESTADO_FALLIDA = "fallida"
+# Worker que dejó de latir con el shard a medias: no se reintenta solo (podría crear
+# duplicados); vuelve a la cola si se corre "coordinar" de nuevo con el mismo plan
+ESTADO_PERDIDA = "perdida"
+
+# Por defecto: shards de la cola y workers locales que lanza el coordinador
+# (más shards que workers reparte mejor: el que termina antes toma otro)
+COLA_SHARDS = int(os.getenv("SYNC_COLA_SHARDS", "8"))
+COLA_WORKERS = int(os.getenv("SYNC_COLA_WORKERS", "4"))
+
+# Cada cuánto late un worker, y sin latido por cuánto su shard se da por perdido
+COLA_LATIDO = float(os.getenv("SYNC_COLA_LATIDO", "10"))
+COLA_VENCE = float(os.getenv("SYNC_COLA_VENCE", "90"))
+
+# Fracción del balde de Shopify que pueden usar los workers entre todos
+# (menos de 1 deja puntos para otras apps de la tienda)
+PRESUPUESTO_ESCRITURA = float(os.getenv("SYNC_PRESUPUESTO_ESCRITURA", "1.0"))
+
+_TABLAS = """
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+CREATE TABLE IF NOT EXISTS tareas (
+    shard INTEGER PRIMARY KEY,
+    estado TEXT NOT NULL,
+    worker TEXT,
+    tomada REAL,
+    latido REAL,
+    fin REAL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    resultado TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS balde (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    maximo REAL, disponible REAL, recarga REAL, momento REAL
+);
+"""
+
+def ruta_cola(ruta_plan):
+    """planes/plan_x.json.gz → planes/plan_x.cola.sqlite"""
+    base = ruta_plan[:-len(".json.gz")] if ruta_plan.endswith(".json.gz") else ruta_plan
+    return base + ".cola.sqlite"
+
+def conectar(ruta):
+    # Sin WAL: la cola puede estar en una carpeta compartida entre máquinas.
+    # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+    return sqlite3.connect(ruta, timeout=60, isolation_level=None)
+
+def crear_cola(ruta, ruta_plan, plan, total, throttle, reiniciar=False):
+    """
+    Arma la cola del plan con `total` shards. Si ya existe para el mismo plan y total, los
+    shards hechos se respetan y el resto vuelve a pendiente (reiniciar=True: todos de nuevo).
+    Retorna cuántos quedan pendientes.
+    """
+    con = conectar(ruta)
+    try:
+        con.executescript(_TABLAS)
+        con.execute("BEGIN IMMEDIATE")
+        meta = dict(con.execute("SELECT clave, valor FROM meta").fetchall())
+        if reiniciar or meta.get("hash") != plan["hash"] or int(meta.get("total", 0)) != total:
+            con.execute("DELETE FROM tareas")
+            con.executemany(
+                "INSERT INTO tareas (shard, estado) VALUES (?, ?)", [(i, ESTADO_PENDIENTE) for i in range(total)]
+            )
+        else:
+            con.execute("UPDATE tareas SET estado = ?, worker = NULL WHERE estado != ?", (ESTADO_PENDIENTE, ESTADO_HECHA))
+        con.executemany("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", [
+            ("hash", plan["hash"]), ("total", str(total)), ("plan", os.path.abspath(ruta_plan)),
+        ])
+        con.execute(
+            "INSERT OR REPLACE INTO balde (id, maximo, disponible, recarga, momento) VALUES (1, ?, ?, ?, ?)",
+            (throttle["maximo"] * PRESUPUESTO_ESCRITURA, throttle["disponible"] * PRESUPUESTO_ESCRITURA,
+             throttle["recarga"] * PRESUPUESTO_ESCRITURA, time.time()),
+        )
+        pendientes = con.execute("SELECT COUNT(*) FROM tareas WHERE estado = ?", (ESTADO_PENDIENTE,)).fetchone()[0]
+        con.execute("COMMIT")
+        return pendientes
+    finally:
+        con.close()
+
+def leer_meta(con):
+    """{"hash", "total", "plan"} de la cola (ValueError si no es una cola)."""
+    try:
+        meta = dict(con.execute("SELECT clave, valor FROM meta").fetchall())
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"no es una cola de sync ({e})")
+    if "hash" not in meta:
+        raise ValueError("la cola no tiene plan")
+    return {"hash": meta["hash"], "total": int(meta["total"]), "plan": meta["plan"]}
+
+def marcar_perdidas(con):
+    """Shards tomados cuyo worker dejó de latir (murió o perdió la red)."""
+    con.execute(
+        "UPDATE tareas SET estado = ?, error = 'sin latido' WHERE estado = ? AND latido < ?",
+        (ESTADO_PERDIDA, ESTADO_TOMADA, time.time() - COLA_VENCE),
+    )
+
+def tomar_tarea(con, worker):
+    """Toma el siguiente shard pendiente (o None si no queda). Antes marca los que dejaron de latir."""
+    ahora = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        marcar_perdidas(con)
+        fila = con.execute(
+            "SELECT shard FROM tareas WHERE estado = ? ORDER BY shard LIMIT 1", (ESTADO_PENDIENTE,)
+        ).fetchone()
+        if fila:
+            con.execute(
+                "UPDATE tareas SET estado = ?, worker = ?, tomada = ?, latido = ?, intentos = intentos + 1, "
+                "resultado = NULL, error = NULL WHERE shard = ?",
+                (ESTADO_TOMADA, worker, ahora, ahora, fila[0]),
+            )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return fila[0] if fila else None
+
+def latir_mientras(ruta, shard, worker):
+    """Hilo que actualiza el latido del shard. Retorna el Event que lo detiene."""
+    parar = threading.Event()
+
+    def _latir():
+        con = conectar(ruta)
+        try:
+            while not parar.wait(COLA_LATIDO):
+                con.execute(
+                    "UPDATE tareas SET latido = ? WHERE shard = ? AND worker = ? AND estado = ?",
+                    (time.time(), shard, worker, ESTADO_TOMADA),
+                )
+        finally:
+            con.close()
+
+    threading.Thread(target=_latir, name=f"latido-{shard}", daemon=True).start()
+    return parar
+
+def terminar_tarea(con, shard, worker, resultado=None, error=None):
+    con.execute(
+        "UPDATE tareas SET estado = ?, fin = ?, resultado = ?, error = ? WHERE shard = ? AND worker = ?",
+        (ESTADO_FALLIDA if error else ESTADO_HECHA, time.time(),
+         json.dumps(resultado) if resultado is not None else None, error, shard, worker),
+    )
+
+def leer_tareas(con):
+    """Lista de tareas (dicts) en orden de shard, con el resultado ya decodificado."""
+    columnas = ["shard", "estado", "worker", "tomada", "latido", "fin", "intentos", "resultado", "error"]
+    tareas = []
+    for fila in con.execute(f"SELECT {', '.join(columnas)} FROM tareas ORDER BY shard"):
+        tarea = dict(zip(columnas, fila))
+        tarea["resultado"] = json.loads(tarea["resultado"]) if tarea["resultado"] else None
+        tareas.append(tarea)
+    return tareas
+
+def contar_estados(con):
+    return dict(con.execute("SELECT estado, COUNT(*) FROM tareas GROUP BY estado").fetchall())
+
+# ============================
+# BALDE GLOBAL (entre procesos)
+# ============================
+def balde_global(ruta):
+    """
+    (reservar, registrar) para sync_diagnostico.BALDE_GLOBAL, contra la tabla balde de la cola.
+    Una conexión por hilo: los escritores de un worker corren en hilos aparte.
+    """
+    local = threading.local()
+
+    def _con():
+        if not hasattr(local, "con"):
+            local.con = conectar(ruta)
+        return local.con
+
+    def reservar(costo):
+        while True:
+            con = _con()
+            con.execute("BEGIN IMMEDIATE")
+            maximo, disponible, recarga, momento = con.execute(
+                "SELECT maximo, disponible, recarga, momento FROM balde WHERE id = 1"
+            ).fetchone()
+            ahora = time.time()
+            # max(0, ...): los relojes de dos máquinas nunca están idénticos
+            disponible = min(maximo, disponible + max(0.0, ahora - momento) * recarga)
+            costo = min(costo, maximo)
+            if disponible >= costo or not recarga:
+                con.execute("UPDATE balde SET disponible = ?, momento = ? WHERE id = 1", (disponible - costo, ahora))
+                con.execute("COMMIT")
+                return
+            con.execute("COMMIT")
+            time.sleep(min((costo - disponible) / recarga, 5))
+
+    def registrar(maximo, disponible, recarga):
+        # Shopify informa el balde de toda la tienda; a los workers les toca su fracción
+        reservado = maximo * (1 - PRESUPUESTO_ESCRITURA)
+        con = _con()
+        con.execute("BEGIN IMMEDIATE")
+        actual, recarga_actual, momento = con.execute(
+            "SELECT disponible, recarga, momento FROM balde WHERE id = 1"
+        ).fetchone()
+        ahora = time.time()
+        # Lo menor entre lo que dice Shopify y lo que llevan descontado los workers
+        calculado = actual + max(0.0, ahora - momento) * recarga_actual
+        con.execute(
+            "UPDATE balde SET maximo = ?, disponible = ?, recarga = ?, momento = ? WHERE id = 1",
+            (maximo * PRESUPUESTO_ESCRITURA, min(calculado, max(0.0, disponible - reservado)),
+             recarga * PRESUPUESTO_ESCRITURA, ahora),
+        )
+        con.execute("COMMIT")
+
+    return reservar, registrar
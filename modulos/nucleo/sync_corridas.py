@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
+# ============================
+# ORDENAMIENTO EXTERNO (CORRIDAS EN DISCO)
+# ============================
+# Registros por corrida: es lo máximo que se tiene en memoria a la vez por lado
+TAMANO_CORRIDA = int(os.getenv("SYNC_TAMANO_CORRIDA", "50000"))
+
+def _clave_orden(fila):
+    # (clave, secuencia): la secuencia mantiene el orden original dentro de un mismo SKU
+    return fila[0], fila[1]
+
+def _volcar_corrida(lote, directorio, prefijo, numero):
+    lote.sort(key=_clave_orden)
+    ruta = os.path.join(directorio, f"{prefijo}_{numero:04d}.jsonl")
+    with open(ruta, "w", encoding="utf-8") as f:
+        for fila in lote:
+            f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+    return ruta
+
+def escribir_corridas(registros, clave, directorio, prefijo, tamano_corrida=None):
+    """
+    Consume un iterable de dicts y lo escribe en archivos JSONL ordenados por clave
+    (cada archivo es una "corrida" de a lo más tamano_corrida registros).
+    Retorna la lista de rutas, lista para mezclar_corridas.
+    """
+    tamano_corrida = tamano_corrida or TAMANO_CORRIDA
+    rutas = []
+    lote = []
+
+    for secuencia, registro in enumerate(registros):
+        lote.append((clave(registro), secuencia, registro))
+        if len(lote) >= tamano_corrida:
+            rutas.append(_volcar_corrida(lote, directorio, prefijo, len(rutas)))
+            lote = []
+
+    if lote:
+        rutas.append(_volcar_corrida(lote, directorio, prefijo, len(rutas)))
+    return rutas
+
+def _leer_corrida(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            yield json.loads(linea)
+
+def mezclar_corridas(rutas):
+    """
+    Mezcla (heapq.merge) todas las corridas y entrega (clave, [registros]) en orden,
+    con los registros de una misma clave en su orden original.
+    Solo hay una línea por archivo en memoria.
+    """
+    mezcla = heapq.merge(*(_leer_corrida(r) for r in rutas), key=_clave_orden)
+    for clave, grupo in groupby(mezcla, key=itemgetter(0)):
+        yield clave, [registro for _, _, registro in grupo]
+
+def cruzar_ordenado(izquierda, derecha):
+    """
+    Merge-join de dos flujos (clave, [registros]) ordenados por clave.
+    Entrega (clave, registros_izq, registros_der); el lado que no tiene la clave va vacío.
+    """
+    fin = object()
+    izq = next(izquierda, fin)
+    der = next(derecha, fin)
+
+    while izq is not fin or der is not fin:
+        if der is fin or (izq is not fin and izq[0] < der[0]):
+            yield izq[0], izq[1], []
+            izq = next(izquierda, fin)
+        elif izq is fin or der[0] < izq[0]:
+            yield der[0], [], der[1]
+            der = next(derecha, fin)
+        else:
+            yield izq[0], izq[1], der[1]
+            izq = next(izquierda, fin)
+            der = next(derecha, fin)
@@ -15,6 +15,7 @@ from modulos.nucleo.sync_diagnostico import (
     ONLINE_STORE_PUBLICATION_ID, 
     DEFAULT_IMAGE_URL
 )
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
 
 # ============================
 # GRAPHQL: SETEAR STOCK=100 (MANTENIDO ORIGINAL)
@@ -281,7 +282,7 @@ def crear_producto_worker(p):
 # ============================
 # CREAR PRODUCTOS TURBO (MANTENIDO ORIGINAL)
 # ============================
-def crear_productos_graphql_turbo(productos, batch_size=20):
+def crear_productos_graphql_turbo(productos, batch_size=20, hasta=None):
     import concurrent.futures
     import random
 
@@ -304,6 +305,10 @@ def crear_productos_graphql_turbo(productos, batch_size=20):
     num_batches = math.ceil(total / batch_size)
 
     for b in range(num_batches):
+        if vencido(hasta):
+            resto = productos[b * batch_size:]
+            registrar_diferido("crear", len(resto), [p["SKU"] for p in resto])
+            break
         inicio = b * batch_size
         fin = min((b + 1) * batch_size, total)
         batch = productos[inicio:fin]
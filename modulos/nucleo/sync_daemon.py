@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from modulos.nucleo.sync_diagnostico import ESTADO_THROTTLE
+
+# ============================
+# MODO DAEMON (sync.py daemon)
+# ============================
+# Un solo proceso que no se apaga: el catálogo de Shopify, el estado (memoria, huellas,
+# decisiones, ausencias) y la sesión de Mediven quedan en memoria entre ciclos.
+#   ciclo delta:        Mediven completo (es un POST) + solo los productos de Shopify
+#                       con updated_at posterior al ciclo anterior
+#   reconciliación:     Shopify completo otra vez + Excel + etapas post-sync
+#                       (cada SYNC_DAEMON_RECONCILIAR, o a pedido con POST /reconciliar)
+# Endpoint local: GET /salud (JSON, 503 si está atrasado o fallando), GET /metricas
+# (formato texto de Prometheus), POST /reconciliar.
+INTERVALO_DAEMON = os.getenv("SYNC_DAEMON_INTERVALO", "15m")
+RECONCILIAR_CADA = os.getenv("SYNC_DAEMON_RECONCILIAR", "6h")
+PUERTO_DAEMON = int(os.getenv("SYNC_DAEMON_PUERTO", "8765"))
+HOST_DAEMON = os.getenv("SYNC_DAEMON_HOST", "127.0.0.1")
+
+# Los SKUs que faltan en Mediven suman una ausencia cada esto (no en cada ciclo):
+# el amortiguador cuenta "corridas" y fue pensado para una por hora
+AUSENCIA_CADA = os.getenv("SYNC_DAEMON_AUSENCIA_CADA", "1h")
+
+# Shopify y esta máquina no tienen el reloj idéntico: el delta se pide con margen
+MARGEN_DELTA = timedelta(seconds=float(os.getenv("SYNC_DAEMON_MARGEN_DELTA", "120")))
+
+# Ciclos fallidos seguidos a partir de los cuales /salud responde 503
+ERRORES_PARA_ALERTA = 3
+
+_lock = threading.Lock()
+ESTADO_DAEMON = {
+    "inicio": time.time(),
+    "ciclos": {"delta": 0, "reconciliacion": 0},
+    "errores": 0,
+    "errores_seguidos": 0,
+    "ultimo_error": None,
+    "ultimo_exito": None,
+    "ultimo_ciclo": None,
+    "productos_catalogo": 0,
+    "intervalo": None,
+}
+
+# ============================
+# CATÁLOGO CALIENTE
+# ============================
+def marca_delta(momento=None):
+    """Filtro de Shopify para lo cambiado desde `momento` (UTC, con MARGEN_DELTA de colchón)."""
+    momento = (momento or datetime.now(timezone.utc)) - MARGEN_DELTA
+    return f"updated_at:>'{momento.strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+
+def fusionar_catalogo(catalogo, productos):
+    """Reemplaza en catalogo ({id: producto}) los productos que llegaron. Retorna cuántos."""
+    n = 0
+    for producto in productos:
+        catalogo[producto["id"]] = producto
+        n += 1
+    return n
+
+def firmas_archivos(rutas):
+    """(mtime, tamaño) de cada archivo: si cambió, alguien más escribió el estado en disco."""
+    firmas = {}
+    for ruta in rutas:
+        try:
+            info = os.stat(ruta)
+            firmas[ruta] = (info.st_mtime_ns, info.st_size)
+        except OSError:
+            firmas[ruta] = None
+    return firmas
+
+# ============================
+# MÉTRICAS Y SALUD
+# ============================
+def registrar_ciclo(tipo, segundos, resumen=None, error=None, productos_catalogo=None):
+    """resumen: conteos del ciclo (crear, actualizar, archivar, cambios_shopify...)."""
+    with _lock:
+        if productos_catalogo is not None:
+            ESTADO_DAEMON["productos_catalogo"] = productos_catalogo
+        ESTADO_DAEMON["ultimo_ciclo"] = {
+            "tipo": tipo,
+            "fin": time.time(),
+            "segundos": round(segundos, 2),
+            "error": str(error) if error else None,
+            **(resumen or {}),
+        }
+        if error:
+            ESTADO_DAEMON["errores"] += 1
+            ESTADO_DAEMON["errores_seguidos"] += 1
+            ESTADO_DAEMON["ultimo_error"] = {"fin": time.time(), "error": str(error)}
+        else:
+            ESTADO_DAEMON["ciclos"][tipo] += 1
+            ESTADO_DAEMON["errores_seguidos"] = 0
+            ESTADO_DAEMON["ultimo_exito"] = time.time()
+
+def salud():
+    """(código HTTP, cuerpo). Atrasado = sin ciclo exitoso en 3 intervalos."""
+    with _lock:
+        estado = json.loads(json.dumps(ESTADO_DAEMON))
+    ahora = time.time()
+    referencia = estado["ultimo_exito"] or estado["inicio"]
+    atrasado = estado["intervalo"] is not None and ahora - referencia > 3 * estado["intervalo"]
+    fallando = estado["errores_seguidos"] >= ERRORES_PARA_ALERTA
+    estado["estado"] = "fallando" if fallando else "atrasado" if atrasado else "ok"
+    estado["segundos_desde_exito"] = round(ahora - estado["ultimo_exito"], 1) if estado["ultimo_exito"] else None
+    return (503 if fallando or atrasado else 200), estado
+
+def texto_metricas():
+    with _lock:
+        estado = json.loads(json.dumps(ESTADO_DAEMON))
+    ultimo = estado["ultimo_ciclo"] or {}
+    lineas = [
+        "# TYPE sync_ciclos_total counter",
+        *(f'sync_ciclos_total{{tipo="{tipo}"}} {n}' for tipo, n in estado["ciclos"].items()),
+        "# TYPE sync_errores_total counter",
+        f"sync_errores_total {estado['errores']}",
+        "# TYPE sync_errores_seguidos gauge",
+        f"sync_errores_seguidos {estado['errores_seguidos']}",
+        "# TYPE sync_ultimo_exito_timestamp gauge",
+        f"sync_ultimo_exito_timestamp {estado['ultimo_exito'] or 0}",
+        "# TYPE sync_ultimo_ciclo_segundos gauge",
+        f"sync_ultimo_ciclo_segundos {ultimo.get('segundos', 0)}",
+        "# TYPE sync_catalogo_productos gauge",
+        f"sync_catalogo_productos {estado['productos_catalogo']}",
+    ]
+    for clave in ("cambios_shopify", "crear", "actualizar", "archivar"):
+        if clave in ultimo:
+            lineas += [f"# TYPE sync_ultimo_{clave} gauge", f"sync_ultimo_{clave} {ultimo[clave]}"]
+    if ESTADO_THROTTLE:
+        lineas += ["# TYPE sync_shopify_balde_disponible gauge", f"sync_shopify_balde_disponible {ESTADO_THROTTLE['disponible']}"]
+    return "\n".join(lineas) + "\n"
+
+def iniciar_servidor(al_pedir_reconciliacion, puerto=PUERTO_DAEMON, host=HOST_DAEMON):
+    """Levanta el endpoint en un hilo aparte. Retorna el servidor (server.shutdown() para cerrarlo)."""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def _responder(self, codigo, cuerpo, tipo="application/json"):
+            datos = cuerpo.encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            if self.path == "/salud":
+                codigo, cuerpo = salud()
+                self._responder(codigo, json.dumps(cuerpo, ensure_ascii=False))
+            elif self.path == "/metricas":
+                self._responder(200, texto_metricas(), "text/plain; version=0.0.4")
+            else:
+                self._responder(404, json.dumps({"error": "no existe"}))
+
+        def do_POST(self):
+            if self.path == "/reconciliar":
+                al_pedir_reconciliacion()
+                self._responder(202, json.dumps({"reconciliacion": "pedida"}))
+            else:
+                self._responder(404, json.dumps({"error": "no existe"}))
+
+        def log_message(self, *args):
+            # Sin una línea por request en la consola del sync
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    threading.Thread(target=servidor.serve_forever, name="daemon-http", daemon=True).start()
+    return servidor
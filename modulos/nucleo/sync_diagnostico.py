@@ -3,11 +3,19 @@ import re
 import json
 import os
 import time
-import pandas as pd
+import hashlib
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from modulos.nucleo.abreviaturas import compilar_expansor_tokens
+from modulos.nucleo.sync_exclusiones import detectar_excluidos
+from modulos.nucleo.sync_paralelo import revisar_cancelacion
+
+# pandas se importa dentro de las funciones que lo usan: los módulos que solo
+# necesitan shopify_graphql (escrituras, bulk, utilidades) no cargan pandas al arrancar
+
 # ============================
 # CARGA VARIABLES .ENV
 # ============================
@@ -56,6 +64,11 @@ DELETE_MISSING = os.getenv("DELETE_MISSING", "false").lower() == "true"
 # Workers paralelos para creación TURBO
 WORKERS_TURBO = int(os.getenv("WORKERS_TURBO", "30"))
 
+# 🔌 Conexiones keep-alive a la tienda (ver sesion_shopify). 0 = una conexión nueva por request
+SHOPIFY_HTTP_POOL = int(os.getenv("SHOPIFY_HTTP_POOL", str(max(WORKERS_TURBO, 10))))
+SHOPIFY_TIMEOUT_CONEXION = float(os.getenv("SHOPIFY_TIMEOUT_CONEXION", "10"))
+SHOPIFY_TIMEOUT_LECTURA = float(os.getenv("SHOPIFY_TIMEOUT_LECTURA", "40"))
+
 # Publicación Online Store (obtenido con get_publications.py)
 ONLINE_STORE_PUBLICATION_ID = os.getenv(
     "ONLINE_STORE_PUBLICATION_ID",
@@ -84,6 +97,40 @@ DICCIONARIO_NOMBRES = {
     " REPAR & BLANQ ": " Reparación & Blanqueamiento ", " FTE ": " Fuerte ",
 }
 
+EXPANDIR_NOMBRES = compilar_expansor_tokens(DICCIONARIO_NOMBRES)
+
+# Etiquetas entre paréntesis que se eliminan del título
+PALABRAS_PROHIBIDAS_NOMBRE = [
+    'MAQUILLAJE', 'CUIDADO', 'PROTECCION', 'CEPILLOS', 'CREMA DENTAL',
+    'DESODORANTES', 'DESODORANTE', 'SHAMPOO', 'ENJUAGUES', 'PAÑAL', 'VITAMINA', 'JABON',
+    'COLORACION', 'COLONIA', 'PRESERVATIVO', 'APOSITO', 'ADHESIVO', 'GEL',
+    'TALCO', 'ACONDICIONADOR', 'DEPILACION', 'PROBIOTICO', 'SOLAR',
+    'DESMAQUILLANTE', 'BALSAMO', 'ACCESORIOS', 'BEBES', 'DENTAL',
+    'ESPUMAS', 'SUPLEMENTOS', 'TOALLAS', 'PROTECTORES', 'INCONTINENCIA',
+    'COLONIAS', 'LOCIONES', 'MAQUINAS', 'AFEITADO', 'DM', 'BE'
+]
+
+# ============================
+# CACHÉ PERSISTENTE DE NOMBRES
+# ============================
+# Subir REVISION si cambia la lógica de formatear_nombre_producto.
+# Cambios en DICCIONARIO_NOMBRES o PALABRAS_PROHIBIDAS_NOMBRE invalidan el caché solos.
+REGLAS_NOMBRES_REVISION = 1
+REGLAS_NOMBRES_VERSION = hashlib.sha1(
+    json.dumps(
+        [REGLAS_NOMBRES_REVISION, DICCIONARIO_NOMBRES, PALABRAS_PROHIBIDAS_NOMBRE],
+        ensure_ascii=False, sort_keys=True,
+    ).encode("utf-8")
+).hexdigest()[:12]
+
+# En data/cache/ (fuera de git): no es estado del robot, se rehace solo si se pierde
+ARCHIVO_CACHE_NOMBRES = os.path.join("data", "cache", "nombres.json")
+CACHE_NOMBRES_MAX = int(os.getenv("CACHE_NOMBRES_MAX", "50000"))
+
+_cache_nombres = {}  # clave -> [nombre, último uso (YYYY-MM-DD)]
+_cache_nombres_estado = {"cargado": False, "modificado": False}
+_cache_nombres_lock = threading.Lock()
+
 # ============================
 # FUNCIÓN DE LIMPIEZA FUERZA BRUTA
 # ============================
@@ -91,25 +138,13 @@ def formatear_nombre_producto(item, debug=False):
     nombre_raw = str(item.get("Descripcion", "")).upper()
     principio_activo = str(item.get("Equivalente", "")).strip().upper()
     
-    # 1. Diccionario
-    nombre_corregido = f" {nombre_raw} "
-    for abrev, reemplazo in DICCIONARIO_NOMBRES.items():
-        nombre_corregido = nombre_corregido.replace(abrev, reemplazo)
+    # 1. Diccionario (una sola pasada con el expansor compilado)
+    nombre_corregido = EXPANDIR_NOMBRES(f" {nombre_raw} ")
     
     nombre_final = nombre_corregido.strip().title()
     if debug: print(f"   [DEBUG] Post-Diccionario: {nombre_final}")
 
     # 2. LIMPIEZA FUERZA BRUTA (Split por paréntesis)
-    palabras_prohibidas = [
-        'MAQUILLAJE', 'CUIDADO', 'PROTECCION', 'CEPILLOS', 'CREMA DENTAL',
-        'DESODORANTES', 'DESODORANTE', 'SHAMPOO', 'ENJUAGUES', 'PAÑAL', 'VITAMINA', 'JABON',
-        'COLORACION', 'COLONIA', 'PRESERVATIVO', 'APOSITO', 'ADHESIVO', 'GEL',
-        'TALCO', 'ACONDICIONADOR', 'DEPILACION', 'PROBIOTICO', 'SOLAR',
-        'DESMAQUILLANTE', 'BALSAMO', 'ACCESORIOS', 'BEBES', 'DENTAL',
-        'ESPUMAS', 'SUPLEMENTOS', 'TOALLAS', 'PROTECTORES', 'INCONTINENCIA',
-        'COLONIAS', 'LOCIONES', 'MAQUINAS', 'AFEITADO', 'DM', 'BE'
-    ]
-    
     # Dividimos el texto buscando paréntesis: "Nombre (Tag)" -> ["Nombre ", "(Tag)", ""]
     partes = re.split(r'(\([^)]+\))', nombre_final)
     partes_limpias = []
@@ -128,7 +163,7 @@ def formatear_nombre_producto(item, debug=False):
             
             # Chequeo de palabras clave
             if not es_basura:
-                for palabra in palabras_prohibidas:
+                for palabra in PALABRAS_PROHIBIDAS_NOMBRE:
                     # Usamos limites de palabra para evitar borrar cosas legitimas si fuera necesario
                     # pero aqui queremos ser agresivos.
                     if palabra in contenido:
@@ -163,10 +198,163 @@ def formatear_nombre_producto(item, debug=False):
     return re.sub(r'\s+', ' ', nombre_final).strip()
 
 
+def cargar_cache_nombres(ruta=ARCHIVO_CACHE_NOMBRES):
+    """Carga el caché de títulos desde disco. Se descarta entero si cambiaron las reglas."""
+    with _cache_nombres_lock:
+        _cache_nombres.clear()
+        _cache_nombres_estado.update(cargado=True, modificado=False)
+        if not os.path.exists(ruta):
+            return 0
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️ {ruta} corrupto. Se reconstruirá desde cero.")
+            return 0
+        if data.get("version") != REGLAS_NOMBRES_VERSION:
+            print("♻️ Cambiaron las reglas de nombres → caché de títulos invalidado.")
+            _cache_nombres_estado["modificado"] = True
+            return 0
+        _cache_nombres.update(data.get("entradas", {}))
+        return len(_cache_nombres)
+
+def guardar_cache_nombres(ruta=ARCHIVO_CACHE_NOMBRES):
+    """Guarda el caché (solo si cambió), expulsando primero las entradas menos usadas (LRU)."""
+    with _cache_nombres_lock:
+        if not _cache_nombres_estado["modificado"]:
+            return
+        sobrantes = len(_cache_nombres) - CACHE_NOMBRES_MAX
+        if sobrantes > 0:
+            viejas = sorted(_cache_nombres, key=lambda k: _cache_nombres[k][1])[:sobrantes]
+            for clave in viejas:
+                del _cache_nombres[clave]
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": REGLAS_NOMBRES_VERSION, "entradas": _cache_nombres},
+                f, ensure_ascii=False, indent=0, sort_keys=True,
+            )
+        _cache_nombres_estado["modificado"] = False
+
+def formatear_nombre_cacheado(item):
+    """formatear_nombre_producto con memo en disco, por hash de (Descripcion, Equivalente, reglas)."""
+    if not _cache_nombres_estado["cargado"]:
+        cargar_cache_nombres()
+
+    descripcion = str(item.get("Descripcion", ""))
+    equivalente = str(item.get("Equivalente", ""))
+    clave = hashlib.sha1(
+        f"{descripcion}\x1f{equivalente}\x1f{REGLAS_NOMBRES_VERSION}".encode("utf-8")
+    ).hexdigest()[:20]
+    hoy = datetime.now().strftime("%Y-%m-%d")
+
+    with _cache_nombres_lock:
+        entrada = _cache_nombres.get(clave)
+        if entrada is not None:
+            if entrada[1] != hoy:
+                entrada[1] = hoy
+                _cache_nombres_estado["modificado"] = True
+            return entrada[0]
+
+    nombre = formatear_nombre_producto(item)
+    with _cache_nombres_lock:
+        _cache_nombres[clave] = [nombre, hoy]
+        _cache_nombres_estado["modificado"] = True
+    return nombre
+
+
 # ============================
 # HELPER SHOPIFY GRAPHQL (MANTENIDO ORIGINAL)
 # ============================
-def shopify_graphql(query, variables=None, contexto="graphql", max_retries=6):
+# Último estado del balde de costo de Shopify (extensions.cost.throttleStatus de cada respuesta)
+ESTADO_THROTTLE = {}
+_lock_throttle = threading.Lock()
+
+# 🪣 BALDE COMPARTIDO: con varios escritores a la vez (crear / precios / básicos / archivar),
+# cada request reserva su costo antes de salir. Así ninguno choca con el límite y entre
+# todos mantienen el balde cerca de lleno. El costo lo da quien llama (costo=) o se
+# estima con el último requestedQueryCost visto para ese mismo contexto.
+COSTO_POR_DEFECTO = 10
+_costo_por_contexto = {}
+
+# 🌐 BALDE GLOBAL: con workers en varios procesos o máquinas (sync.py worker) el balde de
+# este proceso no ve lo que gastan los demás. Si hay uno registrado (ver sync_cola),
+# la reserva va contra él: reservar(costo) bloquea hasta que haya puntos y
+# registrar(maximo, disponible, recarga) le pasa lo que informa cada respuesta.
+BALDE_GLOBAL = {"reservar": None, "registrar": None}
+
+def _reservar_balde(contexto, costo=None):
+    if BALDE_GLOBAL["reservar"]:
+        BALDE_GLOBAL["reservar"](costo or _costo_por_contexto.get(contexto, COSTO_POR_DEFECTO))
+        return
+    while True:
+        with _lock_throttle:
+            # Sin respuesta previa no hay balde que leer: sale nomás (la respuesta lo trae)
+            if not ESTADO_THROTTLE or not ESTADO_THROTTLE["recarga"]:
+                return
+            estimado = costo or _costo_por_contexto.get(contexto, COSTO_POR_DEFECTO)
+            estimado = min(estimado, ESTADO_THROTTLE["maximo"])
+            ahora = time.time()
+            disponible = min(
+                ESTADO_THROTTLE["maximo"],
+                ESTADO_THROTTLE["disponible"] + (ahora - ESTADO_THROTTLE["momento"]) * ESTADO_THROTTLE["recarga"],
+            )
+            if disponible >= estimado:
+                ESTADO_THROTTLE.update(disponible=disponible - estimado, momento=ahora)
+                return
+            espera = (estimado - disponible) / ESTADO_THROTTLE["recarga"]
+        time.sleep(min(espera, 5))
+
+def _registrar_throttle(data, contexto="graphql"):
+    costo = (data.get("extensions") or {}).get("cost") or {}
+    estado = costo.get("throttleStatus")
+    if not estado:
+        return
+    with _lock_throttle:
+        if costo.get("requestedQueryCost"):
+            _costo_por_contexto[contexto] = float(costo["requestedQueryCost"])
+        ahora = time.time()
+        disponible = float(estado.get("currentlyAvailable", 0))
+        if ESTADO_THROTTLE.get("recarga"):
+            # Otros hilos pudieron reservar después de que Shopify armó esta respuesta:
+            # se queda lo menor entre lo que dice Shopify y lo que llevamos descontado
+            disponible = min(disponible, ESTADO_THROTTLE["disponible"] + (ahora - ESTADO_THROTTLE["momento"]) * ESTADO_THROTTLE["recarga"])
+        ESTADO_THROTTLE.update(
+            maximo=float(estado.get("maximumAvailable", 0)),
+            disponible=disponible,
+            recarga=float(estado.get("restoreRate", 0)),
+            momento=ahora,
+        )
+    if BALDE_GLOBAL["registrar"]:
+        BALDE_GLOBAL["registrar"](
+            float(estado.get("maximumAvailable", 0)),
+            float(estado.get("currentlyAvailable", 0)),
+            float(estado.get("restoreRate", 0)),
+        )
+
+# 🔌 SESIÓN HTTP: cada hilo usa su propia requests.Session (no se comparte estado entre
+# hilos), pero todas montan el MISMO adaptador: un solo pool de SHOPIFY_HTTP_POOL
+# conexiones keep-alive. Así las mutaciones no pagan un handshake TLS cada una y los
+# hilos de un pool nuevo (cada paso crea el suyo) reusan las conexiones que ya están abiertas.
+_sesiones = threading.local()
+_adaptador = {"http": None}
+_lock_adaptador = threading.Lock()
+
+def sesion_shopify():
+    sesion = getattr(_sesiones, "sesion", None)
+    if sesion is None:
+        with _lock_adaptador:
+            if _adaptador["http"] is None:
+                _adaptador["http"] = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=SHOPIFY_HTTP_POOL
+                )
+        sesion = requests.Session()
+        sesion.mount("https://", _adaptador["http"])
+        sesion.mount("http://", _adaptador["http"])
+        _sesiones.sesion = sesion
+    return sesion
+
+def shopify_graphql(query, variables=None, contexto="graphql", max_retries=6, costo=None):
     headers = {
         "Content-Type": "application/json",
         "X-Shopify-Access-Token": SHOPIFY_ADMIN_TOKEN,
@@ -180,12 +368,14 @@ def shopify_graphql(query, variables=None, contexto="graphql", max_retries=6):
         print(f"⚠️ ADVERTENCIA: 'variables' ignoradas porque no son un dict válido en {contexto}")
 
     for intento in range(max_retries):
+        _reservar_balde(contexto, costo)
         try:
-            resp = requests.post(
+            cliente = sesion_shopify() if SHOPIFY_HTTP_POOL > 0 else requests
+            resp = cliente.post(
                 GRAPHQL_ENDPOINT,
                 headers=headers,
                 json=payload,
-                timeout=40,
+                timeout=(SHOPIFY_TIMEOUT_CONEXION, SHOPIFY_TIMEOUT_LECTURA),
             )
 
             if resp.status_code == 429:
@@ -199,6 +389,7 @@ def shopify_graphql(query, variables=None, contexto="graphql", max_retries=6):
                 return None
 
             data = resp.json()
+            _registrar_throttle(data, contexto)
 
             if "errors" in data and data["errors"]:
                 print(f"\n⚠️ Errores GraphQL top-level en {contexto}:")
@@ -241,73 +432,87 @@ def login_mediven():
     print(f"✅ Token obtenido. IdSuc: {idsuc}")
     return token, idsuc
 
+# Modo daemon: el token se reutiliza entre ciclos y se pide otro al vencer
+# (o si Mediven lo rechaza antes)
+MEDIVEN_TOKEN_MINUTOS = float(os.getenv("MEDIVEN_TOKEN_MINUTOS", "20"))
+_sesion_mediven = {"token": None, "idsuc": None, "vence": 0.0}
+
+def sesion_mediven(reusar=False):
+    if reusar and _sesion_mediven["token"] and time.monotonic() < _sesion_mediven["vence"]:
+        return _sesion_mediven["token"], _sesion_mediven["idsuc"]
+    token, idsuc = login_mediven()
+    _sesion_mediven.update(token=token, idsuc=idsuc, vence=time.monotonic() + MEDIVEN_TOKEN_MINUTOS * 60)
+    return token, idsuc
+
 # ============================
 # INVENTARIO MEDIVEN (MANTENIDO ORIGINAL)
 # ============================
-def get_mediven_inventory():
-    token, idsuc = login_mediven()
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Origin": "https://b2b.mediven.cl:8387",
-        "Referer": "https://b2b.mediven.cl:8387/",
-    }
-
-    payload = {"IdSuc": idsuc}
+def get_mediven_inventory(registro_excluidos=None, cancelar=None, progreso=None, reusar_sesion=False):
+    """
+    Descarga y filtra el inventario Mediven.
+    Si se entrega una lista en registro_excluidos, se llena con los productos
+    descartados y la palabra que los excluyó (para el reporte Excel).
+    cancelar / progreso: descarga en paralelo con Shopify (ver sync_paralelo);
+    progreso(hechos, total, detalle) avanza por pasos.
+    reusar_sesion: modo daemon, usa el token de la corrida anterior si sigue vigente.
+    """
+    import pandas as pd
+
+    progreso = progreso or (lambda *a: None)
+    progreso(0, 4, "login")
+    token, idsuc = sesion_mediven(reusar_sesion)
+    revisar_cancelacion(cancelar)
+    progreso(1, 4, "descargando inventario")
+
+    def pedir_inventario(token, idsuc):
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Origin": "https://b2b.mediven.cl:8387",
+            "Referer": "https://b2b.mediven.cl:8387/",
+        }
+        payload = {"IdSuc": idsuc}
+        return requests.post(INVENTORY_URL, headers=headers, json=payload)
 
     print("Descargando inventario desde Mediven...")
-    resp = requests.post(INVENTORY_URL, headers=headers, json=payload)
+    resp = pedir_inventario(token, idsuc)
+    if reusar_sesion and resp.status_code in (401, 403):
+        # Token reutilizado que Mediven ya no acepta: uno nuevo y se reintenta una vez
+        print("🔑 Token de Mediven vencido. Iniciando sesión de nuevo...")
+        resp = pedir_inventario(*sesion_mediven(reusar=False))
     resp.raise_for_status()
 
+    revisar_cancelacion(cancelar)
+
     data = resp.json()
     items_raw = data.get("value", [])
     print(f"✅ Mediven (Bruto): {len(items_raw)} productos.")
+    progreso(2, 4, f"filtrando {len(items_raw)} productos")
 
-    palabras_excluidas = [
-        "perro", "perros","cachorro",
-        "gato", "gatos",
-        "mascota", "veterinaria",
-        "mundo animal", "uso veterinario",
-        "metilfenidato",
-        "clonazepam",
-        "clotiazepam",
-        "fentermina",
-        "alprazolam",
-        "lorazepam",
-        "abolengo",
-        "aromatizante",
-        "detergente",
-        "arena para gatos",
-        "(ec)",
-        "lisdexanfetamina",
-        "airwick"
-    ]
+    # 🐾 Exclusión en una sola pasada (lista maestra compartida con sync.py)
+    palabras = detectar_excluidos(pd.DataFrame(items_raw))
 
     items_limpios = []
     excluidos = 0
 
-    for item in items_raw:
-        texto_busqueda = " ".join([
-            str(item.get("Descripcion", "")),
-            str(item.get("Laboratorio", "")),
-            str(item.get("Equivalente", "")),
-            str(item.get("AccionTerapeutica", ""))
-        ]).lower()
-
-        es_excluido = False
-        for palabra in palabras_excluidas:
-            if palabra in texto_busqueda:
-                es_excluido = True
-                break
-        
-        if es_excluido:
-            excluidos += 1
-        else:
+    for item, palabra in zip(items_raw, palabras):
+        if palabra is None:
             items_limpios.append(item)
+            continue
+
+        excluidos += 1
+        if registro_excluidos is not None:
+            registro_excluidos.append({
+                "SKU": str(item.get("Codigo", "")).strip(),
+                "Descripcion": item.get("Descripcion", ""),
+                "Laboratorio": item.get("Laboratorio", ""),
+                "Palabra_Excluida": palabra,
+            })
 
     print(f"🧹 Filtrados {excluidos} productos excluidos/veterinarios.")
     print(f"📋 Total final válido: {len(items_limpios)} productos.")
+    revisar_cancelacion(cancelar)
+    progreso(3, 4, "guardando")
 
     try:
         with open("mediven_full.json", "w", encoding="utf-8") as f:
@@ -338,6 +543,7 @@ def get_mediven_inventory():
         print(f"⚠️ Error guardando diccionario logístico: {e}")
     # ----------------------------------------------------------------
 
+    progreso(4, 4, f"{len(items_limpios)} productos")
     return items_limpios
 
 # ============================
@@ -360,13 +566,34 @@ def exportar_skus_mediven():
 # ============================
 # SHOPIFY - LECTURA POR GRAPHQL (MANTENIDO ORIGINAL)
 # ============================
-def get_shopify_products():
+def get_shopify_products(cancelar=None, progreso=None):
+    products = list(iterar_productos_shopify(cancelar, progreso))
+    print(f"✅ Shopify (GraphQL): {len(products)} productos cargados.")
+    return products
+
+def contar_productos_shopify():
+    """Total de productos (para la barra de progreso). None si no se pudo leer."""
+    data = shopify_graphql("{ productsCount(limit: null) { count } }", contexto="products_count")
+    try:
+        return int(data["data"]["productsCount"]["count"])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+def iterar_productos_shopify(cancelar=None, progreso=None, filtro=None):
+    """
+    Igual que get_shopify_products, pero entrega los productos página a página
+    (generador) para no tener todo el catálogo en memoria.
+    cancelar / progreso: descarga en paralelo con Mediven (ver sync_paralelo);
+    progreso(acumulados, total, detalle) se llama después de cada página.
+    filtro: búsqueda de Shopify (ej: "updated_at:>'2026-01-01T00:00:00Z'" en el modo daemon).
+    """
     print("Descargando productos de Shopify (GraphQL, solo lectura)...")
-    products = []
+    acumulados = 0
+    total = contar_productos_shopify() if progreso and not filtro else None
 
     query = """
-    query($cursor: String) {
-      products(first: 100, after: $cursor) {
+    query($cursor: String, $filtro: String) {
+      products(first: 100, after: $cursor, query: $filtro) {
         pageInfo {
           hasNextPage
           endCursor
@@ -399,9 +626,10 @@ def get_shopify_products():
     last_log = ""
 
     while True:
+        revisar_cancelacion(cancelar)
         data = shopify_graphql(
             query,
-            variables={"cursor": cursor},
+            variables={"cursor": cursor, "filtro": filtro},
             contexto="get_shopify_products_graphql",
         )
         if not data or "data" not in data or not data["data"].get("products"):
@@ -449,20 +677,21 @@ def get_shopify_products():
                     }
                 )
 
-            products.append(
-                {
-                    "id": product_id,
-                    "title": title,
-                    "bodyHtml": body_html,
-                    "status": status_norm,
-                    "has_image": has_image,
-                    "variants": rest_variants,
-                }
-            )
+            acumulados += 1
+            yield {
+                "id": product_id,
+                "title": title,
+                "bodyHtml": body_html,
+                "status": status_norm,
+                "has_image": has_image,
+                "variants": rest_variants,
+            }
 
-        acumulados = len(products)
         log_msg = f"   → Página {page} (acumulados: {acumulados} productos)..."
-        if log_msg != last_log:
+        if progreso:
+            # La barra ya muestra el avance (el \r pisaría la barra)
+            progreso(acumulados, total, f"página {page}")
+        elif log_msg != last_log:
             print(f"\r{log_msg}", end="", flush=True)
             last_log = log_msg
 
@@ -473,30 +702,166 @@ def get_shopify_products():
         cursor = page_info.get("endCursor")
 
     print()
-    print(f"✅ Shopify (GraphQL): {len(products)} productos cargados.")
-    return products
+
+def _producto_desde_nodo(node):
+    """Nodo Product de GraphQL → dict con la forma de iterar_productos_shopify."""
+    gid = node.get("id", "")
+    status = (node.get("status") or "ACTIVE").lower()
+    variantes = []
+    for vedge in (node.get("variants") or {}).get("edges", []) or []:
+        vnode = vedge.get("node") or {}
+        vgid = vnode.get("id", "")
+        variantes.append({
+            "id": vgid.split("/")[-1] if vgid else None,
+            "sku": vnode.get("sku"),
+            "price": vnode.get("price") or "0",
+            "taxable": vnode.get("taxable", False),
+        })
+    return {
+        "id": gid.split("/")[-1] if gid else None,
+        "title": node.get("title", ""),
+        "bodyHtml": node.get("bodyHtml", "") or "",
+        "status": status,
+        "has_image": len((node.get("media") or {}).get("edges", []) or []) > 0,
+        "variants": variantes,
+    }
+
+# SKUs por consulta de productVariants(query: "sku:A OR sku:B ...")
+LOTE_SKUS_SHOPIFY = 50
+
+def get_shopify_products_por_sku(skus, cancelar=None, progreso=None):
+    """
+    Solo los productos que tienen alguna variante con esos SKUs (modo --skus),
+    sin paginar el catálogo. Misma forma que get_shopify_products.
+    """
+    skus = sorted({str(s).strip() for s in skus if str(s).strip()})
+    query = """
+    query($q: String!, $cursor: String) {
+      productVariants(first: 50, query: $q, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        edges {
+          node {
+            sku
+            product {
+              id
+              title
+              bodyHtml
+              status
+              media(first: 1) { edges { node { id } } }
+              variants(first: 100) { edges { node { id sku price taxable } } }
+            }
+          }
+        }
+      }
+    }
+    """
+
+    productos = {}
+    buscados = set(skus)
+    for i in range(0, len(skus), LOTE_SKUS_SHOPIFY):
+        revisar_cancelacion(cancelar)
+        if progreso:
+            progreso(i, len(skus), "SKUs")
+        lote = skus[i:i + LOTE_SKUS_SHOPIFY]
+        # sku:"X" con comillas: algunos SKUs traen guiones o espacios
+        filtro = " OR ".join(f"sku:{json.dumps(s)}" for s in lote)
+        cursor = None
+        while True:
+            data = shopify_graphql(query, {"q": filtro, "cursor": cursor}, contexto="get_shopify_por_sku")
+            if not data or "data" not in data or not data["data"].get("productVariants"):
+                raise Exception("🛑 CRÍTICO: Falló la lectura de Shopify por SKU. Abortando para no crear duplicados.")
+            bloque = data["data"]["productVariants"]
+            for edge in bloque.get("edges", []) or []:
+                node = edge.get("node") or {}
+                producto = node.get("product") or {}
+                # La búsqueda de Shopify no es exacta: solo cuenta el SKU idéntico
+                if str(node.get("sku") or "").strip() in buscados and producto.get("id"):
+                    productos.setdefault(producto["id"], _producto_desde_nodo(producto))
+            if not (bloque.get("pageInfo") or {}).get("hasNextPage"):
+                break
+            cursor = bloque["pageInfo"]["endCursor"]
+
+    if progreso:
+        progreso(len(skus), len(skus), f"{len(productos)} productos")
+    print(f"✅ Shopify (por SKU): {len(productos)} productos para {len(skus)} SKUs.")
+    return list(productos.values())
+
+# Variantes por consulta nodes(ids: [...]): cada una trae su producto y media(first: 1),
+# así el costo pedido de un lote queda bajo el máximo de 1000 por consulta
+LOTE_NODES_SHOPIFY = 100
+
+def get_shopify_variantes_por_id(variant_ids, cancelar=None, progreso=None):
+    """
+    Lectura directa por ID (carril rápido): nodes(ids: [...]) por lotes, sin búsqueda
+    ni paginación y sin bodyHtml. Retorna productos con la forma de iterar_productos_shopify,
+    cada uno solo con las variantes pedidas. Los IDs que ya no existen no vienen.
+    """
+    ids = sorted({str(v).split("/")[-1] for v in variant_ids if v})
+    query = """
+    query($ids: [ID!]!) {
+      nodes(ids: $ids) {
+        ... on ProductVariant {
+          id
+          sku
+          price
+          taxable
+          product {
+            id
+            title
+            status
+            media(first: 1) { edges { node { id } } }
+          }
+        }
+      }
+    }
+    """
+
+    productos = {}
+    for i in range(0, len(ids), LOTE_NODES_SHOPIFY):
+        revisar_cancelacion(cancelar)
+        if progreso:
+            progreso(i, len(ids), "variantes")
+        lote = [f"gid://shopify/ProductVariant/{v}" for v in ids[i:i + LOTE_NODES_SHOPIFY]]
+        data = shopify_graphql(query, {"ids": lote}, contexto="get_shopify_por_id")
+        if not data or "data" not in data or data["data"].get("nodes") is None:
+            raise Exception("🛑 CRÍTICO: Falló la lectura de Shopify por ID. Abortando para no crear duplicados.")
+        for vnode in data["data"]["nodes"]:
+            # null: la variante se borró (o el ID ya no es una variante)
+            if not vnode or not (vnode.get("product") or {}).get("id"):
+                continue
+            nodo = dict(vnode["product"], variants={"edges": [{"node": vnode}]})
+            producto = _producto_desde_nodo(nodo)
+            if producto["id"] in productos:
+                productos[producto["id"]]["variants"].extend(producto["variants"])
+            else:
+                productos[producto["id"]] = producto
+
+    if progreso:
+        progreso(len(ids), len(ids), f"{len(productos)} productos")
+    print(f"✅ Shopify (por ID): {sum(len(p['variants']) for p in productos.values())} de {len(ids)} variantes.")
+    return list(productos.values())
 
 def normalize_shopify_products(products):
-    rows = []
+    return list(iterar_filas_shopify(products))
+
+def iterar_filas_shopify(products):
+    """Versión generador de normalize_shopify_products (una fila por variante)."""
     for p in products:
         product_id = p.get("id")
         product_title = p.get("title", "")
         status = p.get("status", "active")
         for v in p.get("variants", []):
-            rows.append(
-                {
-                    "product_id": product_id,
-                    "product_title": product_title,
-                    "bodyHtml": p.get("bodyHtml", ""),
-                    "has_image": p.get("has_image", True),
-                    "variant_id": v.get("id"),
-                    "sku": v.get("sku"),
-                    "price": float(v.get("price", 0) or 0),
-                    "status": status,
-                    "taxable": v.get("taxable", False),
-                }
-            )
-    return rows
+            yield {
+                "product_id": product_id,
+                "product_title": product_title,
+                "bodyHtml": p.get("bodyHtml", ""),
+                "has_image": p.get("has_image", True),
+                "variant_id": v.get("id"),
+                "sku": v.get("sku"),
+                "price": float(v.get("price", 0) or 0),
+                "status": status,
+                "taxable": v.get("taxable", False),
+            }
 
 def calcular_precio(precio_base):
     try:
@@ -514,7 +879,9 @@ def calcular_precio(precio_base):
 # ============================
 # GENERAR EXCEL (MANTENIDO ORIGINAL)
 # ============================
-def generar_excel(crear, actualizar, archivar, mediven_data):
+def generar_excel(crear, actualizar, archivar, mediven_data, excluidos=None, diferidos=None):
+    import pandas as pd
+
     fecha = datetime.now().strftime("%Y-%m-%d_%H-%M")
     ruta = os.path.join(REPORT_DIR, f"diagnostico_sync_{fecha}.xlsx")
 
@@ -532,6 +899,8 @@ def generar_excel(crear, actualizar, archivar, mediven_data):
                 "Precio_Nuevo": item.get("Nuevo_Precio", 0),
                 "Diferencia": item.get("Nuevo_Precio", 0)
                 - item.get("Precio_Shopify", 0),
+                "Impacto": item.get("Impacto", 0),
+                "Bajo_Costo": item.get("Bajo_Costo", False),
             }
         )
     df_cambios = pd.DataFrame(cambios_rows)
@@ -541,6 +910,10 @@ def generar_excel(crear, actualizar, archivar, mediven_data):
         df_actualizar.to_excel(writer, index=False, sheet_name="ACTUALIZAR")
         df_archivar.to_excel(writer, index=False, sheet_name="ARCHIVAR")
         df_cambios.to_excel(writer, index=False, sheet_name="CAMBIOS_PRECIO")
+        if excluidos is not None:
+            pd.DataFrame(excluidos).to_excel(writer, index=False, sheet_name="EXCLUIDOS")
+        if diferidos is not None:
+            pd.DataFrame(diferidos).to_excel(writer, index=False, sheet_name="ARCHIVO_DIFERIDO")
 
     print(f"📊 Excel generado: {ruta}")
 
@@ -597,6 +970,7 @@ def sincronizar_con_shopify(crear, actualizar, archivar, solo_archivar=False):
 # ============================
 def main():
     import sys
+    import pandas as pd
 
     modo = "diagnostico"
     solo_archivar = False
@@ -639,6 +1013,7 @@ def main():
 
     df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
 
+    cargar_cache_nombres()
     skus_med = set(df_med["Codigo"])
 
     shop_by_sku = {}
@@ -655,7 +1030,7 @@ def main():
         sku = row["Codigo"]
         
         # GENERAMOS LOS DATOS NUEVOS USANDO LAS NUEVAS LÓGICAS
-        nom_gen = formatear_nombre_producto(row)
+        nom_gen = formatear_nombre_cacheado(row)
         nuevo_precio = calcular_precio(row.get("Precio", 0))
 
         if sku in shop_by_sku:
@@ -703,6 +1078,8 @@ def main():
                 }
             )
 
+    guardar_cache_nombres()
+
     # NUEVA LÓGICA DE CONTEO PARA EL LOG
     ya_archivados = len([p for p in archivar if p.get("status_actual") == "archived"])
     nuevos_por_archivar = len([p for p in archivar if p.get("status_actual") != "archived"])
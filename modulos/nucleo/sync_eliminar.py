@@ -3,11 +3,20 @@
 
 # 🔌 Importamos la conexión centralizada desde el diagnóstico para no repetir código
 from modulos.nucleo.sync_diagnostico import shopify_graphql
+from modulos.nucleo.sync_bulk import ejecutar_bulk_mutation
+from modulos.nucleo.sync_estrategia import RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK, TAMANO_ALIAS, COSTO_MUTACION
+from modulos.nucleo.sync_presupuesto import vencido, registrar_diferido
+
+MUTACION_ARCHIVAR_BULK = """
+mutation archivar($input: ProductInput!) {
+  productUpdate(input: $input) { product { id status } userErrors { field message } }
+}
+"""
 
 # ============================
 # ARCHIVAR PRODUCTOS (ESCUDO SEO)
 # ============================
-def archive_products_graphql(archivar):
+def archive_products_graphql(archivar, ruta=RUTA_ALIAS, hasta=None):
     if not archivar:
         return 0, 0
 
@@ -32,13 +41,26 @@ def archive_products_graphql(archivar):
 
     print(f"📦 Archivando {total} productos (Protección SEO) con GraphQL...")
 
-    BATCH_UPDATE = 50
+    if ruta == RUTA_BULK and not vencido(hasta):
+        lineas = [{"input": {"id": gid, "status": "ARCHIVED"}} for gid in product_gids]
+        r = ejecutar_bulk_mutation(MUTACION_ARCHIVAR_BULK, lineas, "productUpdate", contexto="productArchive_bulk")
+        if r is not None:
+            print(f"✅ Archivado completado. OK={r['ok']}, errores={r['errores']}")
+            return r["ok"], r["errores"]
+        print("↩️ Bulk no disponible → se sigue con alias.")
+
+    BATCH_UPDATE = 1 if ruta == RUTA_POR_PRODUCTO else TAMANO_ALIAS
     ok_total = 0
     err_total = 0
     procesadas = 0
     total_batches = (total + BATCH_UPDATE - 1) // BATCH_UPDATE
 
     for batch_index in range(0, total, BATCH_UPDATE):
+        if vencido(hasta):
+            resto = set(product_gids[batch_index:])
+            skus = [p["SKU"] for p in nuevos_por_archivar if f"gid://shopify/Product/{p.get('product_id')}" in resto]
+            registrar_diferido("archivar", len(resto), skus)
+            break
         batch_num = batch_index // BATCH_UPDATE + 1
         batch_gids = product_gids[batch_index : batch_index + BATCH_UPDATE]
 
@@ -64,6 +86,7 @@ def archive_products_graphql(archivar):
             mutation,
             None,
             contexto="productArchive_bulk_aliases",
+            costo=COSTO_MUTACION * len(alias_bodies),
         )
 
         if not data or "data" not in data:
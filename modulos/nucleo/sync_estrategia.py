@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import math
+
+from modulos.nucleo.sync_diagnostico import ESTADO_THROTTLE, shopify_graphql
+
+# ============================
+# ESTRATEGIA DE ESCRITURA (COSTO Y TIEMPO POR RUTA)
+# ============================
+# Cada paso del "aplicar" se puede mandar por tres rutas:
+#   por_producto: una mutación por request
+#   alias:        hasta TAMANO_ALIAS mutaciones con alias en un request
+#   bulk:         bulkOperationRunMutation (JSONL subido, Shopify lo procesa sin balde)
+# Se estima costo (puntos del balde) y tiempo de cada una y se elige la más rápida.
+RUTA_POR_PRODUCTO = "por_producto"
+RUTA_ALIAS = "alias"
+RUTA_BULK = "bulk"
+
+TAMANO_ALIAS = 50
+
+# Shopify cobra 10 puntos por mutación (con o sin alias)
+COSTO_MUTACION = 10
+
+# Valores medidos a mano; se pueden ajustar por .env
+LATENCIA_REQUEST = float(os.getenv("SYNC_LATENCIA_REQUEST", "0.4"))
+LATENCIA_POR_ALIAS = float(os.getenv("SYNC_LATENCIA_POR_ALIAS", "0.03"))
+BULK_SEGUNDOS_FIJOS = float(os.getenv("SYNC_BULK_SEGUNDOS_FIJOS", "30"))
+BULK_FILAS_POR_SEGUNDO = float(os.getenv("SYNC_BULK_FILAS_POR_SEGUNDO", "25"))
+
+# Balde del plan estándar si todavía no hay respuesta de Shopify de la cual leerlo
+THROTTLE_POR_DEFECTO = {"maximo": 2000.0, "disponible": 2000.0, "recarga": 100.0}
+
+# Rutas que soporta cada paso. Crear es productCreate + stock + publicación por producto
+# (con workers en paralelo), así que solo tiene la suya.
+RUTAS_POR_PASO = {
+    "precios_bajo_costo": [RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK],
+    "crear": [RUTA_POR_PRODUCTO],
+    "precios": [RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK],
+    "basicos": [RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK],
+    "archivar": [RUTA_POR_PRODUCTO, RUTA_ALIAS, RUTA_BULK],
+}
+MUTACIONES_POR_FILA = {"crear": 3}
+CONCURRENCIA_POR_PASO = {"crear": 6}
+
+def leer_throttle():
+    """
+    Estado actual del balde (lo que dejó la última respuesta de Shopify).
+    Si no hubo ninguna, hace una consulta mínima para leerlo.
+    """
+    if not ESTADO_THROTTLE:
+        shopify_graphql("{ shop { id } }", contexto="throttle_status")
+    if not ESTADO_THROTTLE:
+        return dict(THROTTLE_POR_DEFECTO)
+    return {k: ESTADO_THROTTLE[k] for k in THROTTLE_POR_DEFECTO}
+
+def _espera_balde(costo, throttle):
+    # Lo que pase del disponible se paga a la velocidad de recarga
+    recarga = throttle["recarga"] or THROTTLE_POR_DEFECTO["recarga"]
+    return max(0.0, costo - throttle["disponible"]) / recarga
+
+def estimar_ruta(n_filas, ruta, throttle, mutaciones_por_fila=1, concurrencia=1):
+    """Retorna {"ruta", "requests", "costo", "segundos"} para mandar n_filas por esa ruta."""
+    mutaciones = n_filas * mutaciones_por_fila
+    if ruta == RUTA_BULK:
+        segundos = BULK_SEGUNDOS_FIJOS + n_filas / BULK_FILAS_POR_SEGUNDO
+        # staged upload + run + un poll cada 5s (las consultas de poll cuestan ~1 punto)
+        polls = math.ceil(segundos / 5)
+        return {"ruta": ruta, "requests": 2 + polls, "costo": 2 * COSTO_MUTACION + polls, "segundos": segundos}
+
+    if ruta == RUTA_ALIAS:
+        requests = math.ceil(mutaciones / TAMANO_ALIAS)
+        por_request = LATENCIA_REQUEST + min(mutaciones, TAMANO_ALIAS) * LATENCIA_POR_ALIAS
+    else:
+        requests = mutaciones
+        por_request = LATENCIA_REQUEST
+    costo = mutaciones * COSTO_MUTACION
+    segundos = max(requests * por_request / concurrencia, _espera_balde(costo, throttle))
+    return {"ruta": ruta, "requests": requests, "costo": costo, "segundos": segundos}
+
+def planificar_estrategia(filas_por_paso, throttle=None):
+    """
+    filas_por_paso: {paso: cantidad de filas} (precios cuenta productos: va una mutación por producto).
+    Retorna {paso: {"filas", "elegida", "opciones": {ruta: estimación}}} con la ruta más rápida
+    (a igual tiempo, la más barata). Los pasos se estiman en orden, descontando del balde
+    lo que gasta cada uno.
+    """
+    throttle = dict(throttle or leer_throttle())
+    plan = {}
+    for paso, n_filas in filas_por_paso.items():
+        if not n_filas:
+            continue
+        opciones = {
+            ruta: estimar_ruta(
+                n_filas, ruta, throttle,
+                MUTACIONES_POR_FILA.get(paso, 1), CONCURRENCIA_POR_PASO.get(paso, 1),
+            )
+            for ruta in RUTAS_POR_PASO[paso]
+        }
+        elegida = min(opciones.values(), key=lambda e: (e["segundos"], e["costo"]))
+        plan[paso] = {"filas": n_filas, "elegida": elegida["ruta"], "opciones": opciones}
+
+        # El paso siguiente arranca con el balde que deja este (más lo que recargó mientras)
+        throttle["disponible"] = min(
+            throttle["maximo"],
+            max(0.0, throttle["disponible"] - elegida["costo"]) + elegida["segundos"] * throttle["recarga"],
+        )
+    return plan
+
+def filas_por_paso(crear, actualizar, archivar, borrar=True):
+    """Cuántas filas manda cada paso del aplicar (precios cuenta productos, no variantes)."""
+    return {
+        "precios_bajo_costo": len({p["product_id"] for p in actualizar if p.get("Bajo_Costo")}),
+        "crear": len(crear),
+        "precios": len({p["product_id"] for p in actualizar if not p.get("Bajo_Costo")}),
+        "basicos": len([p for p in actualizar if p.get("actualizar_basicos")]),
+        "archivar": len([p for p in archivar if p.get("status_actual") != "archived"]) if borrar else 0,
+    }
+
+def totales_estrategia(plan, throttle=None, en_paralelo=False):
+    """
+    en_paralelo: precios bajo costo van solos primero y el resto de los pasos a la vez
+    (sync.py aplicar_plan). El tiempo es el del paso más largo, salvo que el costo junto
+    de todos no quepa en el balde: entonces manda la recarga.
+    """
+    elegidas = {paso: p["opciones"][p["elegida"]] for paso, p in plan.items()}
+    totales = {
+        "segundos": sum(e["segundos"] for e in elegidas.values()),
+        "costo": sum(e["costo"] for e in elegidas.values()),
+        "requests": sum(e["requests"] for e in elegidas.values()),
+    }
+    if en_paralelo:
+        primero = elegidas.get("precios_bajo_costo", {}).get("segundos", 0.0)
+        resto = [e for paso, e in elegidas.items() if paso != "precios_bajo_costo"]
+        # Bulk no pasa por el balde
+        costo_balde = sum(e["costo"] for e in resto if e["ruta"] != RUTA_BULK)
+        throttle = throttle or THROTTLE_POR_DEFECTO
+        totales["segundos"] = primero + max(
+            [e["segundos"] for e in resto] + [_espera_balde(costo_balde, throttle)], default=0.0
+        )
+    return totales
+
+def ruta_de(plan, paso):
+    """Ruta elegida para un paso (la de siempre si el paso no estaba en el plan)."""
+    if paso in plan:
+        return plan[paso]["elegida"]
+    return RUTA_POR_PRODUCTO if paso in ("precios_bajo_costo", "precios", "crear") else RUTA_ALIAS
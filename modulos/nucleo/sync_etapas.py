@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ============================
+# PLANIFICADOR DE ETAPAS POST-SYNC
+# ============================
+# Impuestos, Mini-Espía, IA, imágenes y SEO usan servicios distintos (Shopify,
+# Gemini, Serper). Cada etapa declara de qué depende de verdad (SEO sube lo que
+# generó la IA) y qué servicios usa; las que no dependen entre sí corren a la vez,
+# con un máximo de etapas simultáneas por servicio.
+LIMITES_SERVICIO = {
+    # Shopify: el balde de costo es uno solo, dos etapas a la vez lo aprovechan sin ahogarlo
+    "shopify": int(os.getenv("SYNC_LIMITE_SHOPIFY", "2")),
+    "gemini": int(os.getenv("SYNC_LIMITE_GEMINI", "1")),
+    # Espía e imágenes comparten la cuota de Serper
+    "serper": int(os.getenv("SYNC_LIMITE_SERPER", "1")),
+}
+
+def etapa(nombre, funcion, servicios=(), depende=()):
+    """funcion(): corre la etapa. depende: nombres de etapas que deben terminar antes."""
+    return {"nombre": nombre, "funcion": funcion, "servicios": tuple(servicios), "depende": tuple(depende)}
+
+def carriles(etapas):
+    """
+    {nombre: etapas que no pueden correr a la vez con ella}: las que dependen de ella (directa
+    o indirectamente) y las que comparten un servicio de a una etapa a la vez (con lo que
+    dependa de ellas). Sirve para repartir el tiempo (sync_presupuesto.plazo_etapa).
+    """
+    dependientes = {e["nombre"]: set() for e in etapas}
+    cambio = True
+    while cambio:
+        cambio = False
+        for e in etapas:
+            for d in e["depende"]:
+                if d in dependientes:
+                    nuevos = ({e["nombre"]} | dependientes[e["nombre"]]) - dependientes[d]
+                    if nuevos:
+                        dependientes[d] |= nuevos
+                        cambio = True
+
+    resultado = {}
+    for e in etapas:
+        turnos = {
+            otra["nombre"] for otra in etapas
+            if otra is not e and any(s in otra["servicios"] and LIMITES_SERVICIO.get(s, 1) == 1 for s in e["servicios"])
+        }
+        resultado[e["nombre"]] = dependientes[e["nombre"]] | turnos | {x for t in turnos for x in dependientes[t]}
+    return resultado
+
+def _correr(e, semaforos, listo, al_cambiar):
+    # Orden fijo al tomar varios semáforos: dos etapas no se bloquean entre sí
+    tomados = [semaforos[s] for s in sorted(e["servicios"])]
+    for semaforo in tomados:
+        semaforo.acquire()
+    inicio = time.monotonic()
+    al_cambiar(e["nombre"], "corriendo")
+    estado, error, retorno = "ok", None, None
+    try:
+        retorno = e["funcion"]()
+    except Exception as ex:
+        estado, error = "error", str(ex)
+        print(f"\n❌ Error en la etapa {e['nombre']}: {ex}")
+    finally:
+        for semaforo in reversed(tomados):
+            semaforo.release()
+    fin = time.monotonic()
+    al_cambiar(e["nombre"], estado)
+    return {
+        "nombre": e["nombre"],
+        "servicios": e["servicios"],
+        "estado": estado,
+        "error": error,
+        "retorno": retorno,
+        "espera": inicio - listo,
+        "duracion": fin - inicio,
+        "inicio": inicio,
+        "fin": fin,
+    }
+
+def correr_etapas(etapas, al_cambiar=None):
+    """
+    Corre las etapas respetando dependencias y límites por servicio.
+    Un error en una etapa no corta las demás (como cuando iban en serie, cada una con su
+    try/except); las que dependen de ella corren igual con lo que haya en disco.
+    Dependencias hacia etapas que no están en la lista (ej: --only seo) se dan por cumplidas.
+    al_cambiar(nombre, estado): "corriendo" / "ok" / "error" (para la barra de progreso).
+    Retorna [{nombre, servicios, estado, error, retorno, espera, duracion, inicio, fin}] en el orden dado
+    (retorno: lo que devolvió la función de la etapa).
+    """
+    if not etapas:
+        return []
+    al_cambiar = al_cambiar or (lambda *a: None)
+    nombres = {e["nombre"] for e in etapas}
+    semaforos = {
+        servicio: threading.Semaphore(LIMITES_SERVICIO.get(servicio, 1))
+        for e in etapas for servicio in e["servicios"]
+    }
+
+    pendientes = {e["nombre"]: e for e in etapas}
+    hechas, en_curso = {}, {}
+
+    with ThreadPoolExecutor(max_workers=len(etapas)) as executor:
+        while pendientes or en_curso:
+            for nombre, e in list(pendientes.items()):
+                if all(d in hechas or d not in nombres for d in e["depende"]):
+                    futuro = executor.submit(_correr, e, semaforos, time.monotonic(), al_cambiar)
+                    en_curso[futuro] = nombre
+                    del pendientes[nombre]
+            if not en_curso:
+                raise ValueError(f"Dependencias circulares entre etapas: {', '.join(pendientes)}")
+            listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                hechas[en_curso.pop(futuro)] = futuro.result()
+
+    return [hechas[e["nombre"]] for e in etapas]
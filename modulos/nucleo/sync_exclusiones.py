@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+# ============================
+# LISTA MAESTRA DE EXCLUSIÓN (VET, PSICOTRÓPICOS, ASEO, ETC.)
+# ============================
+# Única fuente de verdad: la usan get_mediven_inventory y sync.py
+PALABRAS_EXCLUIDAS = [
+    "perro", "perros", "cachorro",
+    "gato", "gatos",
+    "mascota", "veterinaria",
+    "mundo animal", "uso veterinario",
+    "veterquimica",
+    "metilfenidato",
+    "clonazepam",
+    "clotiazepam",
+    "fentermina",
+    "alprazolam",
+    "lorazepam",
+    "abolengo",
+    "aromatizante",
+    "detergente",
+    "arena para gatos",
+    "(ec)",
+    "lisdexanfetamina",
+    "airwick"
+]
+
+# Campos de Mediven donde se busca (texto unido y en minúsculas)
+CAMPOS_EXCLUSION = ["Descripcion", "Laboratorio", "Equivalente", "AccionTerapeutica"]
+
+# Un solo autómata: alternación compilada (las frases largas primero)
+PATRON_EXCLUSION = re.compile(
+    "(" + "|".join(re.escape(p) for p in sorted(PALABRAS_EXCLUIDAS, key=len, reverse=True)) + ")"
+)
+
+def detectar_excluidos(df):
+    """
+    Revisa todo el catálogo en una sola pasada vectorizada.
+    Retorna una Serie (mismo índice que df) con la palabra que excluyó
+    a cada producto, o None si el producto es válido.
+    """
+    campos = df.reindex(columns=CAMPOS_EXCLUSION).fillna("").astype(str)
+
+    texto = campos[CAMPOS_EXCLUSION[0]]
+    for campo in CAMPOS_EXCLUSION[1:]:
+        texto = texto + " " + campos[campo]
+
+    palabras = texto.str.lower().str.extract(PATRON_EXCLUSION, expand=False)
+    return palabras.astype(object).where(palabras.notna(), None)
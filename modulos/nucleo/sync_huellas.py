@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from modulos.nucleo.sync_diagnostico import REGLAS_NOMBRES_VERSION
+
+# ============================
+# HUELLAS POR SKU (PLAN INCREMENTAL)
+# ============================
+# Por cada SKU guardamos [huella_mediven, huella_shopify]:
+#   huella_mediven: campos Mediven + mediana de mercado + versión de la regla de precio
+#                   del SKU (lo que entra al cálculo)
+#   huella_shopify: estado que DEBERÍA tener Shopify después de aplicar
+#                   (precio, título, estado y el precio que quedó en memoria)
+# Si ambas coinciden con lo de hoy, el resultado del plan sería "sin cambios" y el SKU se salta.
+ARCHIVO_HUELLAS = os.path.join("data", "huellas_sync.json")
+ARCHIVO_DECISIONES = os.path.join("data", "decisiones_precios.json")
+
+CAMPOS_HUELLA_MEDIVEN = ["Descripcion", "Equivalente", "Laboratorio"]
+
+# Subir REVISION si cambia la lógica de construir_plan.
+# Cambios en reglas de nombres invalidan todas las huellas solos; los de reglas de
+# precio solo las de los SKUs del tramo/ruta tocados (va en cada huella_mediven).
+HUELLAS_REVISION = 2
+VERSION_HUELLAS = hashlib.sha1(
+    json.dumps([HUELLAS_REVISION, REGLAS_NOMBRES_VERSION]).encode("utf-8")
+).hexdigest()[:12]
+
+def _hashear(columnas):
+    """Une columnas de texto con un separador y las hashea en lote (pd.util.hash_array)."""
+    texto = columnas[0]
+    for columna in columnas[1:]:
+        texto = texto + "\x1f" + columna
+    hashes = pd.util.hash_array(texto.to_numpy(dtype=object))
+    return np.char.mod("%016x", hashes).astype(object)
+
+def _texto_numero(valores):
+    # 21000 / 21000.0 / "21000.00" → "21000.00" (NaN/None → "")
+    numeros = pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce").to_numpy(dtype=float)
+    texto = np.char.mod("%.2f", numeros).astype(object)
+    texto[np.isnan(numeros)] = ""
+    return pd.Series(texto, dtype=object)
+
+def huellas_mediven(cruce, costos, medianas, reglas_sku):
+    """Huella de lo que entra al plan por fila: costo, campos Mediven, mediana y regla de precio."""
+    columnas = [_texto_numero(costos)]
+    for campo in CAMPOS_HUELLA_MEDIVEN:
+        valores = cruce[campo] if campo in cruce.columns else pd.Series("", index=cruce.index)
+        columnas.append(valores.fillna("").astype(str).reset_index(drop=True))
+    columnas.append(_texto_numero(medianas))
+    columnas.append(pd.Series(reglas_sku, dtype=object))
+    return _hashear(columnas)
+
+def huellas_shopify(precios_venta, nombres, estados, precios_memoria):
+    """Huella del estado Shopify de una variante (más el precio que recuerda el robot)."""
+    return _hashear([
+        _texto_numero(precios_venta),
+        pd.Series(nombres, dtype=object).astype(str),
+        pd.Series(estados, dtype=object).astype(str).str.lower(),
+        _texto_numero(precios_memoria),
+    ])
+
+def cargar_huellas(ruta=ARCHIVO_HUELLAS):
+    """Retorna {sku: [huella_mediven, huella_shopify]}; vacío si no hay archivo o cambiaron las reglas."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print("⚠️ huellas_sync.json corrupto. Se evaluará el catálogo completo.")
+        return {}
+    if data.get("version") != VERSION_HUELLAS:
+        print("♻️ Cambiaron las reglas de precios/nombres → huellas invalidadas (plan completo).")
+        return {}
+    # En disco va "huella_mediven:huella_shopify" (una línea por SKU, diffs chicos en git)
+    return {sku: valor.split(":") for sku, valor in data.get("skus", {}).items()}
+
+def guardar_huellas(huellas, ruta=ARCHIVO_HUELLAS):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    skus = {sku: f"{h_med}:{h_shop}" for sku, (h_med, h_shop) in huellas.items()}
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_HUELLAS, "skus": skus}, f, indent=0, sort_keys=True)
+
+def cargar_decisiones(ruta=ARCHIVO_DECISIONES):
+    """Retorna {sku: [regla, costo, mediana, precio_robot]} de la última corrida aplicada."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print("⚠️ decisiones_precios.json corrupto. Se regenerará en la próxima corrida.")
+        return {}
+
+def guardar_decisiones(decisiones, ruta=ARCHIVO_DECISIONES):
+    # Una línea por SKU, ordenado: el bot de GitHub solo commitea lo que cambió
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(",\n".join(
+            f"{json.dumps(sku, ensure_ascii=False)}: {json.dumps(decisiones[sku])}" for sku in sorted(decisiones)
+        ))
+        f.write("\n}\n")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+# ============================
+# SYNC DIRIGIDA (--skus / --only)
+# ============================
+# Para arreglar unos pocos productos sin la corrida completa:
+#   --skus 7801234,7805678   o   --skus @lista.txt (uno por línea, o separados por coma)
+#   --only precios,nombres   etapas a correr (sin --only: todas)
+# Shopify se consulta solo por esos SKUs y el estado (memoria, huellas, ausencias)
+# se actualiza solo para ellos: el resto del catálogo queda como estaba en disco.
+ETAPAS_OBJETIVO = ("precios", "crear", "nombres", "archivar", "impuestos", "ia", "imagenes", "seo")
+
+def leer_skus(texto):
+    """'A,B' / '@archivo' / ruta a un archivo → set de SKUs."""
+    texto = str(texto or "").strip()
+    ruta = texto[1:] if texto.startswith("@") else texto
+    if texto.startswith("@") or os.path.isfile(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            texto = f.read()
+    skus = {s.strip() for s in re.split(r"[,\s;]+", texto) if s.strip()}
+    if not skus:
+        raise ValueError("--skus sin SKUs (ej: --skus 7801234,7805678 o --skus @lista.txt)")
+    return skus
+
+def leer_etapas(texto):
+    """'precios,nombres' → set de etapas. Sin texto → todas."""
+    if not texto:
+        return set(ETAPAS_OBJETIVO)
+    etapas = {e.strip().lower() for e in texto.split(",") if e.strip()}
+    desconocidas = etapas - set(ETAPAS_OBJETIVO)
+    if desconocidas or not etapas:
+        raise ValueError(
+            f"Etapa(s) inválida(s) en --only: {', '.join(sorted(desconocidas)) or texto!r} "
+            f"(válidas: {', '.join(ETAPAS_OBJETIVO)})"
+        )
+    return etapas
+
+def recortar_a_skus(diccionario, skus):
+    """Parte de un estado por SKU que toca la corrida dirigida."""
+    return {sku: v for sku, v in diccionario.items() if sku in skus}
+
+def recortar_filas(filas, skus):
+    """
+    Filas del plan de los SKUs pedidos. Shopify se consulta por producto: las variantes
+    hermanas de un SKU pedido también llegan, pero no están en Mediven recortado y
+    si no se quitan parecen ausentes (se archivarían o sumarían ausencias).
+    """
+    return [fila for fila in filas if str(fila["SKU"]) in skus]
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ============================
+# DESCARGAS EN PARALELO (MEDIVEN + SHOPIFY)
+# ============================
+# Las dos descargas del inicio son pura espera de red: van en hilos a la vez.
+# Si una falla, la otra se entera por el Event `cancelar` (lo revisa entre
+# páginas / pasos) y se corta limpia, sin seguir gastando requests.
+
+class DescargaCancelada(Exception):
+    """La descarga se cortó porque otra de la misma tanda falló."""
+
+def revisar_cancelacion(cancelar):
+    if cancelar is not None and cancelar.is_set():
+        raise DescargaCancelada()
+
+def correr_en_paralelo(tareas):
+    """
+    tareas: {nombre: funcion(cancelar)}. Retorna {nombre: resultado}.
+    Si alguna falla se cancelan las demás y se relanza el primer error real.
+    """
+    cancelar = threading.Event()
+    resultados, errores = {}, []
+    with ThreadPoolExecutor(max_workers=len(tareas)) as executor:
+        futuros = {executor.submit(funcion, cancelar): nombre for nombre, funcion in tareas.items()}
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    resultados[futuros[futuro]] = futuro.result()
+                except DescargaCancelada:
+                    pass
+                except Exception as e:
+                    cancelar.set()
+                    errores.append((futuros[futuro], e))
+        except BaseException:
+            # Ctrl+C en el hilo principal: que los hilos no sigan bajando en segundo plano
+            cancelar.set()
+            raise
+
+    if errores:
+        nombre, error = errores[0]
+        print(f"\n🛑 Falló la descarga de {nombre}: se cancelaron las demás.")
+        raise error
+    return resultados
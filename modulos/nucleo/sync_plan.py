@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import gzip
+import zlib
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from modulos.nucleo.sync_ausencias import AUSENCIAS_PARA_ARCHIVAR
+from modulos.nucleo.sync_bloqueos import bloqueo, RECURSO_ESTADO
+
+# ============================
+# PLAN SERIALIZADO (sync.py plan / sync.py apply)
+# ============================
+# El plan es todo lo que "aplicar" necesita: las listas crear/actualizar/archivar,
+# los impuestos a quitar y el estado que se guarda después (memoria, huellas,
+# decisiones, ausencias). Va como JSON comprimido con gzip (solo librería estándar;
+# msgpack / Parquet no están en las dependencias del workflow).
+# El nombre y el campo "hash" son el sha256 del contenido: el mismo plan da el mismo hash.
+PLAN_FORMATO = 1
+DIR_PLANES = "planes"
+ARCHIVO_APLICADOS = os.path.join("data", "planes_aplicados.json")
+
+# Un plan más viejo que esto ya no refleja Shopify (precios manuales nuevos, etc.)
+PLAN_MAX_HORAS = float(os.getenv("PLAN_MAX_HORAS", "6"))
+
+# Planes recordados en planes_aplicados.json
+MAX_PLANES_RECORDADOS = 50
+
+def _nativo(valor):
+    # Escalares de NumPy que se cuelan desde los DataFrames
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+def _hash_contenido(contenido):
+    canonico = json.dumps(contenido, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_nativo)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+def armar_plan(crear, actualizar, archivar, impuestos, estado, skus=None, etapas=None):
+    """
+    impuestos: variantes con taxable=True ({product_id, variant_id}).
+    estado: {"memoria_precios", "historial_ausencias", y si hubo plan incremental "huellas", "decisiones"}.
+    skus / etapas: corrida dirigida (--skus / --only). El estado trae solo esos SKUs y al
+    guardarse no toca los demás. None = catálogo completo / todas las etapas.
+    """
+    contenido = {
+        "formato": PLAN_FORMATO,
+        "crear": crear,
+        "actualizar": actualizar,
+        "archivar": archivar,
+        "impuestos": impuestos,
+        "estado": estado,
+        "skus": sorted(skus) if skus is not None else None,
+        "etapas": sorted(etapas) if etapas is not None else None,
+    }
+    # Ida y vuelta por JSON: el plan en memoria queda igual al que se lee del archivo
+    contenido = json.loads(json.dumps(contenido, ensure_ascii=False, default=_nativo))
+    return {**contenido, "hash": _hash_contenido(contenido), "creado": datetime.now().isoformat(timespec="seconds")}
+
+def guardar_plan(plan, ruta=None):
+    ruta = ruta or os.path.join(DIR_PLANES, f"plan_{plan['creado'][:16].replace(':', '-')}_{plan['hash'][:12]}.json.gz")
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    # mtime=0: el mismo plan produce exactamente el mismo archivo
+    with open(ruta, "wb") as crudo, gzip.GzipFile(fileobj=crudo, mode="wb", mtime=0) as f:
+        f.write(json.dumps(plan, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return ruta
+
+def cargar_plan(ruta):
+    """Lee un plan y verifica formato y hash. Lanza ValueError si no sirve."""
+    with gzip.open(ruta, "rb") as f:
+        plan = json.loads(f.read().decode("utf-8"))
+    if plan.get("formato") != PLAN_FORMATO:
+        raise ValueError(f"Formato de plan {plan.get('formato')} no soportado (se espera {PLAN_FORMATO})")
+    contenido = {k: v for k, v in plan.items() if k not in ("hash", "creado")}
+    if _hash_contenido(contenido) != plan.get("hash"):
+        raise ValueError("El hash del plan no coincide con su contenido (archivo alterado o incompleto)")
+    return plan
+
+def horas_de_antiguedad(plan):
+    return (datetime.now() - datetime.fromisoformat(plan["creado"])).total_seconds() / 3600
+
+# ============================
+# SHARDS (--shard i/N)
+# ============================
+def leer_shard(texto):
+    """'2/4' → (1, 4): índice desde 0. Sin shard → (0, 1)."""
+    if not texto:
+        return 0, 1
+    i, _, n = texto.partition("/")
+    i, n = int(i), int(n)
+    if not 1 <= i <= n:
+        raise ValueError(f"Shard inválido: {texto!r} (usar i/N con 1 ≤ i ≤ N)")
+    return i - 1, n
+
+def shard_de(clave, total):
+    # crc32: estable entre procesos y máquinas (hash() de Python no lo es)
+    return zlib.crc32(str(clave).encode("utf-8")) % total
+
+def _en_shard(fila, shard):
+    indice, total = shard
+    # Las escrituras van por producto (todas las variantes de un producto en el mismo shard)
+    return shard_de(fila.get("product_id") or fila.get("SKU"), total) == indice
+
+def claves_shard(plan):
+    """
+    {SKU: clave de reparto} de las filas del plan (la misma que usa _en_shard): el estado
+    de un SKU va con el shard que escribe su fila, no con el de su SKU.
+    """
+    claves = {}
+    # actualizar al final: si un SKU sale en dos listas, manda su variante vigente
+    for lista in ("crear", "archivar", "actualizar"):
+        for fila in plan[lista]:
+            claves[str(fila["SKU"])] = fila.get("product_id") or fila["SKU"]
+    return claves
+
+def recortar_plan(plan, shard):
+    """
+    Copia del plan con solo las filas del shard (el estado se recorta al guardarlo).
+    Lleva "claves_shard" del plan completo: el recorte ya no tiene las filas de los demás.
+    """
+    if shard[1] == 1:
+        return plan
+    return {
+        **plan,
+        **{lista: [f for f in plan[lista] if _en_shard(f, shard)] for lista in ("crear", "actualizar", "archivar", "impuestos")},
+        "claves_shard": claves_shard(plan),
+    }
+
+def fusionar_estado(actual, nuevo, shard, skus=None, claves=None):
+    """
+    Estado por SKU: las claves del shard salen del plan (y las que el plan ya no tiene se van);
+    las de otros shards quedan como están en disco. Con un solo shard es el estado del plan tal cual.
+    skus: plan dirigido (--skus), además del shard solo cuentan esos SKUs.
+    claves: {SKU: clave de reparto} (ver claves_shard). Un SKU sin fila en el plan no se
+    escribe en ningún shard y se reparte por su propio SKU.
+    """
+    indice, total = shard
+    if total == 1 and skus is None:
+        return dict(nuevo)
+    claves = claves or {}
+
+    def propio(sku):
+        return shard_de(claves.get(sku, sku), total) == indice and (skus is None or sku in skus)
+
+    fusion = {sku: v for sku, v in actual.items() if not propio(sku)}
+    fusion.update({sku: v for sku, v in nuevo.items() if propio(sku)})
+    return fusion
+
+def descontar_diferidos(estado, memoria_en_disco, skus, skus_precio=(), skus_archivo=()):
+    """
+    Estado a guardar cuando el plan no alcanzó a escribirse entero (--max-runtime).
+    skus: todo lo que quedó sin escribir → sin huella ni decisión (la próxima corrida lo re-evalúa).
+    skus_precio: su precio no se escribió → la memoria queda como estaba (si no, el precio
+    viejo en Shopify parecería un precio manual y nunca se corregiría).
+    skus_archivo: quedan a una ausencia del umbral (se archivan en la corrida siguiente).
+    """
+    estado = {clave: dict(valor) for clave, valor in estado.items()}
+    for sku in skus_precio:
+        if sku in memoria_en_disco:
+            estado["memoria_precios"][sku] = memoria_en_disco[sku]
+        else:
+            estado["memoria_precios"].pop(sku, None)
+    for sku in skus:
+        for clave in ("huellas", "decisiones"):
+            if clave in estado:
+                estado[clave].pop(sku, None)
+    for sku in skus_archivo:
+        estado["historial_ausencias"][sku] = max(estado["historial_ausencias"].get(sku, 0), AUSENCIAS_PARA_ARCHIVAR - 1)
+    return estado
+
+def bloqueo_estado(espera=60):
+    """Shards en paralelo en la misma máquina: uno a la vez leyendo/escribiendo data/*.json."""
+    return bloqueo(RECURSO_ESTADO, espera)
+
+# ============================
+# REGISTRO DE PLANES APLICADOS
+# ============================
+# Un plan es su hash + "creado": volver a aplicar el mismo archivo (o el mismo plan de la
+# misma corrida) no hace nada, pero otro plan con el mismo contenido (de otra corrida) se
+# aplica igual, porque si salió idéntico lo más probable es que el primero no haya quedado
+# en Shopify. Un shard con userErrors se anota con sus errores y no cuenta como aplicado.
+def cargar_aplicados(ruta=ARCHIVO_APLICADOS):
+    """Retorna {hash: {"creado", "shards": [...], "total": N, "errores": {shard: n}, "aplicado": fecha}}."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+def ya_aplicado(plan, shard, ruta=ARCHIVO_APLICADOS):
+    registro = cargar_aplicados(ruta).get(plan["hash"])
+    return (
+        bool(registro) and registro.get("creado") == plan["creado"]
+        and registro["total"] == shard[1] and shard[0] in registro["shards"]
+    )
+
+def marcar_aplicado(plan, shard, errores=0, ruta=ARCHIVO_APLICADOS):
+    """
+    errores: userErrors del shard (con errores queda anotado pero se puede volver a aplicar).
+    Shards en paralelo: leer + escribir va con el bloqueo de estado (si no, se pisan).
+    """
+    with bloqueo_estado():
+        _marcar_aplicado(plan, shard, errores, ruta)
+
+def _marcar_aplicado(plan, shard, errores, ruta):
+    aplicados = cargar_aplicados(ruta)
+    registro = aplicados.get(plan["hash"])
+    if not registro or registro.get("creado") != plan["creado"] or registro["total"] != shard[1]:
+        registro = {"creado": plan["creado"], "shards": [], "total": shard[1], "errores": {}}
+    shards = set(registro["shards"])
+    registro.setdefault("errores", {}).pop(str(shard[0]), None)
+    if errores:
+        shards.discard(shard[0])
+        registro["errores"][str(shard[0])] = errores
+    else:
+        shards.add(shard[0])
+    registro["shards"] = sorted(shards)
+    registro["aplicado"] = datetime.now().isoformat(timespec="seconds")
+    aplicados[plan["hash"]] = registro
+
+    # Solo los más recientes (las fechas ISO ordenan bien como texto)
+    recientes = sorted(aplicados.items(), key=lambda kv: kv[1]["aplicado"], reverse=True)[:MAX_PLANES_RECORDADOS]
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Temporal + replace: un proceso que muere a medio escribir no deja el registro vacío
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(dict(recientes), f, indent=1, sort_keys=True)
+    os.replace(temporal, ruta)
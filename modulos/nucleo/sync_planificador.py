@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pandas as pd
+
+from modulos.finanzas.precios import (
+    calcular_precios_lote, medianas_de_mercado, versiones_de_regla, puntajes_de_impacto
+)
+from modulos.nucleo.sync_diagnostico import formatear_nombre_cacheado
+from modulos.nucleo.sync_corridas import escribir_corridas, mezclar_corridas, cruzar_ordenado
+from modulos.nucleo.sync_huellas import huellas_mediven, huellas_shopify
+
+# Columnas de Shopify que necesita el plan (renombradas para no chocar con Mediven)
+COLUMNAS_SHOPIFY = {
+    "sku": "sku",
+    "price": "precio_actual",
+    "product_title": "nombre_actual",
+    "status": "estado_actual",
+    "variant_id": "variant_id",
+    "product_id": "product_id",
+}
+
+# Campos de Mediven que necesita el plan (precio + lo que usa formatear_nombre_producto)
+CAMPOS_MEDIVEN = ["Codigo", "Descripcion", "Equivalente", "Precio"]
+
+# Columnas de Shopify que siguen en memoria en modo streaming (impuestos, imágenes, SEO)
+COLUMNAS_RESUMEN_SHOPIFY = [
+    "product_id", "product_title", "variant_id", "sku", "status", "has_image", "taxable", "bodyHtml",
+]
+
+# SKUs que se reprecian juntos en el modo streaming (una llamada a calcular_precios_lote)
+TAMANO_BLOQUE_PLAN = int(os.getenv("SYNC_TAMANO_BLOQUE_PLAN", "5000"))
+
+# ============================
+# PLAN DE SINCRONIZACIÓN (VECTORIZADO)
+# ============================
+def construir_plan(df_med, df_shop, excluidos, precios_mercado, memoria_precios,
+                   huellas=None, completo=False, decisiones=None):
+    """
+    Cruza Mediven y Shopify con un solo merge por SKU y arma las listas
+    (crear, actualizar, archivar) con operaciones de columna.
+    excluidos: {sku: palabra que lo excluyó} (ver sync_exclusiones).
+    huellas: {sku: [huella_mediven, huella_shopify]} (ver sync_huellas). Los SKUs cuya
+    huella no cambió se saltan; completo=True evalúa todo igual. Se actualiza en el lugar.
+    decisiones: {sku: [regla, costo, mediana, precio_robot]} (ver preview_reglas), en el lugar.
+    Igual que el loop original, deja en memoria_precios el precio decidido por SKU.
+    """
+    skus_excluidos = set(excluidos)
+    skus_med = set(df_med["Codigo"])
+
+    # --- LADO SHOPIFY: primera variante por SKU (igual que shop_by_sku) ---
+    df_shop = df_shop.reindex(columns=list(COLUMNAS_SHOPIFY))
+    shop_unico = df_shop[df_shop["sku"].ne("")].drop_duplicates(subset="sku", keep="first")
+    shop_unico = shop_unico.rename(columns=COLUMNAS_SHOPIFY)
+
+    # --- LADO MEDIVEN: sin excluidos, respetando el orden original ---
+    med = df_med[~df_med["Codigo"].isin(skus_excluidos)]
+    cruce = med.merge(shop_unico, left_on="Codigo", right_on="sku", how="left", indicator=True)
+
+    codigos = cruce["Codigo"].to_numpy(dtype=object)
+    en_shop = (cruce["_merge"] == "both").to_numpy()
+
+    # 🛡️ Inteligencia Financiera (precio 0 si Mediven no trae costo)
+    if "Precio" in cruce.columns:
+        costos = pd.to_numeric(cruce["Precio"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    else:
+        costos = np.zeros(len(cruce))
+
+    # 🏷️ Versión de la regla de precio de cada SKU ("" sin costo: el precio es 0 con cualquier regla)
+    tiene_datos, medianas = medianas_de_mercado(codigos, precios_mercado)
+    reglas_sku = np.where(costos > 0, versiones_de_regla(costos, medianas, tiene_datos), "").astype(object)
+
+    # 🧬 PLAN INCREMENTAL: fuera los SKUs que no cambiaron desde la última corrida
+    if huellas is not None:
+        huella_med = huellas_mediven(cruce, costos, medianas, reglas_sku)
+        evaluar = np.ones(len(cruce), dtype=bool)
+
+        if huellas and not completo:
+            previas = pd.DataFrame.from_dict(huellas, orient="index", columns=["med", "shop"])
+            huella_shop = huellas_shopify(
+                cruce["precio_actual"], cruce["nombre_actual"], cruce["estado_actual"],
+                cruce["Codigo"].map(memoria_precios),
+            )
+            sin_cambios = (
+                en_shop
+                & ~cruce["Codigo"].duplicated(keep=False).to_numpy()
+                & (huella_med == cruce["Codigo"].map(previas["med"]).to_numpy(dtype=object))
+                & (huella_shop == cruce["Codigo"].map(previas["shop"]).to_numpy(dtype=object))
+            )
+            if decisiones is not None:
+                # Sin decisión guardada no se salta (así se siembra decisiones_precios.json)
+                sin_cambios &= cruce["Codigo"].isin(decisiones).to_numpy()
+            evaluar = ~sin_cambios
+
+        print(f"🧬 Huellas: {int((~evaluar).sum())} SKUs sin cambios (saltados), {int(evaluar.sum())} a evaluar.")
+        cruce = cruce[evaluar].reset_index(drop=True)
+        codigos, en_shop, costos, huella_med = codigos[evaluar], en_shop[evaluar], costos[evaluar], huella_med[evaluar]
+        tiene_datos, medianas, reglas_sku = tiene_datos[evaluar], medianas[evaluar], reglas_sku[evaluar]
+
+    nuevo_precio = np.zeros(len(cruce), dtype=object)
+    con_costo = costos > 0
+    if con_costo.any():
+        precios, _ = calcular_precios_lote(costos[con_costo], medianas[con_costo], tiene_datos[con_costo])
+        nuevo_precio[con_costo] = precios.tolist()
+
+    precio_actual = cruce["precio_actual"].astype(float).to_numpy(dtype=object)
+    nombre_actual = cruce["nombre_actual"].astype(str)
+    estado_actual = cruce["estado_actual"].astype(str).str.lower()
+
+    # 🛡️ PROTECCIÓN ANTI-SOBRESCRITURA MANUAL
+    ultimo_robot = cruce["Codigo"].map(memoria_precios).astype(float).to_numpy()
+    dif_manual = np.abs(precio_actual.astype(float) - ultimo_robot) > 1
+    manual = en_shop & ~np.isnan(ultimo_robot) & dif_manual
+    precio_final = np.where(manual, precio_actual, nuevo_precio)
+
+    # SKUs repetidos en Mediven: cada aparición ve la memoria que dejó la anterior
+    repetidos = cruce["Codigo"].duplicated(keep=False).to_numpy()
+    if repetidos.any():
+        vistos = {}
+        for i in np.flatnonzero(repetidos):
+            sku = codigos[i]
+            previo = vistos.get(sku, memoria_precios.get(sku))
+            final = nuevo_precio[i]
+            if en_shop[i] and previo is not None and abs(precio_actual[i] - previo) > 1:
+                final = precio_actual[i]
+            precio_final[i] = final
+            vistos[sku] = final
+
+    # Nombre limpio solo para los que ya existen en Shopify
+    nombres = np.full(len(cruce), "", dtype=object)
+    if en_shop.any():
+        nombres[en_shop] = [formatear_nombre_cacheado(fila) for fila in cruce[en_shop].to_dict("records")]
+
+    # COMPARAR PRECIO, NOMBRE Y ESTADO
+    c_pre = np.abs(precio_actual.astype(float) - precio_final.astype(float)) >= 1
+    c_nom = nombres != nombre_actual.to_numpy(dtype=object)
+    c_status = (estado_actual != "active").to_numpy()
+    cambia = en_shop & (c_pre | c_nom | c_status)
+
+    actualizar = pd.DataFrame({
+        "SKU": codigos[cambia],
+        "Descripcion": nombres[cambia],
+        "Precio_Shopify": precio_actual[cambia],
+        "Nuevo_Precio": precio_final[cambia],
+        "Costo": costos[cambia],
+        "variant_id": cruce["variant_id"].to_numpy(dtype=object)[cambia],
+        "product_id": cruce["product_id"].to_numpy(dtype=object)[cambia],
+        "actualizar_basicos": (c_nom | c_status)[cambia],
+    }).to_dict("records")
+
+    nuevos = ~en_shop
+    descripciones = cruce["Descripcion"] if "Descripcion" in cruce.columns else pd.Series("", index=cruce.index)
+    crear = pd.DataFrame({
+        "SKU": codigos[nuevos],
+        "Descripcion": descripciones.to_numpy(dtype=object)[nuevos],
+        "Precio": precio_final[nuevos],
+        "Stock": 100,
+    }).to_dict("records")
+
+    # Guardamos la decisión del robot
+    memoria_precios.update(zip(codigos, precio_final))
+
+    # 🧬 Huella del estado que queda en Shopify al aplicar. Los nuevos, los repetidos y los
+    # protegidos por precio manual quedan sin huella Shopify: se re-evalúan siempre.
+    if huellas is not None:
+        esperada = huellas_shopify(precio_final, nombres, ["active"] * len(cruce), precio_final)
+        esperada[~en_shop | manual | repetidos] = ""
+        huellas.update((sku, [hm, hs]) for sku, hm, hs in zip(codigos, huella_med, esperada))
+        vigentes = set(med["Codigo"])
+        for sku in [s for s in huellas if s not in vigentes]:
+            del huellas[sku]
+
+    # 🏷️ Decisión del robot por SKU: regla + entradas + precio (para previsualizar cambios de reglas)
+    if decisiones is not None:
+        medianas_json = np.where(np.isnan(medianas), None, medianas).tolist()
+        decisiones.update(
+            (sku, [regla, costo, mediana, precio])
+            for sku, regla, costo, mediana, precio in zip(codigos, reglas_sku, costos.tolist(), medianas_json, nuevo_precio)
+        )
+        vigentes = set(med["Codigo"])
+        for sku in [s for s in decisiones if s not in vigentes]:
+            del decisiones[sku]
+
+    # --- LÓGICA ARCHIVAR (ELIMINAR) ---
+    con_sku = df_shop["sku"].ne("")
+    es_prohibido = df_shop["sku"].isin(skus_excluidos)
+    no_existe_mediven = ~df_shop["sku"].isin(skus_med)
+    a_archivar = df_shop[con_sku & (es_prohibido | no_existe_mediven)]
+
+    archivar = pd.DataFrame({
+        "SKU": a_archivar["sku"].to_numpy(dtype=object),
+        "product_id": a_archivar["product_id"].to_numpy(dtype=object),
+        "Descripcion": a_archivar["product_title"].to_numpy(dtype=object),
+        "Motivo": np.where(es_prohibido[a_archivar.index], "Excluido/Prohibido", "No existe en Mediven"),
+        "status_actual": a_archivar["status"].astype(str).str.lower().to_numpy(dtype=object),
+        "Palabra_Excluida": a_archivar["sku"].map(excluidos).fillna("").to_numpy(dtype=object),
+    }).to_dict("records")
+
+    return crear, actualizar, archivar
+
+
+# ============================
+# PLAN EN MODO STREAMING (CATÁLOGOS GIGANTES)
+# ============================
+# Mismas decisiones que construir_plan, pero ambos lados se escriben en disco
+# como corridas ordenadas por SKU y se cruzan con un merge-join: en memoria solo
+# queda un bloque de SKUs a la vez (más memoria_precios y precios_mercado).
+# Las listas resultantes salen ordenadas por SKU, no en el orden de Mediven.
+
+def _sku(valor):
+    # Igual que sync.py: astype(str).str.strip()
+    return str(valor).strip()
+
+def volcar_mediven(items, directorio):
+    """Escribe el inventario Mediven en corridas ordenadas por SKU (solo los campos del plan)."""
+    proyectados = (
+        {**{c: item.get(c) for c in CAMPOS_MEDIVEN if c in item}, "Codigo": _sku(item.get("Codigo"))}
+        for item in items
+    )
+    return escribir_corridas(proyectados, lambda r: r["Codigo"], directorio, "mediven")
+
+def volcar_shopify(filas, directorio, resumen=None):
+    """
+    Escribe las filas de Shopify (iterar_filas_shopify) en corridas ordenadas por SKU.
+    Si se entrega resumen (dict vacío), se llena por columnas con lo que usan las
+    etapas 7/8, SIN el bodyHtml completo (ahí solo se pregunta si está vacío).
+    """
+    if resumen is not None:
+        for c in COLUMNAS_RESUMEN_SHOPIFY:
+            resumen[c] = []
+
+    def proyectar():
+        for fila in filas:
+            fila["sku"] = _sku(fila.get("sku"))
+            if resumen is not None:
+                fila["bodyHtml"] = "<p></p>" if fila.get("bodyHtml") else ""
+                for c in COLUMNAS_RESUMEN_SHOPIFY:
+                    resumen[c].append(fila.get(c))
+            yield {c: fila.get(c) for c in COLUMNAS_SHOPIFY}
+
+    return escribir_corridas(proyectar(), lambda r: r["sku"], directorio, "shopify")
+
+def _a_costo(valor):
+    # Igual que pd.to_numeric(errors="coerce").fillna(0)
+    try:
+        costo = float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if costo != costo else costo
+
+def _planificar_bloque(bloque, excluidos, precios_mercado, memoria_precios, crear, actualizar, archivar):
+    # Precios de todo el bloque en una sola llamada vectorizada
+    filas_med = [(sku, fila) for sku, med, _ in bloque for fila in med if sku not in excluidos]
+    costos = np.array([_a_costo(fila.get("Precio")) for _, fila in filas_med], dtype=float)
+    nuevo_precio = [0] * len(filas_med)
+    con_costo = np.flatnonzero(costos > 0)
+    if len(con_costo):
+        skus = [filas_med[i][0] for i in con_costo]
+        tiene_datos, medianas = medianas_de_mercado(skus, precios_mercado)
+        precios, _ = calcular_precios_lote(costos[con_costo], medianas, tiene_datos)
+        for i, precio in zip(con_costo, precios.tolist()):
+            nuevo_precio[i] = precio
+
+    i = 0
+    for sku, med, shop in bloque:
+        if sku in excluidos or not med:
+            # --- LÓGICA ARCHIVAR: todas las variantes con ese SKU ---
+            motivo = "Excluido/Prohibido" if sku in excluidos else "No existe en Mediven"
+            for fila in shop:
+                if fila["sku"] == "":
+                    continue
+                archivar.append({
+                    "SKU": fila["sku"],
+                    "product_id": fila["product_id"],
+                    "Descripcion": fila["product_title"],
+                    "Motivo": motivo,
+                    "status_actual": str(fila["status"]).lower(),
+                    "Palabra_Excluida": excluidos.get(sku, ""),
+                })
+            if sku in excluidos:
+                continue
+
+        # Primera variante por SKU (igual que shop_by_sku)
+        variante = shop[0] if shop and sku != "" else None
+
+        for fila in med:
+            final = nuevo_precio[i]
+            costo = float(costos[i])
+            i += 1
+
+            if variante is None:
+                crear.append({
+                    "SKU": sku,
+                    "Descripcion": fila.get("Descripcion", ""),
+                    "Precio": final,
+                    "Stock": 100,
+                })
+                memoria_precios[sku] = final
+                continue
+
+            precio_actual = float(variante["price"])
+            nombre_actual = str(variante["product_title"])
+            estado_actual = str(variante["status"]).lower()
+
+            # 🛡️ PROTECCIÓN ANTI-SOBRESCRITURA MANUAL
+            ultimo_robot = memoria_precios.get(sku)
+            if ultimo_robot is not None and abs(precio_actual - float(ultimo_robot)) > 1:
+                final = precio_actual
+
+            nombre = formatear_nombre_cacheado(fila)
+
+            c_pre = abs(precio_actual - float(final)) >= 1
+            c_nom = nombre != nombre_actual
+            c_status = estado_actual != "active"
+
+            if c_pre or c_nom or c_status:
+                actualizar.append({
+                    "SKU": sku,
+                    "Descripcion": nombre,
+                    "Precio_Shopify": precio_actual,
+                    "Nuevo_Precio": final,
+                    "Costo": costo,
+                    "variant_id": variante["variant_id"],
+                    "product_id": variante["product_id"],
+                    "actualizar_basicos": c_nom or c_status,
+                })
+            memoria_precios[sku] = final
+
+def construir_plan_streaming(corridas_med, corridas_shop, excluidos, precios_mercado, memoria_precios):
+    """
+    Versión de construir_plan que lee las corridas de volcar_mediven / volcar_shopify.
+    Retorna (crear, actualizar, archivar) y actualiza memoria_precios igual que construir_plan.
+    """
+    crear, actualizar, archivar = [], [], []
+    bloque = []
+    filas_bloque = 0
+
+    for sku, med, shop in cruzar_ordenado(mezclar_corridas(corridas_med), mezclar_corridas(corridas_shop)):
+        bloque.append((sku, med, shop))
+        filas_bloque += len(med) + len(shop)
+        if filas_bloque >= TAMANO_BLOQUE_PLAN:
+            _planificar_bloque(bloque, excluidos, precios_mercado, memoria_precios, crear, actualizar, archivar)
+            bloque = []
+            filas_bloque = 0
+
+    if bloque:
+        _planificar_bloque(bloque, excluidos, precios_mercado, memoria_precios, crear, actualizar, archivar)
+
+    return crear, actualizar, archivar
+
+def variantes_con_impuesto(df_shop):
+    """Paso 7: variantes de Shopify con taxable=True ({product_id, variant_id})."""
+    return df_shop.loc[df_shop["taxable"] == True, ["product_id", "variant_id"]].to_dict("records")
+
+def marcar_productos_vivos(archivar, df_shop, skus_vigentes):
+    """
+    Agrega "producto_vivo" a cada fila de archivar: su producto tiene alguna variante en
+    Shopify con un SKU que sigue en Mediven. Se mira el catálogo entero, no solo lo que
+    cambia en este plan: un producto con una variante ausente y otra sin cambios también
+    está vivo, y aplicar_plan no lo archiva.
+    """
+    vivos = set(df_shop.loc[df_shop["sku"].isin(skus_vigentes), "product_id"].astype(str))
+    for fila in archivar:
+        fila["producto_vivo"] = str(fila["product_id"]) in vivos
+    return archivar
+
+# ============================
+# PRIORIDAD DE ESCRITURA (IMPACTO)
+# ============================
+def priorizar_actualizar(actualizar):
+    """
+    Agrega Impacto y Bajo_Costo a cada fila de actualizar (ver puntajes_de_impacto) y la
+    ordena: primero los precios bajo el costo, después por impacto de mayor a menor.
+    Si la corrida se corta a medias, lo que más plata vale ya quedó escrito.
+    """
+    if not actualizar:
+        return actualizar
+    impactos, bajo_costo = puntajes_de_impacto(
+        [p["Precio_Shopify"] for p in actualizar],
+        [p["Nuevo_Precio"] for p in actualizar],
+        [p.get("Costo", 0) for p in actualizar],
+    )
+    for p, impacto, bajo in zip(actualizar, impactos.tolist(), bajo_costo.tolist()):
+        p["Impacto"] = impacto
+        p["Bajo_Costo"] = bajo
+    # sort estable: a igual impacto se respeta el orden del plan
+    actualizar.sort(key=lambda p: (not p["Bajo_Costo"], -p["Impacto"]))
+    return actualizar
+
+def cambia_precio(fila):
+    """Fila de actualizar que además trae precio nuevo (las hay solo por título o estado)."""
+    return abs(float(fila["Precio_Shopify"]) - float(fila["Nuevo_Precio"])) >= 1
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import time
+
+# ============================
+# PRESUPUESTO DE TIEMPO (--max-runtime)
+# ============================
+# El runner programado tiene un timeout duro. Con --max-runtime cada etapa recibe un
+# "hasta" (reloj monotónico) y, cuando se le acaba, guarda lo hecho y corta limpio.
+# Lo que no alcanzó se anota con registrar_diferido y sale en el reporte final.
+
+# Segundos que se reservan al final para guardar estado y el reporte
+MARGEN_CIERRE = float(os.getenv("SYNC_MARGEN_CIERRE", "60"))
+
+# Reparto del tiempo que sobra después del núcleo (precios / crear / archivar).
+# Las etapas post-sync corren a la vez (sync_etapas): cada carril usa todo lo que queda.
+# Dentro de un carril (SEO espera a la IA, espía e imágenes se turnan la cuota de Serper)
+# cada etapa toma su fracción de lo que QUEDA entre ella y las que vienen detrás:
+# lo que una no usa pasa a las siguientes.
+REPARTO_ETAPAS = {
+    "espia": 0.35,
+    "ia": 0.35,
+    "imagenes": 0.10,
+    "seo": 0.20,
+}
+
+_limite = {"global": None}
+DIFERIDOS = []
+
+# Del planificador: {etapa: etapas que no pueden correr a la vez con ella} (ver fijar_carriles)
+_carriles = {"tras": {}, "empezadas": set()}
+
+def leer_duracion(texto):
+    """'5400' / '90m' / '1.5h' / '45s' → segundos."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*", str(texto).lower())
+    if not m:
+        raise ValueError(f"Duración inválida: {texto!r} (ej: 5400, 90m, 1.5h)")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[m.group(2)]
+
+def iniciar_presupuesto(segundos):
+    """Fija el límite global de la corrida (None = sin límite)."""
+    _limite["global"] = time.monotonic() + segundos - MARGEN_CIERRE if segundos else None
+    DIFERIDOS.clear()
+
+def hay_presupuesto():
+    return _limite["global"] is not None
+
+def restante(hasta=None):
+    """Segundos que quedan hasta `hasta` (o hasta el límite global). inf si no hay límite."""
+    hasta = _limite["global"] if hasta is None else hasta
+    if hasta is None:
+        return float("inf")
+    return max(0.0, hasta - time.monotonic())
+
+def vencido(hasta):
+    return hasta is not None and time.monotonic() >= hasta
+
+def plazo_nucleo():
+    """El núcleo puede usar todo el límite global (va primero)."""
+    return _limite["global"]
+
+def fijar_carriles(carriles):
+    """Carriles de las etapas que van a correr (sync_etapas.carriles), antes de correrlas."""
+    _carriles["tras"] = {nombre: set(otras) for nombre, otras in carriles.items()}
+    _carriles["empezadas"] = set()
+
+def plazo_etapa(etapa):
+    """
+    'hasta' para una etapa secundaria (se pide al empezar): su fracción del tiempo que
+    queda, repartido entre ella y las de su carril que todavía no empiezan (esas corren
+    después). Las de otros carriles corren a la vez y no le quitan nada. None si no hay límite.
+    """
+    _carriles["empezadas"].add(etapa)
+    if _limite["global"] is None:
+        return None
+    despues = _carriles["tras"].get(etapa, set()) - _carriles["empezadas"]
+    peso = REPARTO_ETAPAS[etapa]
+    fraccion = peso / (peso + sum(REPARTO_ETAPAS.get(e, 0) for e in despues))
+    return time.monotonic() + restante() * fraccion
+
+def registrar_diferido(etapa, pendientes, skus=None, detalle=""):
+    """Anota trabajo que quedó para la próxima corrida (skus: para no marcarlos como hechos)."""
+    if not pendientes:
+        return
+    DIFERIDOS.append({
+        "etapa": etapa,
+        "pendientes": pendientes,
+        "skus": [str(s) for s in (skus or [])],
+        "detalle": detalle,
+    })
+    print(f"\n⏱️ Sin tiempo en '{etapa}': {pendientes} pendientes para la próxima corrida.")
+
+def skus_diferidos(*etapas):
+    return {sku for d in DIFERIDOS if d["etapa"] in etapas for sku in d["skus"]}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import gzip
+import shutil
+from datetime import datetime
+
+from modulos.nucleo.sync_diagnostico import ESTADO_THROTTLE
+
+# ============================
+# SNAPSHOTS DE ENTRADA (--replay)
+# ============================
+# Cada corrida guarda lo que bajó de la red en snapshots/<fecha>/:
+#   mediven.json.gz      inventario ya filtrado + excluidos (para el Excel)
+#   shopify.jsonl.gz     un producto por línea (se escribe mientras bajan las páginas)
+#   mercado.json.gz      precios de mercado con los que se planificó
+#   meta.json            formato, fecha, conteos y balde de Shopify
+# "sync.py --replay <snapshot>" planifica y genera el Excel con eso, sin red.
+# Mientras se escribe la carpeta lleva ".parcial": "ultimo" solo ve snapshots completos.
+SNAPSHOT_FORMATO = 1
+DIR_SNAPSHOTS = "snapshots"
+SUFIJO_PARCIAL = ".parcial"
+
+# SYNC_SNAPSHOTS=0 no guarda nada; se conservan los SNAPSHOTS_MAX más recientes
+SNAPSHOTS_ACTIVOS = os.getenv("SYNC_SNAPSHOTS", "1") != "0"
+SNAPSHOTS_MAX = int(os.getenv("SYNC_SNAPSHOTS_MAX", "7"))
+
+def abrir_snapshot(base=DIR_SNAPSHOTS):
+    """Crea la carpeta del snapshot de esta corrida (todavía parcial) y retorna su ruta."""
+    ruta = os.path.join(base, datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + SUFIJO_PARCIAL)
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+def _abrir_gzip(ruta, modo):
+    # mtime=0: el mismo contenido produce el mismo archivo
+    if "w" in modo:
+        return gzip.GzipFile(ruta, mode="wb", mtime=0)
+    return gzip.open(ruta, "rb")
+
+def guardar_parte(ruta, nombre, datos):
+    with _abrir_gzip(os.path.join(ruta, f"{nombre}.json.gz"), "wb") as f:
+        f.write(json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def cargar_parte(ruta, nombre):
+    with _abrir_gzip(os.path.join(ruta, f"{nombre}.json.gz"), "rb") as f:
+        return json.loads(f.read().decode("utf-8"))
+
+def volcar_productos(ruta, productos):
+    """
+    Pasa los productos de Shopify tal cual (generador) y de paso los escribe en
+    shopify.jsonl.gz: sirve igual para la descarga completa y para --streaming.
+    """
+    with _abrir_gzip(os.path.join(ruta, "shopify.jsonl.gz"), "wb") as f:
+        for producto in productos:
+            f.write(json.dumps(producto, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            yield producto
+
+def iterar_productos_snapshot(ruta):
+    """Productos de Shopify del snapshot, uno a uno (misma forma que iterar_productos_shopify)."""
+    with _abrir_gzip(os.path.join(ruta, "shopify.jsonl.gz"), "rb") as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+def cerrar_snapshot(ruta, conteos, base=DIR_SNAPSHOTS):
+    """Escribe meta.json, quita el ".parcial" y borra los snapshots que sobran. Retorna la ruta final."""
+    meta = {
+        "formato": SNAPSHOT_FORMATO,
+        "creado": datetime.now().isoformat(timespec="seconds"),
+        "conteos": conteos,
+        "throttle": {k: ESTADO_THROTTLE[k] for k in ("maximo", "disponible", "recarga")} if ESTADO_THROTTLE else None,
+    }
+    with open(os.path.join(ruta, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    final = ruta[: -len(SUFIJO_PARCIAL)]
+    os.replace(ruta, final)
+
+    for viejo in listar_snapshots(base)[:-max(SNAPSHOTS_MAX, 1)]:
+        shutil.rmtree(viejo, ignore_errors=True)
+    return final
+
+def descartar_snapshot(ruta):
+    """Corrida cortada antes de cerrar el snapshot: no queda a medias en disco."""
+    if ruta and ruta.endswith(SUFIJO_PARCIAL):
+        shutil.rmtree(ruta, ignore_errors=True)
+
+def listar_snapshots(base=DIR_SNAPSHOTS):
+    """Snapshots completos, del más viejo al más nuevo (el nombre es la fecha)."""
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        os.path.join(base, nombre) for nombre in os.listdir(base)
+        if not nombre.endswith(SUFIJO_PARCIAL) and os.path.exists(os.path.join(base, nombre, "meta.json"))
+    )
+
+def resolver_snapshot(texto, base=DIR_SNAPSHOTS):
+    """
+    'ultimo' (o nada) → el snapshot completo más reciente; si no, una ruta a la carpeta.
+    Retorna (ruta, meta). Lanza ValueError si no hay o no sirve.
+    """
+    if not texto or texto.startswith("--") or texto in ("ultimo", "latest"):
+        disponibles = listar_snapshots(base)
+        if not disponibles:
+            raise ValueError(f"No hay snapshots en {base}/ (se guardan en cada corrida normal)")
+        ruta = disponibles[-1]
+    else:
+        ruta = texto.rstrip("/\\")
+    if not os.path.exists(os.path.join(ruta, "meta.json")):
+        raise ValueError(f"{ruta} no es un snapshot completo (falta meta.json)")
+    with open(os.path.join(ruta, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("formato") != SNAPSHOT_FORMATO:
+        raise ValueError(f"Formato de snapshot {meta.get('formato')} no soportado (se espera {SNAPSHOT_FORMATO})")
+    return ruta, meta
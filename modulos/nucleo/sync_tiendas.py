@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import shutil
+
+from modulos.finanzas.precios import reglas_vigentes
+
+# ============================
+# VARIAS TIENDAS, UN MEDIVEN (sync.py tiendas)
+# ============================
+# Perfiles en tiendas.json (los tokens NO van aquí: se nombra la variable que los tiene):
+#   {
+#     "principal": {},
+#     "sur": {
+#       "dominio": "farmacia-sur.myshopify.com",
+#       "token_env": "SHOPIFY_ADMIN_TOKEN_SUR",
+#       "ubicacion": "80012345678",
+#       "publicacion": "gid://shopify/Publication/123456789",
+#       "precios": {"factor_monopolio": 1.7, "descuento_francotirador": 0.97}
+#     }
+#   }
+# "principal" es la tienda del .env y usa la raíz del repo (data/, reportes/) como siempre.
+# Las demás trabajan en tiendas/<nombre>/ con su propio data/ (memoria, huellas, ausencias,
+# registro de imágenes...), porque los IDs y el historial de cada tienda son distintos.
+# Mediven, exclusiones, nombres, mercado e IA se calculan una vez en el proceso padre;
+# cada tienda es un proceso aparte (su propio balde de Shopify) que planifica y escribe.
+ARCHIVO_TIENDAS = os.getenv("SYNC_TIENDAS", "tiendas.json")
+DIR_TIENDAS = "tiendas"
+TIENDA_PRINCIPAL = "principal"
+
+# Entradas compartidas que escribe el padre (mediven.json.gz / mercado.json.gz)
+DIR_ENTRADA = os.path.join(DIR_TIENDAS, "_entrada")
+
+# Lo calculado una vez que cada tienda lee de su data/ (se copia antes de lanzarla)
+ARCHIVOS_COMPARTIDOS = [os.path.join("cache", "nombres.json"), "diccionario_ia.json", "precios_mercado.json"]
+
+CAMPOS_PERFIL = {"dominio", "token_env", "ubicacion", "publicacion", "precios"}
+CAMPOS_OBLIGATORIOS = ["dominio", "token_env", "ubicacion", "publicacion"]
+
+def cargar_tiendas(ruta=ARCHIVO_TIENDAS):
+    """{nombre: perfil} de tiendas.json, validado. ValueError si falta algo."""
+    if not os.path.exists(ruta):
+        raise ValueError(f"no existe {ruta} (perfiles de tienda)")
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            tiendas = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{ruta} no es JSON válido ({e})")
+    if not isinstance(tiendas, dict) or not tiendas:
+        raise ValueError(f"{ruta} debe ser un objeto {{nombre: perfil}} con al menos una tienda")
+
+    reglas = reglas_vigentes()
+    for nombre, perfil in tiendas.items():
+        if not nombre.replace("-", "").replace("_", "").isalnum() or nombre.startswith("_"):
+            raise ValueError(f"nombre de tienda inválido: {nombre!r} (letras, números, - y _)")
+        if not isinstance(perfil, dict):
+            raise ValueError(f"tienda {nombre}: el perfil debe ser un objeto")
+        sobrantes = set(perfil) - CAMPOS_PERFIL
+        if sobrantes:
+            raise ValueError(f"tienda {nombre}: campos desconocidos {', '.join(sorted(sobrantes))}")
+        if nombre != TIENDA_PRINCIPAL:
+            faltan = [c for c in CAMPOS_OBLIGATORIOS if not perfil.get(c)]
+            if faltan:
+                raise ValueError(f"tienda {nombre}: faltan {', '.join(faltan)}")
+        claves_malas = set(perfil.get("precios", {})) - set(reglas)
+        if claves_malas:
+            raise ValueError(
+                f"tienda {nombre}: reglas de precio desconocidas {', '.join(sorted(claves_malas))} "
+                f"(válidas: {', '.join(reglas)})"
+            )
+    return tiendas
+
+def carpeta_tienda(nombre):
+    return "." if nombre == TIENDA_PRINCIPAL else os.path.join(DIR_TIENDAS, nombre)
+
+def ruta_log(nombre):
+    return os.path.join(DIR_TIENDAS, f"{nombre}.log")
+
+def entorno_tienda(nombre, perfil, base=None):
+    """Variables de entorno del proceso de la tienda. ValueError si el token no está definido."""
+    entorno = dict(os.environ if base is None else base)
+    entorno["SYNC_TIENDA"] = nombre
+    if perfil.get("precios"):
+        entorno["SYNC_REGLAS_PRECIO"] = json.dumps(perfil["precios"])
+    else:
+        entorno.pop("SYNC_REGLAS_PRECIO", None)
+    if "token_env" in perfil:
+        token = entorno.get(perfil["token_env"])
+        if not token:
+            raise ValueError(f"tienda {nombre}: la variable {perfil['token_env']} no está definida")
+        entorno["SHOPIFY_ADMIN_TOKEN"] = token
+    for campo, variable in (("dominio", "SHOP_DOMAIN"), ("ubicacion", "SHOPIFY_LOCATION_ID"),
+                            ("publicacion", "ONLINE_STORE_PUBLICATION_ID")):
+        if perfil.get(campo):
+            entorno[variable] = str(perfil[campo])
+    return entorno
+
+def preparar_carpeta(nombre, origen="data"):
+    """Crea tiendas/<nombre>/data/ y le copia lo compartido. Retorna la carpeta de la tienda."""
+    carpeta = carpeta_tienda(nombre)
+    if nombre == TIENDA_PRINCIPAL:
+        return carpeta
+    destino = os.path.join(carpeta, "data")
+    os.makedirs(destino, exist_ok=True)
+    for archivo in ARCHIVOS_COMPARTIDOS:
+        ruta = os.path.join(origen, archivo)
+        if os.path.exists(ruta):
+            copia = os.path.join(destino, archivo)
+            os.makedirs(os.path.dirname(copia), exist_ok=True)
+            shutil.copyfile(ruta, copia)
+    return carpeta
@@ -0,0 +1,81 @@
+import os
+import re
+import sys
+import json
+import time
+
+# Ejecutar desde la raíz del repo: python -m modulos.utilidades.benchmark_abreviaturas
+from modulos.nucleo.sync_diagnostico import DICCIONARIO_NOMBRES, EXPANDIR_NOMBRES
+from modulos.finanzas.espia_precios import TRADUCCIONES_BUSQUEDA, EXPANDIR_BUSQUEDA
+from modulos.nucleo.abreviaturas import compilar_expansor_tokens
+
+ARCHIVO_MEDIVEN = "mediven_full.json"
+REPETICIONES = 5
+
+# Tabla de force_fix_inline_list (no la importamos para no arrastrar ddgs)
+TRADUCCIONES_FIX = {
+    " PVO ": " Polvo ", " CRE ": " Crema ", " DES ": " Desodorante ",
+    " SOL ": " Solucion ", " COMP ": " Comprimidos ", " JAB ": " Jabon "
+}
+
+# ==========================================
+# IMPLEMENTACIONES ANTERIORES (REFERENCIA)
+# ==========================================
+def legacy_nombres(texto):
+    for abrev, reemplazo in DICCIONARIO_NOMBRES.items():
+        texto = texto.replace(abrev, reemplazo)
+    return texto
+
+def legacy_busqueda(texto):
+    for abrev, palabra_real in TRADUCCIONES_BUSQUEDA.items():
+        texto = re.sub(rf"\b{re.escape(abrev)}\b", palabra_real, texto, flags=re.IGNORECASE)
+    return texto
+
+def legacy_fix(texto):
+    for k, v in TRADUCCIONES_FIX.items():
+        if k in texto:
+            texto = texto.replace(k, v)
+    return texto
+
+def medir(funcion, textos):
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        t0 = time.perf_counter()
+        for t in textos:
+            funcion(t)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+def main():
+    print("=========================================")
+    print(" ⏱️ BENCHMARK MOTOR DE ABREVIATURAS")
+    print("=========================================")
+
+    ruta = sys.argv[1] if len(sys.argv) > 1 else ARCHIVO_MEDIVEN
+    if not os.path.exists(ruta):
+        print(f"❌ No se encontró {ruta}. Ejecuta sync.py primero.")
+        return
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        productos = json.load(f)
+
+    nombres = [str(p.get("Descripcion", "")) for p in productos]
+    print(f"📦 Catálogo Mediven: {len(nombres)} nombres.\n")
+
+    casos = [
+        ("formatear_nombre_producto", legacy_nombres, EXPANDIR_NOMBRES, [f" {n.upper()} " for n in nombres]),
+        ("buscar_precio_competencia", legacy_busqueda, EXPANDIR_BUSQUEDA, nombres),
+        ("force_fix (limpiar_nombre)", legacy_fix, compilar_expansor_tokens(TRADUCCIONES_FIX), nombres),
+    ]
+
+    for titulo, antes, ahora, textos in casos:
+        distintos = sum(1 for t in textos if antes(t) != ahora(t))
+        t_antes = medir(antes, textos)
+        t_ahora = medir(ahora, textos)
+        print(f"🔹 {titulo}")
+        print(f"   Antes: {len(textos) / t_antes:,.0f} nombres/s | Ahora: {len(textos) / t_ahora:,.0f} nombres/s "
+              f"(x{t_antes / t_ahora:.1f})")
+        print(f"   {'✅ Salida idéntica' if distintos == 0 else f'❌ {distintos} nombres distintos'}\n")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from ddgs import DDGS 
 
+from modulos.nucleo.abreviaturas import compilar_expansor_tokens
+from modulos.nucleo.sync_bloqueos import bloqueo, RecursoOcupado, RECURSO_IMAGENES
+
 # ==========================================
 # 📝 LISTA DE PRODUCTOS A CORREGIR
 # ==========================================
@@ -67,16 +70,16 @@ def safe_print(msg):
     with print_lock:
         print(msg, flush=True)
 
+TRADUCCIONES = {
+    " PVO ": " Polvo ", " CRE ": " Crema ", " DES ": " Desodorante ", 
+    " SOL ": " Solucion ", " COMP ": " Comprimidos ", " JAB ": " Jabon "
+}
+EXPANDIR_TRADUCCIONES = compilar_expansor_tokens(TRADUCCIONES)
+
 def limpiar_nombre_producto(nombre):
     nombre = re.sub(r'\s*\(.*?\)', '', nombre)
     nombre = re.sub(r'\s+X\s+\d+.*$', '', nombre)
-    traducciones = {
-        " PVO ": " Polvo ", " CRE ": " Crema ", " DES ": " Desodorante ", 
-        " SOL ": " Solucion ", " COMP ": " Comprimidos ", " JAB ": " Jabon "
-    }
-    for k, v in traducciones.items():
-        if k in nombre:
-            nombre = nombre.replace(k, v)
+    nombre = EXPANDIR_TRADUCCIONES(nombre)
     return nombre.strip()
 
 def buscar_imagen_quirurgica(nombre_original):
@@ -231,4 +234,10 @@ def main():
     print("\n✅ Proceso terminado.")
 
 if __name__ == "__main__":
-    main()
+    # 🔒 Sube fotos en Shopify: no junto a la etapa de imágenes ni a otra reparación
+    try:
+        with bloqueo(RECURSO_IMAGENES):
+            main()
+    except RecursoOcupado as e:
+        print(f"⛔ {e}. Reintenta cuando termine.")
+        exit(1)
@@ -11,6 +11,7 @@ import sys
 sys.path.append(BASE_DIR)
 
 from modulos.nucleo.sync_diagnostico import get_shopify_products, shopify_graphql
+from modulos.nucleo.sync_bloqueos import bloqueo, RecursoOcupado, RECURSO_CATALOGO
 
 def main():
     print("🕵️‍♂️ Buscando clones en Shopify...")
@@ -61,4 +62,10 @@ def main():
     print(f"\n\n✅ Limpieza terminada. OK: {ok} | Errores: {err}")
 
 if __name__ == "__main__":
-    main()
+    # 🔒 Borra productos: no mientras el sync escribe el catálogo
+    try:
+        with bloqueo(RECURSO_CATALOGO):
+            main()
+    except RecursoOcupado as e:
+        print(f"⛔ {e}. Reintenta cuando termine.")
+        exit(1)
@@ -2,6 +2,7 @@ import os
 import json
 import time
 from modulos.nucleo.sync_diagnostico import shopify_graphql
+from modulos.nucleo.sync_bloqueos import bloqueo, RecursoOcupado, RECURSO_IMAGENES
 
 ARCHIVO_REGISTRO = "data/registro_imagenes.json"
 
@@ -100,4 +101,10 @@ def main():
     print("👉 PRÓXIMO PASO: Ejecuta 'python sincronizar_imagenes.py' para rellenar estos huecos.")
 
 if __name__ == "__main__":
-    main()
+    # 🔒 Mismo registro y mismas fotos que la etapa de imágenes del sync: uno a la vez
+    try:
+        with bloqueo(RECURSO_IMAGENES):
+            main()
+    except RecursoOcupado as e:
+        print(f"⛔ {e}. Reintenta cuando termine.")
+        exit(1)
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import subprocess
+
+# Ejecutar desde la raíz del repo: python -m modulos.utilidades.medir_arranque [--veces 5]
+# Mide cuánto tarda en importarse cada punto de entrada (proceso nuevo cada vez, se
+# queda el mejor de N) y revisa que no cargue dependencias pesadas que recién se usan
+# más tarde. Sale con código 1 si algo se pasa: sirve como chequeo de regresión.
+
+# Punto de entrada → (segundos máximos de import, pesados que SÍ puede cargar)
+PUNTOS_DE_ENTRADA = {
+    "sync": (1.5, {"pandas", "numpy", "rich.table"}),
+    "modulos.nucleo.sync_diagnostico": (0.5, set()),
+    "modulos.nucleo.sync_bulk": (0.5, set()),
+    "modulos.finanzas.preview_reglas": (1.5, {"pandas", "numpy", "rich.table"}),
+    "modulos.finanzas.repesca_precios": (0.5, set()),
+    "modulos.ia_seo.crear_diccionario_ia": (0.3, set()),
+    "modulos.ia_seo.subir_a_shopify": (0.3, set()),
+    "modulos.multimedia.sync_imagenes_auto": (0.5, set()),
+}
+
+# Dependencias que tardan en importarse y solo hacen falta en una etapa
+PESADOS = ["pandas", "numpy", "rich.table", "google.genai", "google.generativeai", "shopify", "PIL", "ddgs"]
+
+# Multiplica los límites (runners lentos de CI, por ejemplo)
+HOLGURA = float(os.getenv("ARRANQUE_HOLGURA", "1.0"))
+
+def medir_import(modulo, raiz):
+    codigo = (
+        "import sys, time, json\n"
+        "t0 = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "t = time.perf_counter() - t0\n"
+        f"print(json.dumps({{'segundos': t, 'pesados': [m for m in {PESADOS!r} if m in sys.modules]}}))\n"
+    )
+    # Sin GEMINI_API_KEY: importar no debe exigir credenciales (ni cortar el proceso)
+    entorno = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    r = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=raiz, env={**entorno, "PYTHONPATH": raiz}, capture_output=True, text=True,
+    )
+    if r.returncode != 0:
+        ultima = r.stderr.strip().splitlines()[-1] if r.stderr.strip() else f"salió con código {r.returncode}"
+        return None, ultima
+    return json.loads(r.stdout.strip().splitlines()[-1]), None
+
+def revisar(modulo, veces=3, raiz=None):
+    """
+    (mejor tiempo, pesados que cargó, los que no debería cargar, error) de un punto de entrada.
+    La usa también tests/test_arranque.py.
+    """
+    raiz = raiz or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    resultados = []
+    for _ in range(veces):
+        res, error = medir_import(modulo, raiz)
+        if error:
+            return None, [], [], error
+        resultados.append(res)
+    _, permitidos = PUNTOS_DE_ENTRADA[modulo]
+    cargados = resultados[0]["pesados"]
+    return min(r["segundos"] for r in resultados), cargados, sorted(set(cargados) - permitidos), None
+
+def main():
+    veces = int(sys.argv[sys.argv.index("--veces") + 1]) if "--veces" in sys.argv else 3
+
+    print("=========================================")
+    print(" ⏱️ TIEMPO DE ARRANQUE (IMPORT)")
+    print("=========================================")
+    print(f"{'punto de entrada':<40} | {'import':>7} | {'límite':>7} | pesados")
+
+    fallas = 0
+    for modulo, (limite, _) in PUNTOS_DE_ENTRADA.items():
+        mejor, cargados, sobrantes, error = revisar(modulo, veces)
+        if error:
+            print(f"❌ {modulo}: {error}")
+            fallas += 1
+            continue
+
+        ok = mejor <= limite * HOLGURA and not sobrantes
+        fallas += not ok
+        print(
+            f"{'✅' if ok else '❌'} {modulo:<37} | {mejor:>6.2f}s | {limite * HOLGURA:>6.2f}s | "
+            f"{', '.join(cargados) or '—'}"
+            + (f"  ← no debería cargar {', '.join(sobrantes)}" if sobrantes else "")
+        )
+
+    print(f"\n{'✅ Arranque OK' if not fallas else f'❌ {fallas} puntos de entrada fuera de límite'}")
+    sys.exit(1 if fallas else 0)
+
+if __name__ == "__main__":
+    main()
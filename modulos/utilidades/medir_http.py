@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Ejecutar desde la raíz del repo: python -m modulos.utilidades.medir_http [--requests 600] [--hilos 1 8 30]
+# Mide requests por segundo de shopify_graphql contra un servidor local que hace de Shopify
+# (HTTPS con certificado propio si hay openssl; si no, HTTP), con y sin el pool keep-alive.
+# El servidor corre en otro proceso para que no le quite CPU (ni GIL) al cliente.
+MODOS = {"sin_pool": 0, "pool": None}  # None = SHOPIFY_HTTP_POOL del entorno
+
+RESPUESTA = json.dumps({
+    "data": {"productVariantsBulkUpdate": {"userErrors": []}},
+    "extensions": {"cost": {
+        "requestedQueryCost": 10,
+        "throttleStatus": {"maximumAvailable": 1e9, "currentlyAvailable": 1e9, "restoreRate": 1e9},
+    }},
+}).encode("utf-8")
+
+# ==========================================
+# SERVIDOR LOCAL (PROCESO HIJO)
+# ==========================================
+def servir(certificado, latencia):
+    import ssl
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        # Sin Nagle: cabeceras y cuerpo van en dos writes y el ACK retardado sumaría ~40 ms
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latencia:
+                time.sleep(latencia)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(RESPUESTA)))
+            self.end_headers()
+            self.wfile.write(RESPUESTA)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    if certificado:
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(certificado, certificado)
+        servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+    print(servidor.server_address[1], flush=True)
+    servidor.serve_forever()
+
+def generar_certificado(carpeta):
+    """Certificado autofirmado para 127.0.0.1 (None si no hay openssl)."""
+    if not shutil.which("openssl"):
+        return None
+    ruta = os.path.join(carpeta, "local.pem")
+    r = subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", ruta, "-out", ruta],
+        capture_output=True,
+    )
+    return ruta if r.returncode == 0 else None
+
+# ==========================================
+# CLIENTE
+# ==========================================
+def medir(total, hilos):
+    from modulos.nucleo import sync_diagnostico as diag
+
+    def uno(_):
+        return diag.shopify_graphql("mutation { x }", contexto="medir_http", max_retries=1) is not None
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        ok = sum(ejecutor.map(uno, range(total)))
+    return ok, total / (time.perf_counter() - inicio)
+
+def main():
+    if "--servidor" in sys.argv:
+        i = sys.argv.index("--servidor")
+        servir(sys.argv[i + 1] or None, float(sys.argv[i + 2]))
+        return
+
+    total = int(sys.argv[sys.argv.index("--requests") + 1]) if "--requests" in sys.argv else 600
+    latencia = float(sys.argv[sys.argv.index("--latencia") + 1]) / 1000 if "--latencia" in sys.argv else 0.0
+    if "--hilos" in sys.argv:
+        i = sys.argv.index("--hilos") + 1
+        lista_hilos = []
+        while i < len(sys.argv) and not sys.argv[i].startswith("--"):
+            lista_hilos.append(int(sys.argv[i]))
+            i += 1
+    else:
+        lista_hilos = [1, 8, 30]
+
+    carpeta = tempfile.mkdtemp(prefix="medir_http_")
+    certificado = generar_certificado(carpeta)
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "modulos.utilidades.medir_http", "--servidor", certificado or "", str(latencia)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        puerto = int(servidor.stdout.readline())
+        esquema = "https" if certificado else "http"
+        if certificado:
+            # El cliente confía en el certificado local (requests lo lee del entorno)
+            os.environ["REQUESTS_CA_BUNDLE"] = certificado
+
+        from modulos.nucleo import sync_diagnostico as diag
+        diag.GRAPHQL_ENDPOINT = f"{esquema}://127.0.0.1:{puerto}/admin/api/{diag.SHOPIFY_API_VERSION}/graphql.json"
+        pool = diag.SHOPIFY_HTTP_POOL or 10
+
+        print("=========================================")
+        print(f" 🔌 REQUESTS/S DE shopify_graphql ({esquema.upper()} local, latencia {latencia * 1000:g} ms)")
+        print("=========================================")
+        print(f"{'hilos':>5} | {'sin pool':>10} | {'pool':>10} | mejora")
+
+        for hilos in lista_hilos:
+            resultados = {}
+            for modo, tamano in MODOS.items():
+                diag.SHOPIFY_HTTP_POOL = pool if tamano is None else tamano
+                ok, por_segundo = medir(total, hilos)
+                if ok != total:
+                    print(f"❌ {modo} con {hilos} hilos: {total - ok} requests fallaron")
+                resultados[modo] = por_segundo
+            print(
+                f"{hilos:>5} | {resultados['sin_pool']:>8.0f}/s | {resultados['pool']:>8.0f}/s | "
+                f"x{resultados['pool'] / resultados['sin_pool']:.1f}"
+            )
+    finally:
+        servidor.terminate()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import random
+import resource
+import tempfile
+import subprocess
+
+# Ejecutar desde la raíz del repo: python -m modulos.utilidades.medir_memoria_plan [10000 100000 500000]
+# Cada medición corre en un proceso aparte para que el pico de RSS sea solo de ese caso.
+TAMANOS = [10_000, 100_000, 500_000]
+MODOS = ["dataframe", "streaming"]
+
+# HTML típico de una ficha (es lo que más pesa en memoria del lado Shopify)
+HTML_FICHA = "<p>" + "Descripción generada para la ficha del producto. " * 30 + "</p>"
+
+# ==========================================
+# CATÁLOGO SINTÉTICO
+# ==========================================
+def generar_mediven(n):
+    # ~90% ya existe en Shopify, el resto es nuevo
+    rnd = random.Random(1)
+    return [
+        {
+            "Codigo": f"{i:07d}",
+            "IdProd": i,
+            "Descripcion": f"PRODUCTO {i} COMP {rnd.randint(1, 60)} MG",
+            "Equivalente": rnd.choice(["PARACETAMOL", "IBUPROFENO", "LOSARTAN", ""]),
+            "Laboratorio": rnd.choice(["LAB CHILE", "SAVAL", "RECALCINE"]),
+            "AccionTerapeutica": "ANALGESICO",
+            "Precio": rnd.randint(500, 40000),
+            "Stock": rnd.randint(0, 500),
+        }
+        for i in range(n)
+    ]
+
+def generar_shopify(n):
+    # Generador: así llegan las páginas de iterar_productos_shopify
+    rnd = random.Random(2)
+    for i in range(int(n * 0.95)):
+        # ~5% son SKUs que Mediven ya no trae (para archivar)
+        sku = f"{i:07d}" if i < n * 0.9 else f"X{i:07d}"
+        yield {
+            "id": str(10_000_000 + i),
+            "title": f"Producto {i}",
+            "bodyHtml": HTML_FICHA if rnd.random() < 0.8 else "",
+            "status": "active",
+            "has_image": rnd.random() < 0.9,
+            "variants": [{"id": str(20_000_000 + i), "sku": sku, "price": str(rnd.randint(1000, 60000)), "taxable": False}],
+        }
+
+# ==========================================
+# UN CASO (PROCESO HIJO)
+# ==========================================
+def medir_caso(modo, n):
+    import pandas as pd
+    from modulos.nucleo.sync_diagnostico import normalize_shopify_products, iterar_filas_shopify
+    from modulos.nucleo.sync_planificador import (
+        construir_plan, construir_plan_streaming, volcar_mediven, volcar_shopify
+    )
+
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+
+    mediven_data = generar_mediven(n)
+    memoria_precios = {}
+
+    if modo == "dataframe":
+        # Lo que hace sync.py hoy: lista cruda + filas + dos DataFrames
+        shopify_products = list(generar_shopify(n))
+        df_med = pd.DataFrame(mediven_data)
+        df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
+        df_shop = pd.DataFrame(normalize_shopify_products(shopify_products))
+        df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
+        crear, actualizar, archivar = construir_plan(df_med, df_shop, {}, {}, memoria_precios)
+    else:
+        with tempfile.TemporaryDirectory(prefix="sync_corridas_") as directorio:
+            # Igual que sync.py --streaming: Mediven a disco y se suelta antes de bajar Shopify
+            corridas_med = volcar_mediven(mediven_data, directorio)
+            mediven_data = None
+            filas_shop = {}
+            corridas_shop = volcar_shopify(iterar_filas_shopify(generar_shopify(n)), directorio, filas_shop)
+            df_shop = pd.DataFrame(filas_shop)
+            crear, actualizar, archivar = construir_plan_streaming(
+                corridas_med, corridas_shop, {}, {}, memoria_precios
+            )
+
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "modo": modo,
+        "n": n,
+        "segundos": round(time.perf_counter() - t0, 2),
+        "rss_pico_mb": round(rss_pico / 1024, 1),
+        "rss_plan_mb": round((rss_pico - rss_base) / 1024, 1),
+        "crear": len(crear),
+        "actualizar": len(actualizar),
+        "archivar": len(archivar),
+    }))
+
+# ==========================================
+# ORQUESTADOR
+# ==========================================
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--caso":
+        medir_caso(sys.argv[2], int(sys.argv[3]))
+        return
+
+    tamanos = [int(a) for a in sys.argv[1:]] or TAMANOS
+    raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    print("=========================================")
+    print(" 🧪 PICO DE MEMORIA DEL PLAN (RSS)")
+    print("=========================================")
+    print(f"{'SKUs':>9} | {'modo':<10} | {'pico MB':>8} | {'plan MB':>8} | {'tiempo':>7}")
+
+    for n in tamanos:
+        for modo in MODOS:
+            # cwd temporal: el caché de nombres del caso no toca data/ del repo
+            with tempfile.TemporaryDirectory() as cwd:
+                os.makedirs(os.path.join(cwd, "data"))
+                r = subprocess.run(
+                    [sys.executable, "-m", "modulos.utilidades.medir_memoria_plan", "--caso", modo, str(n)],
+                    cwd=cwd, env={**os.environ, "PYTHONPATH": raiz}, capture_output=True, text=True,
+                )
+            if r.returncode != 0:
+                print(f"❌ {modo} {n}: {r.stderr.strip().splitlines()[-1] if r.stderr.strip() else 'error'}")
+                continue
+            res = json.loads(r.stdout.strip().splitlines()[-1])
+            print(f"{n:>9,} | {modo:<10} | {res['rss_pico_mb']:>8} | {res['rss_plan_mb']:>8} | {res['segundos']:>6}s")
+
+if __name__ == "__main__":
+    main()
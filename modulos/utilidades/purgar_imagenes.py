@@ -2,6 +2,7 @@ import shopify
 import time
 import os
 from dotenv import load_dotenv
+from modulos.nucleo.sync_bloqueos import bloqueo, RecursoOcupado, RECURSO_IMAGENES
 
 load_dotenv()
 
@@ -111,4 +112,10 @@ def main():
     print("==================================================")
 
 if __name__ == "__main__":
-    main()
+    # 🔒 Borra fotos en Shopify: no junto a la etapa de imágenes ni a otra reparación
+    try:
+        with bloqueo(RECURSO_IMAGENES):
+            main()
+    except RecursoOcupado as e:
+        print(f"⛔ {e}. Reintenta cuando termine.")
+        exit(1)
@@ -6,6 +6,7 @@ import io
 import base64
 from PIL import Image
 from dotenv import load_dotenv
+from modulos.nucleo.sync_bloqueos import bloqueo, RecursoOcupado, RECURSO_IMAGENES
 
 # Cargar variables de entorno
 load_dotenv()
@@ -258,4 +259,10 @@ def main():
     print(f"\n🎉 FINALIZADO | Reales: {reales} | Genéricas: {genericas}")
 
 if __name__ == "__main__":
-    main()
+    # 🔒 Mismo registro y mismas fotos que la etapa de imágenes del sync: uno a la vez
+    try:
+        with bloqueo(RECURSO_IMAGENES):
+            main()
+    except RecursoOcupado as e:
+        print(f"⛔ {e}. Reintenta cuando termine.")
+        exit(1)
@@ -5,14 +5,19 @@ import os
 import sys
 import json
 import time
+import shutil
+import signal
+import socket
+import tempfile
+import threading
 import pandas as pd
 import subprocess
+from datetime import datetime, timezone
 
 # 🔥 MÓDULOS DE LA NUEVA ARQUITECTURA
 from modulos.ia_seo import crear_diccionario_ia, subir_a_shopify
 from modulos.multimedia import sync_imagenes_auto
-from modulos.finanzas import repesca_precios
-from modulos.finanzas.precios import calcular_precio_final
+from modulos.finanzas import repesca_precios, preview_reglas
 
 from modulos.nucleo.sync_crear import crear_productos_graphql_turbo
 
@@ -24,13 +29,148 @@ from modulos.nucleo.sync_actualizar import (
 )
 
 from modulos.nucleo.sync_eliminar import archive_products_graphql
+from modulos.nucleo.sync_estrategia import (
+    planificar_estrategia,
+    totales_estrategia,
+    filas_por_paso,
+    leer_throttle,
+    ruta_de,
+    THROTTLE_POR_DEFECTO
+)
+from modulos.nucleo.sync_plan import (
+    armar_plan,
+    guardar_plan,
+    cargar_plan,
+    recortar_plan,
+    fusionar_estado,
+    claves_shard,
+    bloqueo_estado,
+    leer_shard,
+    ya_aplicado,
+    marcar_aplicado,
+    horas_de_antiguedad,
+    PLAN_MAX_HORAS,
+    descontar_diferidos
+)
+from modulos.nucleo.sync_presupuesto import (
+    iniciar_presupuesto,
+    hay_presupuesto,
+    leer_duracion,
+    restante,
+    plazo_nucleo,
+    plazo_etapa,
+    fijar_carriles,
+    MARGEN_CIERRE,
+    skus_diferidos,
+    DIFERIDOS
+)
+from modulos.nucleo.sync_paralelo import correr_en_paralelo
+from modulos.nucleo.sync_etapas import etapa, correr_etapas, carriles
+from modulos.nucleo.sync_objetivo import leer_skus, leer_etapas, recortar_a_skus, recortar_filas, ETAPAS_OBJETIVO
+from modulos.nucleo.sync_snapshots import (
+    abrir_snapshot,
+    guardar_parte,
+    cargar_parte,
+    volcar_productos,
+    iterar_productos_snapshot,
+    cerrar_snapshot,
+    descartar_snapshot,
+    resolver_snapshot,
+    SNAPSHOTS_ACTIVOS
+)
+from modulos.nucleo.sync_cola import (
+    ruta_cola,
+    conectar,
+    crear_cola,
+    leer_meta,
+    tomar_tarea,
+    latir_mientras,
+    terminar_tarea,
+    marcar_perdidas,
+    leer_tareas,
+    contar_estados,
+    balde_global,
+    COLA_SHARDS,
+    COLA_WORKERS,
+    ESTADO_PENDIENTE,
+    ESTADO_TOMADA,
+    ESTADO_HECHA
+)
+from modulos.nucleo.sync_bloqueos import (
+    tomar_bloqueo,
+    soltar_bloqueo,
+    bloqueo,
+    RecursoOcupado,
+    RECURSO_CATALOGO,
+    RECURSO_IMAGENES,
+    RECURSO_DICCIONARIO_IA,
+    RECURSO_MERCADO
+)
+from modulos.nucleo.sync_tiendas import (
+    cargar_tiendas,
+    carpeta_tienda,
+    entorno_tienda,
+    preparar_carpeta,
+    ruta_log,
+    ARCHIVO_TIENDAS,
+    DIR_ENTRADA
+)
+from modulos.nucleo.sync_calientes import (
+    cargar_calientes,
+    guardar_calientes,
+    registrar_ids,
+    leer_calientes_shopify
+)
+from modulos.nucleo.sync_daemon import (
+    iniciar_servidor,
+    registrar_ciclo,
+    marca_delta,
+    fusionar_catalogo,
+    firmas_archivos,
+    ESTADO_DAEMON,
+    INTERVALO_DAEMON,
+    RECONCILIAR_CADA,
+    AUSENCIA_CADA,
+    PUERTO_DAEMON
+)
+from modulos.nucleo.sync_huellas import (
+    cargar_huellas,
+    guardar_huellas,
+    cargar_decisiones,
+    guardar_decisiones,
+    ARCHIVO_HUELLAS,
+    ARCHIVO_DECISIONES
+)
+from modulos.nucleo.sync_ausencias import (
+    cargar_historial_ausencias,
+    guardar_historial_ausencias,
+    amortiguar_archivado,
+    AUSENCIAS_PARA_ARCHIVAR,
+    ARCHIVO_AUSENCIAS
+)
+from modulos.nucleo.sync_planificador import (
+    construir_plan,
+    construir_plan_streaming,
+    priorizar_actualizar,
+    cambia_precio,
+    variantes_con_impuesto,
+    marcar_productos_vivos,
+    volcar_mediven,
+    volcar_shopify
+)
 
 # 📉 Diagnóstico ahora está mucho más liviano
 from modulos.nucleo.sync_diagnostico import (
     get_mediven_inventory,
-    get_shopify_products,
+    get_shopify_products_por_sku,
     normalize_shopify_products,
+    iterar_productos_shopify,
+    iterar_filas_shopify,
     generar_excel,
+    cargar_cache_nombres,
+    guardar_cache_nombres,
+    formatear_nombre_cacheado,
+    BALDE_GLOBAL,
     DELETE_MISSING
 )
 
@@ -38,11 +178,34 @@ from modulos.nucleo.sync_diagnostico import (
 from rich.console import Console
 from rich.panel import Panel
 from rich.rule import Rule
+from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, BarColumn, TimeElapsedColumn, TextColumn
 
 console = Console()
 
-LOCKFILE = "sync.lock"
+# 🔒 Bloqueos por recurso (locks/<recurso>.lock, ver sync_bloqueos): el núcleo toma
+# "catalogo"; cada etapa post-sync toma el suyo y, si otro proceso lo tiene (una
+# reparación de imágenes, por ejemplo), espera hasta esto y si no, se salta
+ESPERA_RECURSO = float(os.getenv("SYNC_ESPERA_RECURSO", "30"))
+
+# ⚙️ Crear / precios / básicos / archivar a la vez contra el mismo balde de Shopify
+# (SYNC_APLICAR_EN_PARALELO=0 los corre en serie, como antes)
+APLICAR_EN_PARALELO = os.getenv("SYNC_APLICAR_EN_PARALELO", "1") != "0"
+
+# 📦 Subcomandos: "plan" solo planifica y guarda el plan; "apply <archivo>" lo aplica.
+# Sin subcomando: planificar + aplicar en el mismo proceso (como siempre).
+# "daemon": proceso que no se apaga, con ciclos delta cada N minutos (ver main_daemon).
+# "rapido": carril rápido de precios para los SKUs calientes (ver sync_calientes).
+# "coordinar <plan>" / "worker <cola>": aplicar un plan con varios procesos (ver sync_cola).
+# "tiendas": un Mediven para varias tiendas de Shopify (ver sync_tiendas).
+COMANDOS = ("plan", "apply", "daemon", "rapido", "coordinar", "worker", "tiendas")
+COMANDO = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in COMANDOS else None
+
+# 🌊 Plan por corridas en disco (catálogos gigantes, memoria acotada)
+MODO_STREAMING = "--streaming" in sys.argv
+
+# 🧬 Ignora las huellas y re-evalúa todo el catálogo (se regeneran igual)
+MODO_COMPLETO = "--full" in sys.argv
 
 # ==========================================================
 #   Formateo del tiempo total
@@ -55,94 +218,1237 @@ def format_time(seconds):
     return f"{mins} min {secs:.1f} s"
 
 # ==========================================================
-#  LOCKFILE
+#  BLOQUEOS
 # ==========================================================
-def create_lock():
-    if os.path.exists(LOCKFILE):
-        console.print("[bold red]⚠️ Ya existe una ejecución activa (sync.lock presente). Cancelando.[/bold red]")
+def create_lock(recurso=RECURSO_CATALOGO):
+    try:
+        tomar_bloqueo(recurso)
+    except RecursoOcupado as e:
+        console.print(f"[bold red]⚠️ Ya existe una ejecución activa: {e}. Cancelando.[/bold red]")
         exit(1)
-    with open(LOCKFILE, "w") as f:
-        f.write(str(int(time.time())))
 
-def remove_lock():
-    if os.path.exists(LOCKFILE):
-        os.remove(LOCKFILE)
+def remove_lock(recurso=RECURSO_CATALOGO):
+    soltar_bloqueo(recurso)
+
+def con_recurso(recurso, nombre, funcion):
+    """La etapa `nombre` corre con su recurso tomado; si otro proceso no lo suelta a tiempo, se salta."""
+    def _correr():
+        try:
+            with bloqueo(recurso, espera=ESPERA_RECURSO):
+                return funcion()
+        except RecursoOcupado as e:
+            console.print(f"[yellow]⏭️ {nombre}: {e}. Queda para la próxima corrida.[/yellow]")
+    return _correr
+
+def valor_argumento(nombre, defecto=None):
+    """Valor que sigue a un flag (ej: --shard 2/4)."""
+    if nombre in sys.argv:
+        i = sys.argv.index(nombre)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return defecto
 
 # ==========================================================
-#  FLUJO PRINCIPAL — ULTRA PRO
+#  APLICAR UN PLAN (fusionado o "sync.py apply")
 # ==========================================================
-def main():
+def filas_de_etapas(crear, actualizar, archivar, etapas):
+    """filas_por_paso contando solo los pasos de --only."""
+    filas = filas_por_paso(
+        crear if "crear" in etapas else [],
+        [p for p in actualizar if cambia_precio(p)] if "precios" in etapas else [],
+        archivar if "archivar" in etapas else [],
+        DELETE_MISSING
+    )
+    # Básicos sale de actualizar aunque los precios no vayan
+    filas["basicos"] = len([p for p in actualizar if p.get("actualizar_basicos")]) if "nombres" in etapas else 0
+    return filas
+
+def guardar_estado(estado, shard, diferidos=frozenset(), precio_pendiente=frozenset(), archivo_pendiente=frozenset(),
+                   skus=None, claves=None):
+    """
+    Guarda memoria / huellas / decisiones / ausencias; con shards, solo los SKUs del shard.
+    diferidos: SKUs que no alcanzaron a escribirse (ver descontar_diferidos).
+    skus: plan dirigido (--skus), solo se tocan esos SKUs.
+    claves: {SKU: clave de reparto} del plan completo (ver claves_shard).
+    Retorna el estado tal como quedó en disco.
+    """
+    archivo_memoria = os.path.join("data", "memoria_precios.json")
+    parcial = shard[1] > 1 or skus is not None
+    with bloqueo_estado():
+        memoria_actual = {}
+        if (parcial or diferidos) and os.path.exists(archivo_memoria):
+            with open(archivo_memoria, "r", encoding="utf-8") as f:
+                memoria_actual = json.load(f)
+        if diferidos:
+            estado = descontar_diferidos(estado, memoria_actual, diferidos, precio_pendiente, archivo_pendiente)
+        guardado = {"memoria_precios": fusionar_estado(memoria_actual, estado["memoria_precios"], shard, skus, claves)}
+        with open(archivo_memoria, "w", encoding="utf-8") as f:
+            json.dump(guardado["memoria_precios"], f, indent=2)
+
+        if "huellas" in estado:
+            actuales = cargar_huellas() if parcial else {}
+            guardado["huellas"] = fusionar_estado(actuales, estado["huellas"], shard, skus, claves)
+            guardar_huellas(guardado["huellas"])
+            actuales = cargar_decisiones() if parcial else {}
+            guardado["decisiones"] = fusionar_estado(actuales, estado["decisiones"], shard, skus, claves)
+            guardar_decisiones(guardado["decisiones"])
+
+        actuales = cargar_historial_ausencias() if parcial else {}
+        guardado["historial_ausencias"] = fusionar_estado(actuales, estado["historial_ausencias"], shard, skus, claves)
+        guardar_historial_ausencias(guardado["historial_ausencias"])
+    return guardado
+
+def aplicar_plan(plan, shard=(0, 1), hasta=None, con_impuestos=True, guardar=True):
+    """
+    Pasos 6 y 7: escrituras en Shopify (por impacto), estado y quitar impuestos.
+    hasta: límite (reloj monotónico) de --max-runtime; lo que no alcance queda diferido.
+    Si el plan trae "etapas" (--only), los pasos fuera de ellas no se escriben y sus SKUs
+    quedan en el estado como estaban.
+    con_impuestos=False: el paso 7 lo corre quien llama (con las etapas post-sync).
+    guardar=False: no escribe data/ (worker de la cola: el estado lo guarda el coordinador).
+    Retorna el resultado: filas por paso, duración de cada escritor y los SKUs pendientes
+    que hay que pasarle a guardar_estado (con guardar=True, "estado" es lo que quedó en disco).
+    """
+    etapas = set(plan.get("etapas") or ETAPAS_OBJETIVO)
+    crear = plan["crear"] if "crear" in etapas else []
+    # Al escritor de precios va solo lo que cambia de precio: una fila que está en
+    # actualizar solo por título o estado ya tiene el precio bueno en Shopify
+    actualizar = [p for p in plan["actualizar"] if cambia_precio(p)] if "precios" in etapas else []
+    archivar = plan["archivar"] if "archivar" in etapas else []
+
+    # ⚔️ CONFLICTOS: un producto con alguna variante viva no se archiva: sería archivar +
+    # reactivar en la misma corrida (o cada corrida, para siempre). "producto_vivo" mira todo
+    # Shopify/Mediven (marcar_productos_vivos); actualizar cubre los planes que no lo traen
+    productos_vivos = {str(p["product_id"]) for p in plan["actualizar"]}
+    productos_vivos |= {str(p["product_id"]) for p in archivar if p.get("producto_vivo")}
+    en_conflicto = [p for p in archivar if str(p.get("product_id")) in productos_vivos]
+    if en_conflicto:
+        archivar = [p for p in archivar if str(p.get("product_id")) not in productos_vivos]
+        console.print(
+            f"[yellow]⚔️ {len(en_conflicto)} filas de archivar se descartan: su producto tiene "
+            f"variantes vigentes.[/yellow]"
+        )
+    basicos = [p for p in plan["actualizar"] if p.get("actualizar_basicos")] if "nombres" in etapas else []
+
+    # Lo que --only dejó afuera no se escribió: para el estado cuenta como diferido
+    omitidos_precio = {str(p["SKU"]) for p in plan["crear"] if "crear" not in etapas}
+    omitidos_precio |= {str(p["SKU"]) for p in plan["actualizar"] if "precios" not in etapas}
+    omitidos = omitidos_precio | {
+        str(p["SKU"]) for p in plan["actualizar"] if p.get("actualizar_basicos") and "nombres" not in etapas
+    }
+
+    bajo_costo = [p for p in actualizar if p["Bajo_Costo"]]
+    errores = 0
+    filas = filas_de_etapas(plan["crear"], plan["actualizar"], archivar, etapas)
+    estrategia = planificar_estrategia(filas)
+
+    # ======================================================
+    # 6) APLICAR CAMBIOS
+    # ======================================================
+    console.print(Rule("[bold cyan]⚙️ Aplicando cambios en Shopify[/bold cyan]"))
+
+    # 🎯 ORDEN POR IMPACTO: si la corrida se corta, lo que más vale ya quedó escrito
+    # 1. PRECIOS BAJO EL COSTO (cada venta es pérdida): solos y primero
+    if bajo_costo:
+        with console.status(f"[red]Corrigiendo {len(bajo_costo)} precios bajo el costo…[/red]"):
+            errores += contar_errores(
+                graphql_bulk_update_variants(bajo_costo, ruta=ruta_de(estrategia, "precios_bajo_costo"), hasta=hasta)
+            )
 
-    # 🕒 TIMER
+    # 2. a 5. CREAR / RESTO DE PRECIOS / BÁSICOS / ARCHIVAR a la vez: cada uno por su cuenta
+    # deja el balde a medio usar; juntos lo mantienen lleno (shopify_graphql reparte el costo).
+    # No se pisan: crear son productos nuevos, precios y básicos tocan campos distintos y
+    # archivar ya no trae productos con variantes vivas (ver arriba).
+    escritores = []
+    resto_precios = [p for p in actualizar if not p["Bajo_Costo"]]
+    if crear:
+        # Producto que no está publicado no vende
+        escritores.append(etapa("crear", lambda: crear_productos_graphql_turbo(crear, hasta=hasta)))
+    if resto_precios:
+        # Ya vienen de mayor a menor impacto
+        escritores.append(etapa(
+            "precios", lambda: graphql_bulk_update_variants(resto_precios, ruta=ruta_de(estrategia, "precios"), hasta=hasta)
+        ))
+    if basicos:
+        # Título y reactivar estado
+        escritores.append(etapa(
+            "basicos", lambda: bulk_update_product_basics(basicos, ruta=ruta_de(estrategia, "basicos"), hasta=hasta)
+        ))
+    if archivar:
+        if DELETE_MISSING:
+            escritores.append(etapa(
+                "archivar", lambda: archive_products_graphql(archivar, ruta=ruta_de(estrategia, "archivar"), hasta=hasta)
+            ))
+        else:
+            console.print("[yellow]ℹ DELETE_MISSING=false — no se eliminarán productos (aunque sean excluidos).[/yellow]")
+
+    if not APLICAR_EN_PARALELO:
+        # En serie: cada escritor depende del anterior (mismo orden de siempre)
+        escritores = [
+            {**e, "depende": (escritores[i - 1]["nombre"],) if i else ()} for i, e in enumerate(escritores)
+        ]
+    tiempos = correr_etapas_con_tabla(escritores, "Escritura en Shopify")
+
+    # Un escritor que reventó no puede quedar como escrito en la memoria (como cuando iban en serie)
+    fallidos = [t["nombre"] for t in tiempos if t["estado"] == "error"]
+    if fallidos:
+        raise RuntimeError(f"Falló la escritura en Shopify ({', '.join(fallidos)}); no se guarda el estado.")
+    errores += sum(contar_errores(t["retorno"]) for t in tiempos)
+    if errores:
+        console.print(
+            f"[bold yellow]⚠️ Shopify rechazó {errores} escrituras (userErrors): el plan no queda como "
+            f"aplicado y se puede volver a aplicar.[/bold yellow]"
+        )
+
+    diferidos = skus_diferidos("precios", "crear", "basicos", "archivar")
+    if diferidos:
+        console.print(f"[bold yellow]⏱️ Cambios aplicados a medias: {len(diferidos)} SKUs quedan para la próxima corrida[/bold yellow]")
+    else:
+        console.print("[bold green]✔ Cambios aplicados correctamente[/bold green]")
+
+    resultado = {
+        "filas": filas,
+        "segundos": {t["nombre"]: round(t["duracion"], 2) for t in tiempos},
+        "diferidos": sorted(diferidos | omitidos),
+        "precio_pendiente": sorted(skus_diferidos("precios", "crear") | omitidos_precio),
+        "archivo_pendiente": sorted(skus_diferidos("archivar")),
+        "errores": errores,
+        "completo": not diferidos,
+    }
+
+    # 💾 GUARDAMOS LA MEMORIA SOLO SI SUBIMOS A SHOPIFY (lo diferido queda como estaba)
+    if guardar:
+        resultado["estado"] = guardar_resultado(plan, shard, resultado)
+
+    # ======================================================
+    # 7) REMOVE TAX (Ultra Optimizado)
+    # ======================================================
+    # (en la corrida completa va con las etapas post-sync, en paralelo)
+    if con_impuestos:
+        console.print(Rule("[bold magenta]🔥 ELIMINANDO IMPUESTOS (POST-SYNC)[/bold magenta]"))
+        with console.status("[red]Quitando impuestos...[/red]"):
+            quitar_impuestos_plan(plan, hasta)
+
+    # Un plan cortado no cuenta como aplicado: se puede volver a aplicar para terminarlo
+    if guardar and not diferidos:
+        marcar_aplicado(plan, shard, errores)
+    return resultado
+
+def contar_errores(retorno):
+    """Errores que informa un escritor: {"ok", "errores"}, (ok, errores) o nada, según cuál."""
+    if isinstance(retorno, dict):
+        return retorno.get("errores", 0)
+    if isinstance(retorno, tuple) and len(retorno) == 2:
+        return retorno[1]
+    return 0
+
+def guardar_resultado(plan, shard, resultado):
+    """
+    Estado del plan para un shard ya aplicado (lo diferido / omitido queda como estaba).
+    Retorna el estado guardado.
+    """
+    os.makedirs("data", exist_ok=True)
+    claves = (plan.get("claves_shard") or claves_shard(plan)) if shard[1] > 1 else None
+    return guardar_estado(
+        plan["estado"], shard, set(resultado["diferidos"]), set(resultado["precio_pendiente"]),
+        set(resultado["archivo_pendiente"]), set(plan["skus"]) if plan.get("skus") is not None else None,
+        claves
+    )
+
+def quitar_impuestos_plan(plan, hasta=None):
+    """Paso 7: deja sin impuesto las variantes taxable del plan (si --only lo incluye)."""
+    variantes_con_tax = plan["impuestos"]
+    if "impuestos" not in (plan.get("etapas") or ETAPAS_OBJETIVO):
+        console.print("[cyan]ℹ Impuestos fuera de --only. Se salta.[/cyan]")
+    elif variantes_con_tax:
+        quitar_impuestos_graphql(variantes_con_tax, hasta=hasta)
+        console.print(f"[bold green]✔ Impuestos eliminados en {len(variantes_con_tax)} variantes[/bold green]")
+    else:
+        console.print("[green]✔ No hay variantes con impuesto. Nada que hacer.[/green]")
+
+def correr_etapas_con_tabla(etapas_post, titulo="Etapas post-sync"):
+    """Corre etapas con el planificador (sync_etapas): barra por etapa y tabla de tiempos."""
+    if not etapas_post:
+        return []
+    inicio = time.monotonic()
+
+    with Progress(
+        SpinnerColumn(), TextColumn("{task.description}"), TextColumn("{task.fields[estado]}"),
+        TimeElapsedColumn(), console=console
+    ) as barras:
+        tareas = {e["nombre"]: barras.add_task(e["nombre"], total=1, estado="⏳ en espera") for e in etapas_post}
+        marcas = {"corriendo": "▶ corriendo", "ok": "[green]✔ ok[/green]", "error": "[red]❌ error[/red]"}
+
+        def al_cambiar(nombre, estado):
+            barras.update(tareas[nombre], estado=marcas[estado], completed=0 if estado == "corriendo" else 1)
+
+        # Cada etapa reparte su plazo solo con las de su carril (ver plazo_etapa)
+        fijar_carriles(carriles(etapas_post))
+        tiempos = correr_etapas(etapas_post, al_cambiar)
+
+    total = time.monotonic() - inicio
+    tabla = Table(title=f"⏲️ {titulo}")
+    for col in ["Etapa", "Servicios", "Depende de", "Espera", "Duración", "Estado"]:
+        tabla.add_column(col, justify="right" if col in ("Espera", "Duración") else "left")
+    dependencias = {e["nombre"]: ", ".join(e["depende"]) or "—" for e in etapas_post}
+    for t in tiempos:
+        tabla.add_row(
+            t["nombre"], ", ".join(t["servicios"]) or "—", dependencias[t["nombre"]],
+            format_time(t["espera"]), format_time(t["duracion"]),
+            "[green]ok[/green]" if t["estado"] == "ok" else f"[red]{t['error'][:40]}[/red]",
+        )
+    console.print(tabla)
+    en_serie = sum(t["duracion"] for t in tiempos)
+    console.print(
+        f"[cyan]⏲️ {titulo}: {format_time(total)} (en serie habrían sido ~{format_time(en_serie)})[/cyan]"
+    )
+    return tiempos
+
+def normalizar_df_shop(df_shop):
+    """SKU como texto sin espacios y bodyHtml sin nulos (también con el catálogo vacío)."""
+    if not df_shop.empty:
+        df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
+        # Aseguramos que la columna bodyHtml no tenga nulos para evitar errores
+        if "bodyHtml" in df_shop.columns:
+            df_shop["bodyHtml"] = df_shop["bodyHtml"].fillna("")
+        else:
+            df_shop["bodyHtml"] = ""
+    else:
+        df_shop["sku"] = pd.Series(dtype=str)
+        df_shop["bodyHtml"] = pd.Series(dtype=str)
+    return df_shop
+
+def etapa_espia():
+    return etapa(
+        "espia", con_recurso(
+            RECURSO_MERCADO, "espia", lambda: repesca_precios.ejecutar_repesca_diaria(hasta=plazo_etapa("espia"))
+        ),
+        servicios=["serper"]
+    )
+
+def etapa_ia(skus_objetivo=None):
+    return etapa(
+        "ia", con_recurso(
+            RECURSO_DICCIONARIO_IA, "ia",
+            lambda: crear_diccionario_ia.main(hasta=plazo_etapa("ia"), solo_skus=skus_objetivo)
+        ),
+        servicios=["gemini"]
+    )
+
+def armar_etapas_post(plan, df_shop, etapas, skus_objetivo=None, con_espia=False):
+    """
+    Pasos 7 a 8.5 como etapas del planificador (sync_etapas).
+    Dependencias reales: SEO sube lo que genera la IA; imágenes usa df_shop (ya está).
+    Lo demás corre a la vez, con límite de etapas simultáneas por servicio.
+    """
+    etapas_post = []
+
+    if "impuestos" in etapas:
+        etapas_post.append(etapa(
+            "impuestos", lambda: quitar_impuestos_plan(plan, plazo_nucleo()), servicios=["shopify"]
+        ))
+
+    # 7.5) MINI-ESPÍA CON EL TIEMPO QUE SOBRA (--max-runtime)
+    if con_espia:
+        etapas_post.append(etapa_espia())
+
+    # 8) MOTOR DE IA (NUEVO)
+    if "ia" in etapas:
+        etapas_post.append(etapa_ia(skus_objetivo))
+
+    # 8.1) MOTOR DE IMÁGENES (SERPER)
+    if "imagenes" in etapas:
+        if skus_objetivo is not None:
+            # Dirigida: df_shop ya trae solo esos productos y se les busca foto de nuevo
+            skus_sin_foto = sorted(skus_objetivo)
+        else:
+            # 🔥 MAGIA MEJORADA: Solo buscamos fotos para productos ACTIVOS
+            skus_sin_foto = df_shop[(df_shop['has_image'] == False) & (df_shop['status'] == 'active')]['sku'].dropna().astype(str).tolist()
+
+            if skus_sin_foto:
+                console.print(f"[bold yellow]⚠️ Alerta Visual: Se detectaron {len(skus_sin_foto)} productos ACTIVOS sin foto. Forzando búsqueda...[/bold yellow]")
+
+        etapas_post.append(etapa(
+            "imagenes",
+            con_recurso(
+                RECURSO_IMAGENES, "imagenes",
+                lambda: sync_imagenes_auto.ejecutar_repesca_imagenes(df_shop, skus_forzados=skus_sin_foto, hasta=plazo_etapa("imagenes"))
+            ),
+            servicios=["serper", "shopify"]
+        ))
+
+    # 8.5) ACTUALIZAR SHOPIFY (El paso final)
+    if "seo" in etapas:
+        # 🔥 MAGIA MEJORADA: Solo inyectamos SEO a productos ACTIVOS
+        skus_vacios = df_shop[(df_shop['bodyHtml'] == '') & (df_shop['status'] == 'active')]['sku'].dropna().astype(str).tolist()
+
+        if skus_vacios and skus_objetivo is None:
+            console.print(f"[bold yellow]⚠️ Alerta SEO: Se detectaron {len(skus_vacios)} productos ACTIVOS sin descripción. Forzando inyección...[/bold yellow]")
+
+        etapas_post.append(etapa(
+            "seo", con_recurso(
+                RECURSO_DICCIONARIO_IA, "seo",
+                lambda: subir_a_shopify.main(skus_forzados=skus_vacios, hasta=plazo_etapa("seo"), solo_skus=skus_objetivo)
+            ),
+            servicios=["shopify"], depende=["ia"]
+        ))
+    return etapas_post
+
+def reportar_diferidos():
+    """Tabla final de lo que quedó pendiente por --max-runtime (nada si no hubo cortes)."""
+    if not DIFERIDOS:
+        return
+    por_etapa = {}
+    for d in DIFERIDOS:
+        por_etapa[d["etapa"]] = por_etapa.get(d["etapa"], 0) + d["pendientes"]
+    tabla = Table(title="⏱️ Trabajo diferido a la próxima corrida")
+    tabla.add_column("Etapa")
+    tabla.add_column("Pendientes", justify="right")
+    for nombre, pendientes in por_etapa.items():
+        tabla.add_row(nombre, str(pendientes))
+    console.print(tabla)
+
+def revisar_antiguedad(plan, forzar):
+    antiguedad = horas_de_antiguedad(plan)
+    if antiguedad > PLAN_MAX_HORAS and not forzar:
+        console.print(
+            f"[bold red]❌ El plan tiene {antiguedad:.1f} h (máximo {PLAN_MAX_HORAS:g} h): Shopify pudo cambiar "
+            f"(precios manuales). Planifica de nuevo o usa --force.[/bold red]"
+        )
+        exit(1)
+
+def main_apply():
+    """python sync.py apply planes/plan_....json.gz [--shard i/N] [--force]"""
     start_time = time.time()
+    ruta = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else None
+    if not ruta:
+        console.print("[bold red]❌ Uso: python sync.py apply <plan.json.gz> [--shard i/N] [--force][/bold red]")
+        exit(1)
 
-    console.print(Panel.fit("🚀 [bold cyan]SINCRONIZACIÓN COMPLETA (AUTO)[/bold cyan]", style="bold magenta"))
-    create_lock()
+    forzar = "--force" in sys.argv
+    try:
+        shard = leer_shard(valor_argumento("--shard"))
+        plan = cargar_plan(ruta)
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ No se puede aplicar {ruta}: {e}[/bold red]")
+        exit(1)
+
+    etiqueta = f"shard {shard[0] + 1}/{shard[1]}"
+    console.print(Panel.fit(
+        f"📦 [bold cyan]APLICAR PLAN[/bold cyan] {plan['hash'][:12]} ({etiqueta})\n"
+        f"Creado: {plan['creado']}", style="bold magenta"
+    ))
+
+    if ya_aplicado(plan, shard) and not forzar:
+        console.print(f"[green]✔ Este plan ya se aplicó ({etiqueta}). Nada que hacer (--force para repetir).[/green]")
+        return
+
+    revisar_antiguedad(plan, forzar)
+
+    ruta_lock = f"apply_{shard[0] + 1}de{shard[1]}"
+    create_lock(ruta_lock)
+    try:
+        aplicar_plan(recortar_plan(plan, shard), shard, hasta=plazo_nucleo())
+    finally:
+        remove_lock(ruta_lock)
+
+    reportar_diferidos()
+
+    console.print(Panel.fit(
+        f"🎉 [bold green]PLAN APLICADO ({etiqueta})[/bold green]\n"
+        f"🕒 Tiempo total: [cyan]{format_time(time.time() - start_time)}[/cyan]",
+        style="bold blue", title="FIN"
+    ))
+
+# ==========================================================
+#  COLA DE TRABAJO ("sync.py coordinar" / "sync.py worker")
+# ==========================================================
+def main_coordinar():
+    """python sync.py coordinar planes/plan_....json.gz [--shards N] [--workers K] [--force]"""
+    start_time = time.time()
+    ruta = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else None
+    if not ruta:
+        console.print("[bold red]❌ Uso: python sync.py coordinar <plan.json.gz> [--shards N] [--workers K] [--force][/bold red]")
+        exit(1)
+
+    try:
+        total = int(valor_argumento("--shards", str(COLA_SHARDS)))
+        workers = int(valor_argumento("--workers", str(min(total, COLA_WORKERS))))
+        if total < 1 or workers < 0:
+            raise ValueError("--shards debe ser ≥ 1 y --workers ≥ 0")
+        plan = cargar_plan(ruta)
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ No se puede coordinar {ruta}: {e}[/bold red]")
+        exit(1)
+    forzar = "--force" in sys.argv
+    revisar_antiguedad(plan, forzar)
+
+    cola = ruta_cola(ruta)
+    ruta_lock = f"coordinar_{plan['hash'][:12]}"
+    create_lock(ruta_lock)
+    procesos = []
+    try:
+        # --force: también repite los shards que ya se aplicaron
+        pendientes = crear_cola(cola, ruta, plan, total, leer_throttle(), reiniciar=forzar)
+        console.print(Panel.fit(
+            f"🧵 [bold cyan]COORDINADOR[/bold cyan] plan {plan['hash'][:12]}: {total} shards "
+            f"({pendientes} pendientes), {workers} workers locales\n"
+            f"Cola: {cola}\n"
+            f"Más workers (otra terminal u otra máquina con la misma carpeta): "
+            f"[cyan]python sync.py worker {cola}[/cyan]", style="bold magenta"
+        ))
+
+        # Cada worker es un proceso aparte (su propio GIL y su propio cliente HTTP);
+        # su salida va a un log para que no se mezcle con la de los demás
+        extra = ["--max-runtime", valor_argumento("--max-runtime")] if "--max-runtime" in sys.argv else []
+        base_log = cola[: -len(".cola.sqlite")]
+        for i in range(min(workers, pendientes)):
+            with open(f"{base_log}.worker{i + 1}.log", "w", encoding="utf-8") as log:
+                procesos.append(subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), "worker", cola, *extra],
+                    stdout=log, stderr=subprocess.STDOUT,
+                ))
+        esperar_cola(cola, total, procesos)
+    finally:
+        for proceso in procesos:
+            if proceso.poll() is None:
+                proceso.terminate()
+        remove_lock(ruta_lock)
+
+    # 🧩 Resultados y estado: el coordinador es el único que escribe data/
+    con = conectar(cola)
+    try:
+        tareas = leer_tareas(con)
+    finally:
+        con.close()
+    hechas = [t for t in tareas if t["estado"] == ESTADO_HECHA]
+    for tarea in hechas:
+        guardar_resultado(plan, (tarea["shard"], total), tarea["resultado"])
+        if tarea["resultado"]["completo"]:
+            marcar_aplicado(plan, (tarea["shard"], total), tarea["resultado"].get("errores", 0))
+    mostrar_tareas(tareas)
+
+    incompletas = [t for t in tareas if t["estado"] != ESTADO_HECHA]
+    console.print(Panel.fit(
+        f"{'🎉 [bold green]PLAN APLICADO POR LA COLA' if not incompletas else '⚠️ [bold yellow]PLAN APLICADO A MEDIAS'}"
+        f"[/]: {len(hechas)}/{total} shards\n"
+        + (f"Sin terminar: {', '.join(str(t['shard'] + 1) for t in incompletas)} → volver a correr "
+           f"coordinar con el mismo plan (los hechos no se repiten)\n" if incompletas else "")
+        + f"🕒 Tiempo total: [cyan]{format_time(time.time() - start_time)}[/cyan]",
+        style="bold blue" if not incompletas else "yellow", title="FIN"
+    ))
+    if incompletas:
+        exit(1)
+
+def esperar_cola(cola, total, procesos):
+    """Hasta que no quede nada pendiente ni tomado (o no quede worker local que lo tome)."""
+    con = conectar(cola)
+    try:
+        with Progress(
+            SpinnerColumn(), TextColumn("{task.description}"), BarColumn(),
+            TextColumn("{task.fields[detalle]}"), TimeElapsedColumn(), console=console
+        ) as barras:
+            tarea = barras.add_task("Shards", total=total, detalle="")
+            while True:
+                marcar_perdidas(con)
+                estados = contar_estados(con)
+                en_curso = estados.get(ESTADO_PENDIENTE, 0) + estados.get(ESTADO_TOMADA, 0)
+                barras.update(
+                    tarea, completed=total - en_curso,
+                    detalle=" · ".join(f"{n} {estado}" for estado, n in sorted(estados.items())),
+                )
+                if not en_curso:
+                    return
+                # Sin workers locales vivos, lo pendiente lo tiene que tomar un worker de afuera;
+                # si había locales y terminaron todos, ya no queda quién
+                if procesos and all(p.poll() is not None for p in procesos) and not estados.get(ESTADO_TOMADA):
+                    console.print("[yellow]⚠️ Los workers locales terminaron y quedan shards pendientes.[/yellow]")
+                    return
+                time.sleep(1)
+    finally:
+        con.close()
+
+def mostrar_tareas(tareas):
+    """Tabla por shard con lo que escribió cada uno, más la fila de totales."""
+    pasos = [("precios_bajo_costo", "Bajo costo"), ("precios", "Precios"), ("crear", "Crear"),
+             ("basicos", "Básicos"), ("archivar", "Archivar")]
+    tabla = Table(title="🧵 Shards de la cola")
+    for col in ["Shard", "Estado", "Worker", *(t for _, t in pasos), "Diferidos", "Duración"]:
+        tabla.add_column(col, justify="left" if col in ("Shard", "Estado", "Worker") else "right")
+    totales = {paso: 0 for paso, _ in pasos}
+    diferidos = 0
+    for t in tareas:
+        resultado = t["resultado"] or {}
+        filas = resultado.get("filas", {})
+        for paso, _ in pasos:
+            totales[paso] += filas.get(paso, 0)
+        diferidos += len(resultado.get("diferidos", []))
+        duracion = format_time(t["fin"] - t["tomada"]) if t["fin"] and t["tomada"] else "—"
+        estado = t["estado"] if t["estado"] == ESTADO_HECHA else f"[red]{t['estado']}[/red] {(t['error'] or '')[:30]}"
+        tabla.add_row(
+            str(t["shard"] + 1), estado, t["worker"] or "—",
+            *(str(filas.get(paso, 0)) for paso, _ in pasos),
+            str(len(resultado.get("diferidos", []))), duracion,
+        )
+    tabla.add_row("[bold]Total[/bold]", "", "", *(f"[bold]{totales[p]}[/bold]" for p, _ in pasos), f"[bold]{diferidos}[/bold]", "")
+    console.print(tabla)
+
+def main_worker():
+    """python sync.py worker planes/plan_....cola.sqlite [--max-runtime 90m]"""
+    ruta = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else None
+    if not ruta or not os.path.exists(ruta):
+        console.print("[bold red]❌ Uso: python sync.py worker <plan.cola.sqlite> (la cola la crea coordinar)[/bold red]")
+        exit(1)
+
+    con = conectar(ruta)
+    try:
+        meta = leer_meta(con)
+        # En otra máquina la ruta absoluta del coordinador puede no existir: se busca junto a la cola
+        ruta_plan = meta["plan"]
+        if not os.path.exists(ruta_plan):
+            ruta_plan = os.path.join(os.path.dirname(ruta), os.path.basename(ruta_plan))
+        plan = cargar_plan(ruta_plan)
+        if plan["hash"] != meta["hash"]:
+            raise ValueError("el plan no es el de la cola")
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ No se puede trabajar con {ruta}: {e}[/bold red]")
+        exit(1)
+
+    nombre = f"{socket.gethostname()}-{os.getpid()}"
+    total = meta["total"]
+    # 🪣 Todas las escrituras de todos los workers contra el mismo balde
+    reservar, registrar = balde_global(ruta)
+    BALDE_GLOBAL.update(reservar=reservar, registrar=registrar)
+
+    hechos = 0
+    try:
+        while True:
+            indice = tomar_tarea(con, nombre)
+            if indice is None:
+                break
+            shard = (indice, total)
+            console.print(Rule(f"[bold cyan]🧵 Shard {indice + 1}/{total} ({nombre})[/bold cyan]"))
+            parar = latir_mientras(ruta, indice, nombre)
+            try:
+                resultado = aplicar_plan(recortar_plan(plan, shard), shard, hasta=plazo_nucleo(), guardar=False)
+                terminar_tarea(con, indice, nombre, resultado)
+                hechos += 1
+            except Exception as e:
+                terminar_tarea(con, indice, nombre, error=str(e)[:500])
+                console.print(f"[bold red]❌ Shard {indice + 1}/{total}: {e}[/bold red]")
+            finally:
+                parar.set()
+            reportar_diferidos()
+            # Lo diferido es por shard (cada resultado lleva el suyo)
+            DIFERIDOS.clear()
+    finally:
+        con.close()
+        BALDE_GLOBAL.update(reservar=None, registrar=None)
+    console.print(f"[bold green]🧵 Worker {nombre}: {hechos} shards aplicados.[/bold green]")
+
+# ==========================================================
+#  VARIAS TIENDAS ("sync.py tiendas")
+# ==========================================================
+def main_tiendas(skus_objetivo, etapas):
+    """python sync.py tiendas [--solo sur,principal] [--max-runtime 55m] [--only ...] [--skus ...] [--full] [--dry-run]"""
+    start_time = time.time()
+    try:
+        tiendas = cargar_tiendas()
+        if "--solo" in sys.argv:
+            pedidas = [t.strip() for t in valor_argumento("--solo", "").split(",") if t.strip()]
+            desconocidas = [t for t in pedidas if t not in tiendas]
+            if desconocidas or not pedidas:
+                raise ValueError(f"--solo: tiendas desconocidas {', '.join(desconocidas) or '(ninguna)'}")
+            tiendas = {t: tiendas[t] for t in pedidas}
+        entornos = {nombre: entorno_tienda(nombre, perfil) for nombre, perfil in tiendas.items()}
+    except ValueError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        exit(1)
+
+    console.print(Panel.fit(
+        f"🏬 [bold cyan]VARIAS TIENDAS[/bold cyan] ({ARCHIVO_TIENDAS}): {', '.join(tiendas)}\n"
+        f"Mediven, exclusiones, nombres, mercado e IA una vez; cada tienda planifica y escribe en paralelo",
+        style="bold magenta"
+    ))
 
+    ruta_lock = "tiendas"
+    create_lock(ruta_lock)
+    procesos = {}
     try:
         # ======================================================
-        # 1) MEDIVEN
+        # LO COMPARTIDO (una vez para todas las tiendas)
         # ======================================================
-        console.print(Rule("[bold white]📥 Cargando datos de Mediven[/bold white]"))
+        console.print(Rule("[bold white]📥 Mediven (compartido)[/bold white]"))
+        excluidos = []
+        with console.status("[cyan]Descargando inventario de Mediven…[/cyan]"):
+            mediven_data = get_mediven_inventory(registro_excluidos=excluidos)
+        console.print(f"[green]✔ Mediven OK:[/green] {len(mediven_data)} productos, {len(excluidos)} excluidos.")
+
+        # Sin --max-runtime el espía y la IA van antes (las tiendas usan lo que generan);
+        # con límite van después, junto a las tiendas, con el tiempo que sobre
+        previas = []
+        if skus_objetivo is None:
+            previas.append(etapa_espia())
+        if "ia" in etapas:
+            previas.append(etapa_ia(skus_objetivo))
+        if previas and not hay_presupuesto():
+            correr_etapas_con_tabla(previas, titulo="Espía e IA (compartidos)")
+            previas = []
+
+        # 🧠 Nombres limpios de todo el inventario: las tiendas los leen del caché
+        cargar_cache_nombres()
+        for item in mediven_data:
+            formatear_nombre_cacheado(item)
+        guardar_cache_nombres()
 
-        with console.status("[cyan]Conectando a Mediven…[/cyan]", spinner="dots"):
-            mediven_data = get_mediven_inventory()
+        archivo_mercado = os.path.join("data", "precios_mercado.json")
+        precios_mercado = {}
+        if os.path.exists(archivo_mercado):
+            with open(archivo_mercado, "r", encoding="utf-8") as f:
+                precios_mercado = json.load(f)
 
-        console.print(f"[green]✔ Mediven OK:[/green] {len(mediven_data)} productos.")
+        shutil.rmtree(DIR_ENTRADA, ignore_errors=True)
+        os.makedirs(DIR_ENTRADA)
+        guardar_parte(DIR_ENTRADA, "mediven", {"datos": mediven_data, "excluidos": excluidos})
+        guardar_parte(DIR_ENTRADA, "mercado", precios_mercado)
+        mediven_data = None
 
         # ======================================================
-        # 2) SHOPIFY
+        # CADA TIENDA EN SU PROCESO (su propio balde de Shopify)
         # ======================================================
-        console.print(Rule("[bold white]📦 Cargando productos desde Shopify[/bold white]"))
+        console.print(Rule("[bold white]🏬 Tiendas (en paralelo)[/bold white]"))
+        argumentos = list(sys.argv[2:])
+        for flag in ("--max-runtime", "--solo"):
+            if flag in argumentos:
+                i = argumentos.index(flag)
+                del argumentos[i:i + 2]
+        if hay_presupuesto():
+            # Todas terminan cuando terminaría esta corrida
+            argumentos += ["--max-runtime", f"{restante() + MARGEN_CIERRE:.0f}s"]
+        argumentos += ["--entrada", os.path.abspath(DIR_ENTRADA)]
+
+        for nombre in tiendas:
+            carpeta = preparar_carpeta(nombre)
+            with open(ruta_log(nombre), "w", encoding="utf-8") as log:
+                procesos[nombre] = (time.time(), subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), *argumentos],
+                    cwd=carpeta, env=entornos[nombre], stdout=log, stderr=subprocess.STDOUT,
+                ))
+            console.print(f"[cyan]🏬 {nombre}[/cyan] → {carpeta_tienda(nombre)} (log: {ruta_log(nombre)})")
+
+        if previas:
+            correr_etapas_con_tabla(previas, titulo="Espía e IA (compartidos, mientras corren las tiendas)")
+
+        duraciones = {}
+        with console.status("[cyan]Esperando a las tiendas…[/cyan]") as estado:
+            while len(duraciones) < len(procesos):
+                for nombre, (inicio, proceso) in procesos.items():
+                    if nombre not in duraciones and proceso.poll() is not None:
+                        duraciones[nombre] = time.time() - inicio
+                estado.update(
+                    f"[cyan]Tiendas en curso: {', '.join(n for n in procesos if n not in duraciones)}[/cyan]"
+                )
+                time.sleep(0.5)
+    finally:
+        for _, proceso in procesos.values():
+            if proceso.poll() is None:
+                proceso.terminate()
+        remove_lock(ruta_lock)
+
+    tabla = Table(title="🏬 Tiendas")
+    for col in ["Tienda", "Dominio", "Resultado", "Duración", "Log"]:
+        tabla.add_column(col, justify="right" if col == "Duración" else "left")
+    fallidas = []
+    for nombre, (_, proceso) in procesos.items():
+        if proceso.returncode:
+            fallidas.append(nombre)
+        tabla.add_row(
+            nombre, entornos[nombre].get("SHOP_DOMAIN") or "—",
+            "[green]✔ OK[/green]" if not proceso.returncode else f"[red]❌ código {proceso.returncode}[/red]",
+            format_time(duraciones[nombre]), ruta_log(nombre),
+        )
+    console.print(tabla)
+    console.print(Panel.fit(
+        f"{'🎉 [bold green]TIENDAS SINCRONIZADAS' if not fallidas else '⚠️ [bold yellow]TIENDAS CON ERRORES'}"
+        f"[/]: {len(procesos) - len(fallidas)}/{len(procesos)}"
+        + (f" (revisar el log de {', '.join(fallidas)})" if fallidas else "")
+        + f"\n🕒 Tiempo total: [cyan]{format_time(time.time() - start_time)}[/cyan]",
+        style="bold blue" if not fallidas else "yellow", title="FIN"
+    ))
+    if fallidas:
+        exit(1)
+
+# ==========================================================
+#  MODO DAEMON ("sync.py daemon")
+# ==========================================================
+ARCHIVO_MEMORIA = os.path.join("data", "memoria_precios.json")
+ARCHIVOS_ESTADO = [ARCHIVO_MEMORIA, ARCHIVO_HUELLAS, ARCHIVO_DECISIONES, ARCHIVO_AUSENCIAS]
+
+def cargar_estado_disco():
+    """Memoria / huellas / decisiones / ausencias tal como están en data/."""
+    memoria_precios = {}
+    if os.path.exists(ARCHIVO_MEMORIA):
+        with open(ARCHIVO_MEMORIA, "r", encoding="utf-8") as f:
+            memoria_precios = json.load(f)
+    return {
+        "memoria_precios": memoria_precios,
+        "huellas": cargar_huellas(),
+        "decisiones": cargar_decisiones(),
+        "historial_ausencias": cargar_historial_ausencias(),
+    }
+
+def ciclo_daemon(caliente, completo, ausencia_cada):
+    """
+    Un ciclo del daemon. caliente: lo que sobrevive entre ciclos
+    (catalogo, marca, df_shop, estado, firmas, ultima_ausencia).
+    completo: reconciliación (Shopify entero, Excel y etapas post-sync).
+    Retorna el resumen del ciclo para las métricas.
+    """
+    inicio_descarga = datetime.now(timezone.utc)
+    excluidos = []
+
+    def bajar_mediven(cancelar):
+        # Mediven no tiene delta: es un POST con todo (la sesión sí se reutiliza)
+        return get_mediven_inventory(registro_excluidos=excluidos, cancelar=cancelar, reusar_sesion=True)
+
+    def bajar_shopify(cancelar):
+        filtro = None if completo else marca_delta(caliente["marca"])
+        return list(iterar_productos_shopify(cancelar, filtro=filtro))
+
+    descargas = correr_en_paralelo({"Mediven": bajar_mediven, "Shopify": bajar_shopify})
+    if completo:
+        # Reconciliar también saca lo que se borró en Shopify (el delta no lo ve)
+        caliente["catalogo"] = {p["id"]: p for p in descargas["Shopify"]}
+        cambios = len(caliente["catalogo"])
+    else:
+        cambios = fusionar_catalogo(caliente["catalogo"], descargas["Shopify"])
+    caliente["marca"] = inicio_descarga
+
+    # 🔥 El DataFrame de Shopify se rearma solo si llegó algo nuevo
+    if cambios or caliente["df_shop"] is None:
+        caliente["df_shop"] = normalizar_df_shop(
+            pd.DataFrame(normalize_shopify_products(list(caliente["catalogo"].values())))
+        )
+    df_shop = caliente["df_shop"]
+
+    mediven_data = descargas["Mediven"]
+    df_med = pd.DataFrame(mediven_data, columns=None if mediven_data else ["Codigo"])
+    df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
+    skus_validos = set(df_med["Codigo"])
+    skus_excluidos = {e["SKU"]: e["Palabra_Excluida"] for e in excluidos if e["SKU"] not in skus_validos}
+    console.print(
+        f"[green]✔ Mediven:[/green] {len(mediven_data)} · [green]Shopify:[/green] "
+        f"{cambios} productos {'(completo)' if completo else 'cambiados'}, {len(caliente['catalogo'])} en memoria"
+    )
+
+    # 💾 Estado en memoria; se relee si otro proceso (o un commit del bot) lo cambió en disco
+    if caliente["estado"] is None or firmas_archivos(ARCHIVOS_ESTADO) != caliente["firmas"]:
+        caliente["estado"] = cargar_estado_disco()
+        console.print("[dim]💾 Estado leído desde data/[/dim]")
+    estado = caliente["estado"]
+
+    archivo_mercado = os.path.join("data", "precios_mercado.json")
+    precios_mercado = {}
+    if os.path.exists(archivo_mercado):
+        with open(archivo_mercado, "r", encoding="utf-8") as f:
+            precios_mercado = json.load(f)
+
+    crear, actualizar, archivar = construir_plan(
+        df_med, df_shop, skus_excluidos, precios_mercado, estado["memoria_precios"],
+        huellas=estado["huellas"], completo=completo, decisiones=estado["decisiones"]
+    )
+    guardar_cache_nombres()
+    priorizar_actualizar(actualizar)
+
+    # 🕰️ Una ausencia por AUSENCIA_CADA, no por ciclo: entre medio se difiere todo lo ausente
+    # (sobre una copia, sin sumar) y se archivan al tiro solo los excluidos
+    cuenta_ausencias = time.monotonic() - caliente["ultima_ausencia"] >= ausencia_cada
+    historial = estado["historial_ausencias"] if cuenta_ausencias else dict(estado["historial_ausencias"])
+    marcar_productos_vivos(archivar, df_shop, skus_validos)
+    archivar, archivo_diferido, _ = amortiguar_archivado(
+        archivar, historial, skus_validos, umbral=None if cuenta_ausencias else float("inf")
+    )
+
+    if completo:
+        generar_excel(crear, actualizar, archivar, mediven_data, excluidos, archivo_diferido)
+
+    impuestos = variantes_con_impuesto(df_shop)
+    plan = armar_plan(crear, actualizar, archivar, impuestos, estado)
+    resultado = aplicar_plan(plan)
+
+    # Lo guardado pasa a ser el estado en memoria (y sus firmas, para no releerlo). Es el de
+    # disco, no el del plan: lo diferido por el plazo o por --only quedó como estaba
+    caliente["estado"] = resultado["estado"]
+    caliente["firmas"] = firmas_archivos(ARCHIVOS_ESTADO)
+    if cuenta_ausencias:
+        caliente["ultima_ausencia"] = time.monotonic()
+
+    if completo:
+        # Impuestos ya fueron con aplicar_plan; el espía deja el mercado listo para los ciclos delta
+        etapas = set(ETAPAS_OBJETIVO) - {"impuestos"}
+        correr_etapas_con_tabla(armar_etapas_post(plan, df_shop, etapas, con_espia=True))
+
+    return {
+        "cambios_shopify": cambios,
+        "crear": len(crear),
+        "actualizar": len(actualizar),
+        "archivar": len([p for p in archivar if p.get("status_actual") != "archived"]),
+    }
+
+def main_daemon():
+    """python sync.py daemon [--intervalo 15m] [--puerto 8765]"""
+    intervalo = leer_duracion(valor_argumento("--intervalo", INTERVALO_DAEMON))
+    reconciliar_cada = leer_duracion(RECONCILIAR_CADA)
+    ausencia_cada = leer_duracion(AUSENCIA_CADA)
+    puerto = int(valor_argumento("--puerto", PUERTO_DAEMON))
+
+    # El primer ciclo siempre es completo: el catálogo parte en frío
+    pedidos = {"reconciliar": True, "detener": False}
+    despertador = threading.Event()
+
+    def pedir_reconciliacion():
+        pedidos["reconciliar"] = True
+        despertador.set()
+
+    def detener(*_):
+        # SIGTERM: termina el ciclo en curso (no deja escrituras a medias) y sale
+        pedidos["detener"] = True
+        despertador.set()
+
+    create_lock()
+    signal.signal(signal.SIGTERM, detener)
+    servidor = iniciar_servidor(pedir_reconciliacion, puerto)
+    ESTADO_DAEMON["intervalo"] = intervalo
+    console.print(Panel.fit(
+        f"🔁 [bold cyan]SYNC DAEMON[/bold cyan]: ciclo delta cada {format_time(intervalo)}, "
+        f"reconciliación cada {format_time(reconciliar_cada)}\n"
+        f"Salud: http://{servidor.server_address[0]}:{puerto}/salud · métricas: /metricas · "
+        f"reconciliar ahora: POST /reconciliar",
+        style="bold magenta"
+    ))
+
+    caliente = {
+        "catalogo": {}, "marca": None, "df_shop": None,
+        "estado": None, "firmas": None, "ultima_ausencia": float("-inf"),
+    }
+    ultima_reconciliacion = time.monotonic()
+    try:
+        while not pedidos["detener"]:
+            completo = pedidos["reconciliar"] or time.monotonic() - ultima_reconciliacion >= reconciliar_cada
+            pedidos["reconciliar"] = False
+            tipo = "reconciliacion" if completo else "delta"
+            console.print(Rule(f"[bold white]🔁 Ciclo {tipo} ({datetime.now():%H:%M:%S})[/bold white]"))
+
+            inicio = time.monotonic()
+            try:
+                resumen = ciclo_daemon(caliente, completo, ausencia_cada)
+                registrar_ciclo(tipo, time.monotonic() - inicio, resumen, productos_catalogo=len(caliente["catalogo"]))
+                if completo:
+                    ultima_reconciliacion = time.monotonic()
+                console.print(f"[cyan]⏲️ Ciclo {tipo}: {format_time(time.monotonic() - inicio)}[/cyan]")
+            except Exception as e:
+                # Lo que quedó en memoria puede estar a medias: se relee de disco en el próximo ciclo
+                caliente["estado"] = None
+                if completo:
+                    pedidos["reconciliar"] = True
+                registrar_ciclo(tipo, time.monotonic() - inicio, error=e, productos_catalogo=len(caliente["catalogo"]))
+                console.print(f"[bold red]❌ Ciclo {tipo} falló: {e}[/bold red]")
+
+            # Intervalo de inicio a inicio; /reconciliar o SIGTERM despiertan antes
+            despertador.wait(max(0.0, intervalo - (time.monotonic() - inicio)))
+            despertador.clear()
+    finally:
+        servidor.shutdown()
+        remove_lock()
+        console.print("[bold]👋 Daemon detenido.[/bold]")
+
+def editar_calientes(calientes):
+    """rapido --agregar SKUS / --quitar SKUS: los IDs de Shopify se buscan una sola vez, por SKU."""
+    try:
+        agregar = leer_skus(valor_argumento("--agregar")) if "--agregar" in sys.argv else set()
+        quitar = leer_skus(valor_argumento("--quitar")) if "--quitar" in sys.argv else set()
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        exit(1)
+
+    quitados = [sku for sku in quitar if calientes.pop(sku, None)]
+    nuevos = agregar - set(calientes)
+    faltan = set()
+    if nuevos:
+        faltan = nuevos - registrar_ids(calientes, get_shopify_products_por_sku(nuevos), nuevos)
+    guardar_calientes(calientes)
+
+    if faltan:
+        console.print(
+            f"[yellow]⚠️ {len(faltan)} SKUs no están en Shopify y no se agregaron: "
+            f"{', '.join(sorted(faltan)[:10])}[/yellow]"
+        )
+    console.print(
+        f"[green]⚡ SKUs calientes: {len(calientes)} "
+        f"(+{len(nuevos) - len(faltan)} / -{len(quitados)})[/green]"
+    )
+
+# ==========================================================
+#  FLUJO PRINCIPAL — ULTRA PRO
+# ==========================================================
+def main():
 
-        with console.status("[cyan]Descargando datos de Shopify…[/cyan]", spinner="earth"):
-            shopify_products = get_shopify_products()
+    # 🔮 Solo previsualizar un cambio de reglas de precio (no toca Shopify)
+    if "--preview-reglas" in sys.argv:
+        preview_reglas.main()
+        return
 
-        console.print(f"[green]✔ Shopify OK:[/green] {len(shopify_products)} productos cargados.")
+    # 🎯 Corrida dirigida: solo estos SKUs y/o estas etapas
+    try:
+        skus_objetivo = leer_skus(valor_argumento("--skus")) if "--skus" in sys.argv else None
+        etapas = leer_etapas(valor_argumento("--only"))
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        exit(1)
+
+    # ⚡ Carril rápido: solo los SKUs calientes, solo precios, Shopify leído por ID
+    calientes = None
+    if COMANDO == "rapido":
+        calientes = cargar_calientes()
+        if "--agregar" in sys.argv or "--quitar" in sys.argv:
+            editar_calientes(calientes)
+            return
+        if not calientes:
+            console.print(
+                "[yellow]⚠️ No hay SKUs calientes. Agregar con: "
+                "python sync.py rapido --agregar 7801234,7805678 (o @lista.txt)[/yellow]"
+            )
+            return
+        skus_objetivo = set(calientes)
+        etapas = {"precios"}
+        ids_guardados = json.dumps(calientes, sort_keys=True)
+
+    # 🎞️ Reproducir una corrida guardada (--replay [snapshot]): plan + Excel sin red
+    replay, meta_replay = None, None
+    if "--replay" in sys.argv:
+        try:
+            replay, meta_replay = resolver_snapshot(valor_argumento("--replay"))
+        except (OSError, ValueError) as e:
+            console.print(f"[bold red]❌ {e}[/bold red]")
+            exit(1)
+
+    # 🏬 Tienda lanzada por "sync.py tiendas": Mediven y mercado vienen ya calculados
+    entrada = valor_argumento("--entrada")
+    if entrada and not os.path.isdir(entrada):
+        console.print(f"[bold red]❌ --entrada: no existe {entrada}[/bold red]")
+        exit(1)
+
+    # ⏱️ Límite global de la corrida (--max-runtime 90m): el núcleo va primero
+    max_runtime = valor_argumento("--max-runtime")
+    iniciar_presupuesto(leer_duracion(max_runtime) if max_runtime else None)
+
+    # 📦 Aplicar un plan ya guardado (sin bajar Mediven ni Shopify)
+    if COMANDO == "apply":
+        main_apply()
+        return
+
+    # 🧵 Aplicar un plan guardado con varios procesos (cola de shards)
+    if COMANDO == "coordinar":
+        main_coordinar()
+        return
+    if COMANDO == "worker":
+        main_worker()
+        return
+
+    # 🏬 Un Mediven para varias tiendas (cada una en su proceso)
+    if COMANDO == "tiendas":
+        main_tiendas(skus_objetivo, etapas)
+        return
+
+    # 🔁 Proceso permanente con catálogo y estado en memoria
+    if COMANDO == "daemon":
+        main_daemon()
+        return
+
+    # 🕒 TIMER
+    start_time = time.time()
 
-        # DataFrame creation
-        df_med = pd.DataFrame(mediven_data)
-        df_shop = pd.DataFrame(normalize_shopify_products(shopify_products))
+    if skus_objetivo is None:
+        console.print(Panel.fit("🚀 [bold cyan]SINCRONIZACIÓN COMPLETA (AUTO)[/bold cyan]", style="bold magenta"))
+    elif calientes is not None:
+        console.print(Panel.fit(
+            f"⚡ [bold cyan]CARRIL RÁPIDO[/bold cyan]: {len(skus_objetivo)} SKUs calientes\n"
+            f"Shopify por ID (nodes), solo precios, sin Excel ni etapas post-sync", style="bold magenta"
+        ))
+    else:
+        console.print(Panel.fit(
+            f"🎯 [bold cyan]SINCRONIZACIÓN DIRIGIDA[/bold cyan]: {len(skus_objetivo)} SKUs\n"
+            f"Etapas: {', '.join(e for e in ETAPAS_OBJETIVO if e in etapas)}", style="bold magenta"
+        ))
+    if replay:
+        console.print(Panel.fit(
+            f"🎞️ [bold cyan]REPLAY SIN RED[/bold cyan]: {replay} ({meta_replay['creado']})\n"
+            f"Planifica y genera el Excel con el snapshot; no toca Shopify ni guarda memoria.",
+            style="cyan"
+        ))
+    else:
+        if entrada:
+            console.print(Panel.fit(
+                f"🏬 [bold cyan]TIENDA {os.getenv('SYNC_TIENDA', '?')}[/bold cyan] ({os.getenv('SHOP_DOMAIN')})\n"
+                f"Mediven, mercado e IA compartidos: {entrada}", style="cyan"
+            ))
+        # El replay no escribe en Shopify: puede correr junto a una sincronización real
+        create_lock()
+    streaming = MODO_STREAMING and skus_objetivo is None
+    dir_corridas = None
+    # 🎞️ Lo que baja de la red queda en snapshots/ (las dirigidas no: traen solo unos SKUs)
+    # (las tiendas de "sync.py tiendas" tampoco: Mediven y mercado ya quedaron en la entrada)
+    snapshot = (
+        abrir_snapshot() if SNAPSHOTS_ACTIVOS and replay is None and entrada is None and skus_objetivo is None else None
+    )
 
-        if not df_shop.empty:
-            df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
-            # Aseguramos que la columna bodyHtml no tenga nulos para evitar errores
-            if "bodyHtml" in df_shop.columns:
-                df_shop["bodyHtml"] = df_shop["bodyHtml"].fillna("")
-            else:
-                df_shop["bodyHtml"] = ""
+    try:
+        # 🧠 Caché de títulos limpios (evita recalcular nombres que no cambiaron)
+        cargar_cache_nombres()
+
+        # ======================================================
+        # 1) + 2) MEDIVEN Y SHOPIFY (EN PARALELO)
+        # ======================================================
+        if replay:
+            console.print(Rule("[bold white]🎞️ Cargando Mediven y Shopify desde el snapshot[/bold white]"))
+        else:
+            console.print(Rule("[bold white]📥 Cargando Mediven y Shopify (en paralelo)[/bold white]"))
+
+        excluidos = []
+        filas_shop = {}
+        perdidos_calientes = set()
+        # El espía va antes del plan (lo alimenta); con --max-runtime va después del núcleo
+        espia_en_descarga = skus_objetivo is None and not hay_presupuesto() and replay is None and entrada is None
+        if streaming:
+            dir_corridas = tempfile.mkdtemp(prefix="sync_corridas_")
+
+        with Progress(
+            SpinnerColumn(), TextColumn("{task.description}"), BarColumn(),
+            TextColumn("{task.fields[detalle]}"), TimeElapsedColumn(), console=console
+        ) as barras:
+            tarea_med = barras.add_task("Mediven", total=4, detalle="")
+            tarea_shop = barras.add_task("Shopify", total=None, detalle="")
+
+            def avance(tarea):
+                def _avance(hechos, total, detalle):
+                    barras.update(tarea, completed=hechos, total=total, detalle=detalle)
+                return _avance
+
+            def bajar_mediven(cancelar):
+                if replay or entrada:
+                    guardado = cargar_parte(replay or entrada, "mediven")
+                    excluidos.extend(guardado["excluidos"])
+                    barras.update(tarea_med, completed=4, detalle="snapshot" if replay else "compartido")
+                    return guardado["datos"]
+                datos = get_mediven_inventory(
+                    registro_excluidos=excluidos, cancelar=cancelar, progreso=avance(tarea_med)
+                )
+                if snapshot:
+                    guardar_parte(snapshot, "mediven", {"datos": datos, "excluidos": excluidos})
+                if espia_en_descarga:
+                    # 🔥 MINI-ESPÍA: solo necesita mediven_full.json → corre mientras Shopify sigue bajando
+                    barras.update(tarea_med, detalle="🔍 Mini-Espía de precios…")
+                    try:
+                        con_recurso(
+                            RECURSO_MERCADO, "Mini-Espía", lambda: repesca_precios.ejecutar_repesca_diaria(cancelar=cancelar)
+                        )()
+                    except Exception as e:
+                        console.print(f"[bold red]❌ Error en el Mini-Espía de precios: {e}[/bold red]")
+                    barras.update(tarea_med, detalle=f"{len(datos)} productos + espía")
+                return datos
+
+            def bajar_shopify(cancelar):
+                if replay:
+                    productos = iterar_productos_snapshot(replay)
+                    if skus_objetivo is not None:
+                        productos = (
+                            p for p in productos
+                            if any(str(v.get("sku") or "").strip() in skus_objetivo for v in p["variants"])
+                        )
+                elif calientes is not None:
+                    productos, perdidos = leer_calientes_shopify(calientes, cancelar, avance(tarea_shop))
+                    perdidos_calientes.update(perdidos)
+                    return productos
+                elif skus_objetivo is not None:
+                    # Trae los productos enteros: las variantes hermanas se dejan fuera del plan (recortar_filas)
+                    return get_shopify_products_por_sku(skus_objetivo, cancelar, avance(tarea_shop))
+                else:
+                    productos = iterar_productos_shopify(cancelar, avance(tarea_shop))
+                    if snapshot:
+                        # Cada página se escribe al snapshot a medida que llega
+                        productos = volcar_productos(snapshot, productos)
+                if streaming:
+                    # Shopify se consume página a página directo a corridas en disco
+                    return volcar_shopify(iterar_filas_shopify(productos), dir_corridas, resumen=filas_shop)
+                return list(productos)
+
+            # Mediven (login + POST + filtro) corre mientras bajan las páginas de Shopify;
+            # si uno falla, el otro se corta en su siguiente página / paso
+            descargas = correr_en_paralelo({"Mediven": bajar_mediven, "Shopify": bajar_shopify})
+
+        if calientes is not None:
+            # Si algún ID se corrigió (búsqueda por SKU), la próxima vez ya va directo
+            if json.dumps(calientes, sort_keys=True) != ids_guardados:
+                guardar_calientes(calientes)
+            if perdidos_calientes:
+                console.print(
+                    f"[yellow]⚠️ {len(perdidos_calientes)} SKUs calientes ya no están en Shopify "
+                    f"(quitar con --quitar): {', '.join(sorted(perdidos_calientes)[:10])}[/yellow]"
+                )
+
+        mediven_data = descargas["Mediven"]
+        total_mediven = len(mediven_data)
+        console.print(f"[green]✔ Mediven OK:[/green] {len(mediven_data)} productos.")
+        skus_validos = {str(item.get("Codigo", "")).strip() for item in mediven_data}
+
+        if skus_objetivo is not None:
+            # Mediven no tiene consulta por SKU: se baja el inventario (un POST) y se filtra aquí
+            mediven_data = [item for item in mediven_data if str(item.get("Codigo", "")).strip() in skus_objetivo]
+            excluidos = [e for e in excluidos if e["SKU"] in skus_objetivo]
+            console.print(f"[cyan]🎯 En Mediven: {len(mediven_data)} de {len(skus_objetivo)} SKUs pedidos.[/cyan]")
+
+        if streaming:
+            # Ambos lados van a disco ordenados por SKU
+            corridas_shop = descargas["Shopify"]
+            corridas_med = volcar_mediven(mediven_data, dir_corridas)
+            mediven_data = None  # ya quedó en disco
+
+            console.print(
+                f"[green]✔ Shopify OK:[/green] {len(filas_shop['sku'])} variantes en "
+                f"{len(corridas_med) + len(corridas_shop)} corridas ordenadas."
+            )
+            # Sin bodyHtml completo: las etapas 7/8 solo lo usan para saber si está vacío
+            df_shop = pd.DataFrame(filas_shop)
         else:
-            df_shop["sku"] = pd.Series(dtype=str)
-            df_shop["bodyHtml"] = pd.Series(dtype=str)
+            shopify_products = descargas["Shopify"]
+            console.print(f"[green]✔ Shopify OK:[/green] {len(shopify_products)} productos cargados.")
+
+            # DataFrame creation
+            df_med = pd.DataFrame(mediven_data, columns=None if mediven_data else ["Codigo"])
+            df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
+            df_shop = pd.DataFrame(normalize_shopify_products(shopify_products))
+
+        normalizar_df_shop(df_shop)
 
-        df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
+        if skus_objetivo is not None:
+            no_encontrados = skus_objetivo - skus_validos - set(df_shop["sku"]) - {e["SKU"] for e in excluidos}
+            if no_encontrados:
+                console.print(
+                    f"[yellow]⚠️ {len(no_encontrados)} SKUs no están ni en Mediven ni en Shopify: "
+                    f"{', '.join(sorted(no_encontrados)[:10])}[/yellow]"
+                )
 
         # ======================================================
         # 3) DETECCIÓN DE EXCLUIDOS (VET, CLONAZEPAM, ETC.)
         # ======================================================
         console.print(Rule("[yellow]🐾 Detectando productos excluidos[/yellow]"))
 
-        # LISTA MAESTRA DE EXCLUSIÓN
-        palabras_vet = [
-            "perro", "perros",
-            "gato", "gatos",
-            "mascota", "veterinaria",
-            "mundo animal",
-            "clonazepam",
-            "veterquimica"
-        ]
-
-        def es_excluido(row):
-            txt = " ".join([
-                str(row.get(c, "")).lower()
-                for c in ["Descripcion", "Laboratorio", "AccionTerapeutica"]
-            ])
-            return any(p in txt for p in palabras_vet)
-
-        df_med["EsExcluido"] = df_med.apply(es_excluido, axis=1)
-        
-        # Obtenemos los SKUs que Mediven tiene pero que NOSOTROS prohibimos
-        skus_excluidos = set(df_med[df_med["EsExcluido"]]["Codigo"])
+        # La detección ya se hizo en get_mediven_inventory (una sola pasada con
+        # la lista maestra de sync_exclusiones); aquí solo armamos el índice.
+        # (si un SKU duplicado tiene otra fila limpia, esa fila manda, como antes)
+        skus_excluidos = {
+            e["SKU"]: e["Palabra_Excluida"] for e in excluidos if e["SKU"] not in skus_validos
+        }
 
         console.print(f"[yellow]🐾 Productos detectados para exclusión:[/yellow] {len(skus_excluidos)}")
 
@@ -151,19 +1457,34 @@ def main():
         # ======================================================
         console.print(Rule("[bold magenta]📊 Generando diagnóstico y Precios[/bold magenta]"))
 
-        # 🔥 CORRER MINI-ESPÍA ANTES DE LEER LA MEMORIA
-        try:
-            repesca_precios.ejecutar_repesca_diaria()
-        except Exception as e:
-            console.print(f"[bold red]❌ Error en el Mini-Espía de precios: {e}[/bold red]")
+        # 🔥 EL MINI-ESPÍA YA CORRIÓ JUNTO A LA DESCARGA DE SHOPIFY (antes de leer la memoria)
+        # (con --max-runtime va después del núcleo, con el tiempo que sobre)
+        if entrada:
+            console.print("[cyan]🏬 El Mini-Espía corrió una vez para todas las tiendas.[/cyan]")
+        elif skus_objetivo is not None:
+            console.print("[cyan]🎯 Corrida dirigida: sin Mini-Espía (se usan los precios de mercado guardados).[/cyan]")
+        elif hay_presupuesto():
+            console.print("[cyan]⏱️ --max-runtime: el Mini-Espía corre después de aplicar los cambios.[/cyan]")
 
         # 🧠 CARGAMOS LA INTELIGENCIA DE MERCADO (AHORA SÍ, ACTUALIZADA)
         archivo_mercado = os.path.join("data", "precios_mercado.json")
         precios_mercado = {}
-        if os.path.exists(archivo_mercado):
+        if replay or entrada:
+            precios_mercado = cargar_parte(replay or entrada, "mercado")
+        elif os.path.exists(archivo_mercado):
             with open(archivo_mercado, "r", encoding="utf-8") as f:
                 precios_mercado = json.load(f)
 
+        if snapshot:
+            guardar_parte(snapshot, "mercado", precios_mercado)
+            snapshot = cerrar_snapshot(snapshot, {
+                "mediven": total_mediven,
+                "excluidos": len(excluidos),
+                "variantes_shopify": len(df_shop),
+                "mercado": len(precios_mercado),
+            })
+            console.print(f"[dim]🎞️ Snapshot guardado: {snapshot} (repetir con --replay {snapshot})[/dim]")
+
         # 🛑 CARGAMOS LA MEMORIA DE PRECIOS (Anti-Sobrescritura manual)
         archivo_memoria = os.path.join("data", "memoria_precios.json")
         memoria_precios = {}
@@ -171,233 +1492,160 @@ def main():
             with open(archivo_memoria, "r", encoding="utf-8") as f:
                 memoria_precios = json.load(f)
 
-        crear = []
-        actualizar = []
-        archivar = []
-
-        skus_med = set(df_med["Codigo"])
-
-        # Mapeo de Shopify por SKU
-        shop_by_sku = {}
-        for _, row in df_shop.iterrows():
-            sku = row["sku"]
-            if sku and sku not in shop_by_sku:
-                shop_by_sku[sku] = row
-
-        # --- LÓGICA CREAR / ACTUALIZAR ---
-        for _, row in df_med.iterrows():
-            sku = row["Codigo"]
-            
-            # Si el producto es excluido (clonazepam, vet), NO lo creamos ni actualizamos
-            if sku in skus_excluidos:
-                continue
-
-            precio_med = float(row.get("Precio", 0) or 0)
-            
-            # 🛡️ Aplicamos la Inteligencia Financiera
-            if precio_med <= 0:
-                nuevo_precio = 0
-            else:
-                datos_sku = precios_mercado.get(sku)
-                nuevo_precio, estrategia = calcular_precio_final(precio_med, datos_sku)
-
-            if sku in shop_by_sku:
-                shop_row = shop_by_sku[sku]
-                precio_actual = float(shop_row["price"] or 0)
-                nombre_actual_shopify = str(shop_row.get("product_title", ""))
-                estado_actual_shopify = str(shop_row.get("status", "")).lower()
-
-                # 🛡️ PROTECCIÓN ANTI-SOBRESCRITURA MANUAL
-                ultimo_precio_robot = memoria_precios.get(sku)
-                if ultimo_precio_robot is not None and abs(precio_actual - ultimo_precio_robot) > 1:
-                    # Si Shopify tiene un precio distinto al que dejó el robot, un humano lo cambió.
-                    nuevo_precio = precio_actual # Respetamos a Shopify (no sobreescribimos)
-                
-                # Generamos el nombre limpio para comparar
-                from modulos.nucleo.sync_diagnostico import formatear_nombre_producto
-                nom_gen = formatear_nombre_producto(row)
-
-                # COMPARAR PRECIO, NOMBRE Y ESTADO
-                c_pre = abs(precio_actual - nuevo_precio) >= 1
-                c_nom = nom_gen != nombre_actual_shopify
-                c_status = estado_actual_shopify != "active"
-
-                if c_pre or c_nom or c_status:
-                    actualizar.append({
-                        "SKU": sku,
-                        "Descripcion": nom_gen,
-                        "Precio_Shopify": precio_actual,
-                        "Nuevo_Precio": nuevo_precio,
-                        "variant_id": shop_row["variant_id"],
-                        "product_id": shop_row["product_id"],
-                        "actualizar_basicos": c_nom or c_status # Flag para actualizar nombre/estado
-                    })
-                
-                # Refrescamos la memoria con el precio que decidimos que debe tener
-                memoria_precios[sku] = nuevo_precio
-            else:
-                crear.append({
-                    "SKU": sku,
-                    "Descripcion": row.get("Descripcion", ""),
-                    "Precio": nuevo_precio,
-                    "Stock": 100,
-                })
-                # Guardamos la decisión del robot
-                memoria_precios[sku] = nuevo_precio
-
-        # --- LÓGICA ARCHIVAR (ELIMINAR) ---
-        for _, row in df_shop.iterrows():
-            sku = row["sku"]
-            if not sku:
-                continue
-            
-            # ELIMINAR SI:
-            # 1. El SKU está en la lista de excluidos (ej: clonazepam existe en mediven, pero lo prohibimos).
-            # 2. El SKU NO existe en Mediven.
-            
-            es_prohibido = sku in skus_excluidos
-            no_existe_mediven = sku not in skus_med
-
-            if es_prohibido or no_existe_mediven:
-                motivo = "Excluido/Prohibido" if es_prohibido else "No existe en Mediven"
-                archivar.append({
-                    "SKU": sku,
-                    "product_id": row["product_id"],
-                    "Descripcion": row.get("product_title", ""),
-                    "Motivo": motivo,
-                    "status_actual": str(row.get("status", "active")).lower() 
-                })
+        # 🧮 PLAN VECTORIZADO (un solo merge por SKU en vez de iterrows)
+        # 🧬 HUELLAS POR SKU (solo se re-evalúa lo que cambió; --full para todo)
+        huellas = None
+        decisiones = None
+        if streaming:
+            crear, actualizar, archivar = construir_plan_streaming(
+                corridas_med, corridas_shop, skus_excluidos, precios_mercado, memoria_precios
+            )
+        else:
+            huellas = cargar_huellas()
+            decisiones = cargar_decisiones()
+            if skus_objetivo is not None:
+                # Lo pedido se evalúa siempre (para eso se pidió), sin mirar las huellas
+                huellas = recortar_a_skus(huellas, skus_objetivo)
+                decisiones = recortar_a_skus(decisiones, skus_objetivo)
+            crear, actualizar, archivar = construir_plan(
+                df_med, df_shop, skus_excluidos, precios_mercado, memoria_precios,
+                huellas=huellas, completo=MODO_COMPLETO or skus_objetivo is not None, decisiones=decisiones
+            )
+
+        guardar_cache_nombres()
+
+        # 🎯 PRIORIDAD: precios bajo el costo primero, después por impacto (Δ precio × riesgo de margen)
+        priorizar_actualizar(actualizar)
+        bajo_costo = [p for p in actualizar if p["Bajo_Costo"]]
+
+        # 🕰️ AMORTIGUADOR: lo que falta en Mediven se archiva recién tras N corridas seguidas
+        historial_ausencias = cargar_historial_ausencias()
+        if skus_objetivo is not None:
+            historial_ausencias = recortar_a_skus(historial_ausencias, skus_objetivo)
+            archivar = recortar_filas(archivar, skus_objetivo)
+        # (dirigida: skus_validos y df_shop traen todo Mediven y las variantes hermanas)
+        marcar_productos_vivos(archivar, df_shop, skus_validos)
+        archivar, archivo_diferido, resumen_ausencias = amortiguar_archivado(
+            archivar, historial_ausencias, skus_validos
+        )
 
         # Cálculos para el log transparente
         ya_archivados = len([p for p in archivar if p.get("status_actual") == "archived"])
         nuevos_por_archivar = len([p for p in archivar if p.get("status_actual") != "archived"])
 
+        # 🧭 ESTRATEGIA DE ESCRITURA: costo y tiempo por ruta (por producto / alias / bulk)
+        # (en replay, el balde que había cuando se guardó el snapshot)
+        throttle = (meta_replay["throttle"] or dict(THROTTLE_POR_DEFECTO)) if replay else leer_throttle()
+        estrategia = planificar_estrategia(filas_de_etapas(crear, actualizar, archivar, etapas), throttle)
+        total_estimado = totales_estrategia(estrategia, throttle, APLICAR_EN_PARALELO)
+
         # Panel de diagnóstico mejorado
         console.print(
             Panel.fit(
                 f"[bold green]CREAR:[/bold green] {len(crear)}\n"
                 f"[bold yellow]ACTUALIZAR:[/bold yellow] {len(actualizar)}\n"
+                f"[bold red]PRECIO BAJO COSTO (van primero):[/bold red] {len(bajo_costo)}\n"
                 f"[bold red]ARCHIVAR (Nuevos):[/bold red] {nuevos_por_archivar}\n"
-                f"[bold white]YA ARCHIVADOS:[/bold white] {ya_archivados}",
+                f"[bold white]YA ARCHIVADOS:[/bold white] {ya_archivados}\n"
+                f"[bold cyan]ARCHIVO DIFERIDO:[/bold cyan] {resumen_ausencias['diferidos']} "
+                f"(faltan < {AUSENCIAS_PARA_ARCHIVAR} corridas seguidas)\n"
+                f"[bold cyan]VOLVIERON A TIEMPO:[/bold cyan] {resumen_ausencias['volvieron']} "
+                f"(mutaciones evitadas: {resumen_ausencias['mutaciones_evitadas']})\n"
+                f"[bold blue]APLICAR (estimado):[/bold blue] ~{total_estimado['segundos'] / 60:.1f} min · "
+                f"{total_estimado['requests']} requests · {total_estimado['costo']:,.0f} pts "
+                f"(balde {throttle['disponible']:,.0f}/{throttle['maximo']:,.0f}, recarga {throttle['recarga']:,.0f}/s)",
                 title="📊 DIAGNÓSTICO DETALLADO",
                 style="magenta"
             )
         )
 
+        if estrategia:
+            tabla = Table(title="🧭 Estrategia de escritura (tiempo estimado por ruta)")
+            for col in ["Paso", "Filas", "Por producto", "Alias x50", "Bulk", "Elegida"]:
+                tabla.add_column(col, justify="left" if col in ("Paso", "Elegida") else "right")
+            for paso, info in estrategia.items():
+                celdas = [
+                    f"{info['opciones'][r]['segundos']:,.0f}s" if r in info["opciones"] else "—"
+                    for r in ("por_producto", "alias", "bulk")
+                ]
+                tabla.add_row(paso, str(info["filas"]), *celdas, f"[bold]{info['elegida']}[/bold]")
+            console.print(tabla)
+
         # ======================================================
         # 5) EXCEL
         # ======================================================
-        console.print(Rule("[bold white]📄 Generando Excel[/bold white]"))
+        # (el carril rápido corre cada pocos minutos: Excel solo si se pidió --dry-run)
+        if calientes is None or "--dry-run" in sys.argv:
+            console.print(Rule("[bold white]📄 Generando Excel[/bold white]"))
 
-        with console.status("[cyan]Generando archivo Excel…[/cyan]", spinner="aesthetic"):
-            generar_excel(crear, actualizar, archivar, mediven_data)
+            with console.status("[cyan]Generando archivo Excel…[/cyan]", spinner="aesthetic"):
+                generar_excel(crear, actualizar, archivar, mediven_data, excluidos, archivo_diferido)
 
-        console.print("[green]✔ Excel generado.[/green]")
+            console.print("[green]✔ Excel generado.[/green]")
 
         # ======================================================
         # 5.5) MODO DRY-RUN (REPORTE SEGURO)
         # ======================================================
+        if replay:
+            console.print(Panel.fit(
+                f"[bold yellow]🎞️ REPLAY TERMINADO en {format_time(time.time() - start_time)}\n"
+                f"Revisa la carpeta 'reportes' para ver el Excel. No se tocó Shopify ni la memoria.[/bold yellow]"
+            ))
+            return
         if "--dry-run" in sys.argv:
             console.print(Panel.fit("[bold yellow]🛑 MODO REPORTE ACTIVO (--dry-run)\nRevisa la carpeta 'reportes' para ver el Excel con los cambios de precio.\nEl script se detendrá aquí sin tocar Shopify ni guardar memoria.[/bold yellow]"))
             return
 
         # ======================================================
-        # 6) APLICAR CAMBIOS
+        # 5.6) PLAN SERIALIZADO
         # ======================================================
-        console.print(Rule("[bold cyan]⚙️ Aplicando cambios en Shopify[/bold cyan]"))
-
-        # ARCHIVAR (ELIMINAR)
-        if archivar:
-            if DELETE_MISSING:
-                with console.status("[red]Procesando productos para archivar…[/red]"):
-                    archive_products_graphql(archivar)
-            else:
-                console.print("[yellow]ℹ DELETE_MISSING=false — no se eliminarán productos (aunque sean excluidos).[/yellow]")
-
-        # ACTUALIZAR BÁSICOS (TÍTULO Y REACTIVAR ESTADO)
-        prods_basicos_nuevo = [p for p in actualizar if p.get("actualizar_basicos")]
-        if prods_basicos_nuevo:
-            with console.status("[yellow]Actualizando nombres y reactivando estado…[/yellow]"):
-                 bulk_update_product_basics(prods_basicos_nuevo)
-
-        # ACTUALIZAR PRECIOS
-        if actualizar:
-            with console.status("[yellow]Actualizando variantes (precios)…[/yellow]"):
-                graphql_bulk_update_variants(actualizar)
-
-        # CREAR
-        if crear:
-            with console.status("[green]Creando productos nuevos…[/green]"):
-                crear_productos_graphql_turbo(crear)
-
-        console.print("[bold green]✔ Cambios aplicados correctamente[/bold green]")
+        if skus_objetivo is not None:
+            memoria_precios = recortar_a_skus(memoria_precios, skus_objetivo)
+        estado = {"memoria_precios": memoria_precios, "historial_ausencias": historial_ausencias}
+        if huellas is not None:
+            estado["huellas"] = huellas
+            estado["decisiones"] = decisiones
+        # Dirigida: las variantes hermanas que trajo la consulta por producto no se tocan
+        impuestos = variantes_con_impuesto(df_shop if skus_objetivo is None else df_shop[df_shop["sku"].isin(skus_objetivo)])
+        plan = armar_plan(
+            crear, actualizar, archivar, impuestos, estado,
+            skus=skus_objetivo, etapas=etapas if etapas != set(ETAPAS_OBJETIVO) else None
+        )
 
-        # 💾 GUARDAMOS LA MEMORIA SOLO SI SUBIMOS A SHOPIFY
-        os.makedirs("data", exist_ok=True)
-        with open(archivo_memoria, "w", encoding="utf-8") as f:
-            json.dump(memoria_precios, f, indent=2)
-            
-        # ======================================================
-        # 7) REMOVE TAX (Ultra Optimizado)
-        # ======================================================
-        console.print(Rule("[bold magenta]🔥 ELIMINANDO IMPUESTOS (POST-SYNC)[/bold magenta]"))
-        
-        # Filtramos directamente del dataframe que ya tenemos en memoria
-        variantes_con_tax = df_shop[df_shop["taxable"] == True].to_dict('records')
-        
-        if variantes_con_tax:
-            with console.status(f"[red]Quitando impuestos a {len(variantes_con_tax)} variantes...[/red]"):
-                quitar_impuestos_graphql(variantes_con_tax)
-            console.print(f"[bold green]✔ Impuestos eliminados en {len(variantes_con_tax)} variantes[/bold green]")
-        else:
-            console.print("[green]✔ No hay variantes con impuesto. Nada que hacer.[/green]")
+        if COMANDO == "plan":
+            ruta_plan = guardar_plan(plan, valor_argumento("--out"))
+            console.print(Panel.fit(
+                f"[bold green]📦 Plan guardado:[/bold green] {ruta_plan}\n"
+                f"[bold]Hash:[/bold] {plan['hash'][:12]}\n"
+                f"Aplicar con: [cyan]python sync.py apply {ruta_plan} [--shard i/N][/cyan]",
+                style="green"
+            ))
+            return
 
         # ======================================================
-        # 8) MOTOR DE IA (NUEVO)
+        # 6) APLICAR CAMBIOS
         # ======================================================
-        console.print(Rule("[bold magenta]🧠 VERIFICANDO CONTENIDO FALTANTE (IA)[/bold magenta]"))
-        
-        try:
-            crear_diccionario_ia.main()
-        except Exception as e:
-            console.print(f"[bold red]❌ Error en el módulo de IA: {e}[/bold red]")
+        aplicar_plan(plan, hasta=plazo_nucleo(), con_impuestos=False)
 
         # ======================================================
-        # 8.1) MOTOR DE IMÁGENES (SERPER)
+        # 7) a 8.5) ETAPAS POST-SYNC
         # ======================================================
-        console.print(Rule("[bold magenta]📸 VERIFICANDO IMÁGENES Y REPESCA[/bold magenta]"))
-        
-        # 🔥 MAGIA MEJORADA: Solo buscamos fotos para productos ACTIVOS
-        skus_sin_foto = df_shop[(df_shop['has_image'] == False) & (df_shop['status'] == 'active')]['sku'].dropna().astype(str).tolist()
-        
-        if skus_sin_foto:
-            console.print(f"[bold yellow]⚠️ Alerta Visual: Se detectaron {len(skus_sin_foto)} productos ACTIVOS sin foto. Forzando búsqueda...[/bold yellow]")
+        # (con --max-runtime el Mini-Espía va aquí, con el tiempo que sobre)
+        # (las tiendas no corren espía ni IA: los corre una vez "sync.py tiendas")
+        etapas_post = armar_etapas_post(
+            plan, df_shop, etapas - {"ia"} if entrada else etapas, skus_objetivo,
+            con_espia=hay_presupuesto() and skus_objetivo is None and entrada is None
+        )
 
-        try:
-            sync_imagenes_auto.ejecutar_repesca_imagenes(df_shop, skus_forzados=skus_sin_foto)
-        except Exception as e:
-            console.print(f"[bold red]❌ Error en el módulo de Imágenes: {e}[/bold red]")
-
-        # ======================================================
-        # 8.5) ACTUALIZAR SHOPIFY (El paso final)
-        # ======================================================
-        console.print(Rule("[bold cyan]🎨 ACTUALIZANDO PESTAÑAS EN SHOPIFY[/bold cyan]"))
-        
-        # 🔥 MAGIA MEJORADA: Solo inyectamos SEO a productos ACTIVOS
-        skus_vacios = df_shop[(df_shop['bodyHtml'] == '') & (df_shop['status'] == 'active')]['sku'].dropna().astype(str).tolist()
-        
-        if skus_vacios:
-            console.print(f"[bold yellow]⚠️ Alerta SEO: Se detectaron {len(skus_vacios)} productos ACTIVOS sin descripción. Forzando inyección...[/bold yellow]")
-            
-        try:
-            subir_a_shopify.main(skus_forzados=skus_vacios)
-        except Exception as e:
-            console.print(f"[bold red]❌ Error actualizando Shopify: {e}[/bold red]")
+        if etapas_post:
+            console.print(Rule("[bold magenta]🧩 ETAPAS POST-SYNC (en paralelo según dependencias)[/bold magenta]"))
+            correr_etapas_con_tabla(etapas_post)
 
         # ======================================================
         # 9) FIN + TIMER
         # ======================================================
         total_time = time.time() - start_time
+        reportar_diferidos()
 
         console.print(
             Panel.fit(
@@ -409,7 +1657,11 @@ def main():
         )
 
     finally:
-        remove_lock()
+        if dir_corridas:
+            shutil.rmtree(dir_corridas, ignore_errors=True)
+        descartar_snapshot(snapshot)
+        if not replay:
+            remove_lock()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,12 @@
+import pytest
+
+from modulos.utilidades.medir_arranque import PUNTOS_DE_ENTRADA, HOLGURA, revisar
+
+# Proceso nuevo por import (mejor de 2): cada punto de entrada parte en frío, como en el runner
+@pytest.mark.parametrize("modulo", list(PUNTOS_DE_ENTRADA))
+def test_arranque(modulo):
+    limite, _ = PUNTOS_DE_ENTRADA[modulo]
+    mejor, _, sobrantes, error = revisar(modulo, veces=2)
+    assert error is None, error
+    assert not sobrantes, f"{modulo} carga al importarse: {', '.join(sobrantes)}"
+    assert mejor <= limite * HOLGURA, f"{modulo} tarda {mejor:.2f}s en importarse (límite {limite * HOLGURA:.2f}s)"
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from modulos.nucleo.sync_ausencias import amortiguar_archivado
+from modulos.nucleo.sync_diagnostico import normalize_shopify_products
+from modulos.nucleo.sync_objetivo import recortar_filas
+from modulos.nucleo.sync_planificador import construir_plan
+
+def test_dirigida_no_archiva_la_variante_hermana():
+    # --skus A: Shopify devuelve el producto entero (A y su hermana B), Mediven queda recortado a A
+    productos = [{
+        "id": "1", "title": "Producto", "bodyHtml": "", "status": "active", "has_image": True,
+        "variants": [
+            {"id": "11", "sku": "A", "price": "1000", "taxable": False},
+            {"id": "12", "sku": "B", "price": "1000", "taxable": False},
+        ],
+    }]
+    df_shop = pd.DataFrame(normalize_shopify_products(productos))
+    df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
+    df_med = pd.DataFrame([{"Codigo": "A", "Descripcion": "PRODUCTO", "Precio": 500}])
+
+    _, _, archivar = construir_plan(df_med, df_shop, {}, {}, {}, completo=True)
+    assert [f["SKU"] for f in archivar] == ["B"]
+
+    archivar = recortar_filas(archivar, {"A"})
+    archivar, diferido, _ = amortiguar_archivado(archivar, {}, {"A", "B"})
+    assert archivar == [] and diferido == []
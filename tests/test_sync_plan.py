@@ -0,0 +1,121 @@
+import json
+import threading
+
+from modulos.nucleo.sync_plan import (
+    armar_plan, guardar_plan, cargar_plan, recortar_plan, fusionar_estado, shard_de,
+    marcar_aplicado, ya_aplicado, cargar_aplicados
+)
+
+TOTAL = 2
+
+def _filas_cruzadas():
+    """Filas de actualizar cuyo product_id cae en otro shard que su SKU (el caso que se rompía)."""
+    filas = []
+    for n in range(200):
+        sku, producto = f"SKU{n}", f"gid://shopify/Product/{n}"
+        if shard_de(sku, TOTAL) != shard_de(producto, TOTAL):
+            filas.append({"SKU": sku, "product_id": producto, "variant_id": f"V{n}", "Nuevo_Precio": 200})
+        if len(filas) == 6:
+            return filas
+    raise AssertionError("no hubo suficientes filas cruzadas")
+
+def _plan():
+    actualizar = _filas_cruzadas()
+    crear = [{"SKU": "NUEVO1", "Precio": 300}, {"SKU": "NUEVO2", "Precio": 300}]
+    memoria = {f["SKU"]: 200 for f in actualizar}
+    memoria.update({f["SKU"]: 300 for f in crear})
+    memoria["SIN_FILA"] = 50
+    estado = {
+        "memoria_precios": memoria,
+        "historial_ausencias": {},
+        "huellas": {sku: ["m", "s"] for sku in memoria},
+        "decisiones": {sku: ["regla", 1, None, precio] for sku, precio in memoria.items()},
+    }
+    return armar_plan(crear, actualizar, [], [], estado)
+
+def _en_disco():
+    plan = _plan()
+    memoria = {sku: 100 for sku in plan["estado"]["memoria_precios"]}
+    memoria["SIN_FILA"] = 50
+    return memoria
+
+def test_cada_shard_guarda_solo_el_estado_de_lo_que_escribio():
+    plan = _plan()
+    for indice in range(TOTAL):
+        recorte = recortar_plan(plan, (indice, TOTAL))
+        escritos = {str(f["SKU"]) for lista in ("crear", "actualizar") for f in recorte[lista]}
+        assert escritos
+
+        disco = _en_disco()
+        for clave in ("memoria_precios", "huellas", "decisiones"):
+            actual = dict(disco) if clave == "memoria_precios" else {}
+            fusion = fusionar_estado(actual, plan["estado"][clave], (indice, TOTAL), claves=recorte["claves_shard"])
+            cambiados = {sku for sku in fusion if fusion[sku] != actual.get(sku)}
+            assert cambiados - {"SIN_FILA"} == escritos, clave
+            # Lo de otros shards queda como está en disco
+            for sku in set(actual) - escritos - {"SIN_FILA"}:
+                assert fusion[sku] == actual[sku]
+
+def test_todos_los_shards_dan_el_estado_del_plan():
+    plan = _plan()
+    memoria = _en_disco()
+    for indice in range(TOTAL):
+        recorte = recortar_plan(plan, (indice, TOTAL))
+        memoria = fusionar_estado(memoria, plan["estado"]["memoria_precios"], (indice, TOTAL), claves=recorte["claves_shard"])
+    assert memoria == plan["estado"]["memoria_precios"]
+
+def test_registro_de_aplicados_por_plan_y_resultado(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = str(tmp_path / "planes_aplicados.json")
+    plan = _plan()
+    marcar_aplicado(plan, (0, 1), ruta=ruta)
+    assert ya_aplicado(plan, (0, 1), ruta=ruta)
+
+    # Mismo contenido, otra corrida: se aplica igual
+    otro = {**plan, "creado": "2099-01-01T00:00:00"}
+    assert otro["hash"] == plan["hash"]
+    assert not ya_aplicado(otro, (0, 1), ruta=ruta)
+
+    # Con userErrors queda anotado pero se puede volver a aplicar
+    marcar_aplicado(otro, (0, 1), errores=3, ruta=ruta)
+    assert not ya_aplicado(otro, (0, 1), ruta=ruta)
+    assert cargar_aplicados(ruta)[otro["hash"]]["errores"] == {"0": 3}
+    marcar_aplicado(otro, (0, 1), ruta=ruta)
+    assert ya_aplicado(otro, (0, 1), ruta=ruta)
+
+def test_el_mismo_archivo_de_plan_no_se_aplica_dos_veces(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = str(tmp_path / "planes_aplicados.json")
+    archivo = guardar_plan(_plan(), str(tmp_path / "plan.json.gz"))
+    marcar_aplicado(cargar_plan(archivo), (0, 1), ruta=ruta)
+    # Releer el mismo archivo (apply repetido, o reintento del cron): ya está aplicado
+    assert ya_aplicado(cargar_plan(archivo), (0, 1), ruta=ruta)
+
+def test_otra_corrida_con_el_mismo_contenido_se_aplica(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = str(tmp_path / "planes_aplicados.json")
+    primero = cargar_plan(guardar_plan(_plan(), str(tmp_path / "primero.json.gz")))
+    marcar_aplicado(primero, (0, 1), ruta=ruta)
+
+    # Mismo contenido planificado en otra corrida: lo escrito antes no quedó en Shopify
+    segundo = cargar_plan(guardar_plan({**primero, "creado": "2099-01-01T00:00:00"}, str(tmp_path / "segundo.json.gz")))
+    assert segundo["hash"] == primero["hash"]
+    assert not ya_aplicado(segundo, (0, 1), ruta=ruta)
+    marcar_aplicado(segundo, (0, 1), ruta=ruta)
+    assert ya_aplicado(segundo, (0, 1), ruta=ruta)
+
+def test_shards_en_paralelo_no_se_pisan_el_registro(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = str(tmp_path / "data" / "planes_aplicados.json")
+    plan, total = _plan(), 8
+    hilos = [
+        threading.Thread(target=marcar_aplicado, args=(plan, (i, total)), kwargs={"ruta": ruta})
+        for i in range(total)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert cargar_aplicados(ruta)[plan["hash"]]["shards"] == list(range(total))
+    with open(ruta, "r", encoding="utf-8") as f:
+        json.load(f)
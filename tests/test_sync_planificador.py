@@ -0,0 +1,176 @@
+import json
+import os
+import random
+
+import pandas as pd
+
+from modulos.finanzas.precios import calcular_precio_final
+from modulos.nucleo.sync_diagnostico import normalize_shopify_products, formatear_nombre_producto
+from modulos.nucleo.sync_exclusiones import detectar_excluidos
+from modulos.nucleo.sync_planificador import construir_plan, variantes_con_impuesto, marcar_productos_vivos
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+PALABRAS = ["PARACETAMOL", "IBUPROFENO", "LORATADINA", "ACIDO", "FOLICO", "VITAMINA", "CREMA", "GEL",
+            "SHAMPOO", "AGUA", "MICELAR", "NIVEA", "PROTECTOR", "SOLAR", "COMP", "CAPS", "JBE", "SOL",
+            "OFT", "SUSP", "UN", "CRE", "SOB", "P SECA", "S/SAB", "FTE", "X", "ML", "MG", "(DM)", "(BE)"]
+
+def _leer(nombre):
+    with open(os.path.join(DATA, nombre), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _catalogos():
+    """Mediven y Shopify armados de forma fija sobre los SKUs de data/ (catálogo y memoria)."""
+    azar = random.Random(7)
+    catalogo = _leer("catalogo_mediven.json")
+    memoria = _leer("memoria_precios.json")
+
+    items = []
+    for sku, id_prod in catalogo.items():
+        descripcion = " ".join(azar.sample(PALABRAS, azar.randint(2, 5)))
+        if azar.random() < 0.03:
+            descripcion += " PERRO"
+        items.append({
+            "Codigo": sku if azar.random() > 0.01 else f" {sku} ", "IdProd": id_prod, "Descripcion": descripcion,
+            "Laboratorio": azar.choice(["SAVAL", "RECALCINE", ""]), "Equivalente": azar.choice(["PARACETAMOL", ""]),
+            "AccionTerapeutica": "", "Precio": azar.choice([0, "", azar.randint(100, 60000), azar.randint(100, 3000)]),
+        })
+    # SKU repetido en Mediven
+    items += [dict(items[5]), dict(items[5])]
+
+    mercado = {}
+    for item in items:
+        r = azar.random()
+        if r < 0.5:
+            mercado[item["Codigo"].strip()] = {"datos_mercado": {"mediana_competitiva": azar.randint(500, 90000)}}
+        elif r < 0.6:
+            mercado[item["Codigo"].strip()] = {"datos_mercado": None}
+
+    productos, pid = [], 1000
+    for item in items[:int(len(items) * 0.9)]:
+        pid += 1
+        sku = item["Codigo"].strip()
+        precio = memoria.get(sku, azar.randint(1000, 50000))
+        if azar.random() < 0.3:
+            precio += azar.choice([0.5, 3, 100, -2000])
+        productos.append({
+            "id": str(pid), "title": azar.choice(["X", item["Descripcion"].title()]), "bodyHtml": "",
+            "status": azar.choice(["active", "active", "archived", "draft"]), "has_image": True,
+            "variants": [{"id": str(pid * 10), "sku": sku, "price": str(precio), "taxable": azar.random() < 0.1}],
+        })
+    # Productos que Mediven ya no trae, sin SKU o con un SKU que otro producto ya tiene
+    for j, sku in enumerate(["VIEJO1", "", None, items[0]["Codigo"].strip(), "VIEJO2"]):
+        pid += 1
+        productos.append({
+            "id": str(pid), "title": f"Viejo {j}", "bodyHtml": "", "status": "active", "has_image": True,
+            "variants": [{"id": str(pid * 10), "sku": sku, "price": "1000", "taxable": j % 2 == 0}],
+        })
+
+    df_med = pd.DataFrame(items)
+    df_med["Codigo"] = df_med["Codigo"].astype(str).str.strip()
+    df_shop = pd.DataFrame(normalize_shopify_products(productos))
+    df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
+    df_shop["bodyHtml"] = df_shop["bodyHtml"].fillna("")
+    return df_med, df_shop, mercado, memoria
+
+def _plan_original(df_med, df_shop, skus_excluidos, precios_mercado, memoria_precios):
+    """El loop por SKU que tenía sync.main() antes del planificador vectorizado."""
+    crear, actualizar, archivar = [], [], []
+    skus_med = set(df_med["Codigo"])
+
+    shop_by_sku = {}
+    for _, row in df_shop.iterrows():
+        sku = row["sku"]
+        if sku and sku not in shop_by_sku:
+            shop_by_sku[sku] = row
+
+    for _, row in df_med.iterrows():
+        sku = row["Codigo"]
+        if sku in skus_excluidos:
+            continue
+        precio_med = float(row.get("Precio", 0) or 0)
+        if precio_med <= 0:
+            nuevo_precio = 0
+        else:
+            nuevo_precio, _ = calcular_precio_final(precio_med, precios_mercado.get(sku))
+
+        if sku in shop_by_sku:
+            shop_row = shop_by_sku[sku]
+            precio_actual = float(shop_row["price"] or 0)
+            ultimo_precio_robot = memoria_precios.get(sku)
+            if ultimo_precio_robot is not None and abs(precio_actual - ultimo_precio_robot) > 1:
+                nuevo_precio = precio_actual
+            nom_gen = formatear_nombre_producto(row)
+            c_pre = abs(precio_actual - nuevo_precio) >= 1
+            c_nom = nom_gen != str(shop_row.get("product_title", ""))
+            c_status = str(shop_row.get("status", "")).lower() != "active"
+            if c_pre or c_nom or c_status:
+                actualizar.append({
+                    "SKU": sku, "Descripcion": nom_gen, "Precio_Shopify": precio_actual, "Nuevo_Precio": nuevo_precio,
+                    "variant_id": shop_row["variant_id"], "product_id": shop_row["product_id"],
+                    "actualizar_basicos": c_nom or c_status,
+                })
+        else:
+            crear.append({"SKU": sku, "Descripcion": row.get("Descripcion", ""), "Precio": nuevo_precio, "Stock": 100})
+        memoria_precios[sku] = nuevo_precio
+
+    for _, row in df_shop.iterrows():
+        sku = row["sku"]
+        if not sku:
+            continue
+        es_prohibido = sku in skus_excluidos
+        if es_prohibido or sku not in skus_med:
+            archivar.append({
+                "SKU": sku, "product_id": row["product_id"], "Descripcion": row.get("product_title", ""),
+                "Motivo": "Excluido/Prohibido" if es_prohibido else "No existe en Mediven",
+                "status_actual": str(row.get("status", "active")).lower(),
+            })
+
+    impuestos = df_shop[df_shop["taxable"] == True].to_dict("records")
+    return crear, actualizar, archivar, impuestos
+
+def _como_original(filas, original):
+    # El planificador agrega columnas (Costo, Palabra_Excluida...): se comparan las del loop
+    campos = list(original[0]) if original else []
+    return [{campo: fila[campo] for campo in campos} for fila in filas]
+
+def test_construir_plan_igual_al_loop_original():
+    df_med, df_shop, mercado, memoria = _catalogos()
+    palabras = detectar_excluidos(df_med)
+    excluidos = dict(zip(df_med["Codigo"][palabras.notna()], palabras[palabras.notna()]))
+
+    memoria_original = dict(memoria)
+    crear_o, actualizar_o, archivar_o, impuestos_o = _plan_original(
+        df_med, df_shop, set(excluidos), mercado, memoria_original
+    )
+    memoria_nueva = dict(memoria)
+    crear, actualizar, archivar = construir_plan(df_med, df_shop, excluidos, mercado, memoria_nueva)
+
+    assert crear_o and actualizar_o and archivar_o and impuestos_o
+    assert _como_original(crear, crear_o) == crear_o
+    assert _como_original(actualizar, actualizar_o) == actualizar_o
+    assert _como_original(archivar, archivar_o) == archivar_o
+    assert variantes_con_impuesto(df_shop) == [
+        {"product_id": v["product_id"], "variant_id": v["variant_id"]} for v in impuestos_o
+    ]
+    assert memoria_nueva == memoria_original
+
+def test_producto_con_una_variante_vigente_no_se_archiva():
+    # Producto 1: A ya no está en Mediven, B sigue y no cambia (no sale en actualizar).
+    # Producto 2: su única variante ya no está en Mediven.
+    productos = [
+        {"id": "1", "title": "Uno", "bodyHtml": "", "status": "active", "has_image": True, "variants": [
+            {"id": "11", "sku": "A", "price": "1000", "taxable": False},
+            {"id": "12", "sku": "B", "price": "1000", "taxable": False},
+        ]},
+        {"id": "2", "title": "Dos", "bodyHtml": "", "status": "active", "has_image": True, "variants": [
+            {"id": "21", "sku": "C", "price": "1000", "taxable": False},
+        ]},
+    ]
+    df_shop = pd.DataFrame(normalize_shopify_products(productos))
+    df_shop["sku"] = df_shop["sku"].astype(str).str.strip()
+    df_med = pd.DataFrame([{"Codigo": "B", "Descripcion": "UNO", "Precio": 500}])
+
+    _, _, archivar = construir_plan(df_med, df_shop, {}, {}, {"B": 1000}, completo=True)
+    marcar_productos_vivos(archivar, df_shop, set(df_med["Codigo"]))
+    assert {f["SKU"]: f["producto_vivo"] for f in archivar} == {"A": True, "C": False}
@@ -0,0 +1,56 @@
+from modulos.nucleo import sync_presupuesto as presupuesto
+from modulos.nucleo.sync_etapas import etapa, correr_etapas, carriles
+
+def _plazos(etapas_post):
+    """Corre las etapas (sin trabajo) y retorna {etapa: segundos que recibió}."""
+    recibido = {}
+
+    def correr(nombre):
+        return lambda: recibido.setdefault(nombre, presupuesto.restante(presupuesto.plazo_etapa(nombre)))
+
+    etapas = [etapa(nombre, correr(nombre), servicios, depende) for nombre, servicios, depende in etapas_post]
+    presupuesto.fijar_carriles(carriles(etapas))
+    correr_etapas(etapas)
+    return recibido
+
+def test_los_carriles_en_paralelo_no_se_quitan_tiempo():
+    presupuesto.iniciar_presupuesto(1000 + presupuesto.MARGEN_CIERRE)
+    try:
+        recibido = _plazos([
+            ("ia", ["gemini"], []),
+            ("imagenes", ["shopify"], []),
+        ])
+    finally:
+        presupuesto.iniciar_presupuesto(None)
+    # Cada una es la única de su carril: todo lo que queda
+    assert recibido["ia"] > 990
+    assert recibido["imagenes"] > 990
+
+def test_dentro_de_un_carril_se_reparte():
+    presupuesto.iniciar_presupuesto(1000 + presupuesto.MARGEN_CIERRE)
+    try:
+        recibido = _plazos([
+            ("ia", ["gemini"], []),
+            ("seo", ["shopify"], ["ia"]),
+        ])
+    finally:
+        presupuesto.iniciar_presupuesto(None)
+    reparto = presupuesto.REPARTO_ETAPAS
+    esperado = 1000 * reparto["ia"] / (reparto["ia"] + reparto["seo"])
+    assert abs(recibido["ia"] - esperado) < 10
+    # SEO usa lo que la IA deja (aquí no usó nada)
+    assert recibido["seo"] > 990
+
+def test_carriles_por_dependencia_y_servicio_exclusivo():
+    etapas = [
+        etapa("espia", None, ["serper"]),
+        etapa("ia", None, ["gemini"]),
+        etapa("imagenes", None, ["serper", "shopify"]),
+        etapa("seo", None, ["shopify"], ["ia"]),
+    ]
+    assert carriles(etapas) == {
+        "espia": {"imagenes"},
+        "ia": {"seo"},
+        "imagenes": {"espia"},
+        "seo": set(),
+    }